@@ -0,0 +1,165 @@
+# Import os for environment variable access.
+import os
+# Import asyncio for per-subscriber queues.
+import asyncio
+# Import json for storing relayed events.
+import json
+# Import logging for reporting relay failures.
+import logging
+# Import uuid for naming this process in relayed events.
+import uuid
+# Import datetime and timezone for normalizing timestamps.
+from datetime import datetime, timedelta, timezone
+# Import select and delete for reading and pruning relayed events.
+from sqlalchemy import select, delete
+# Import schemas module for serializing tasks.
+import schemas
+# Import models module for the relayed event table.
+import models
+
+# Define the maximum number of undelivered events kept for one subscriber.
+MAX_QUEUED_EVENTS = 100
+# Define the number of worker processes in the deployment; uvicorn and gunicorn start this many when it is set.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Define whether task changes are relayed between worker processes through the database; needed with more than one worker,
+# so on by default only when WEB_CONCURRENCY asks for several (set EVENT_RELAY=1 when using --workers or -w instead).
+EVENT_RELAY = os.getenv("EVENT_RELAY", "1" if WEB_CONCURRENCY > 1 else "0") == "1"
+# Define how often the relay writes this process's events and reads the other workers', in seconds.
+EVENT_RELAY_SECONDS = float(os.getenv("EVENT_RELAY_SECONDS", "0.25"))
+# Define how far back each read looks again, in seconds, so events committed out of id order are not missed.
+EVENT_RELAY_OVERLAP_SECONDS = 5
+# Define how long relayed events are kept before being pruned, in seconds.
+EVENT_RETENTION_SECONDS = 300
+
+# Create the module logger.
+logger = logging.getLogger(__name__)
+
+# Define an in-process publish/subscribe broadcaster for task changes.
+class Broadcaster:
+    # Initialize with no subscribers.
+    def __init__(self, max_queued: int = MAX_QUEUED_EVENTS):
+        # Store the per-subscriber queue bound.
+        self.max_queued = max_queued
+        # Store one queue per connected client.
+        self.subscribers = set()
+
+    # Register a new subscriber and return its queue.
+    def subscribe(self) -> asyncio.Queue:
+        # Create a bounded queue so a stalled client cannot grow memory without limit.
+        queue = asyncio.Queue(maxsize=self.max_queued)
+        # Add it to the subscriber set.
+        self.subscribers.add(queue)
+        # Return the queue for the caller to read from.
+        return queue
+
+    # Remove a subscriber once its client disconnects.
+    def unsubscribe(self, queue: asyncio.Queue):
+        # Discard the queue if still registered.
+        self.subscribers.discard(queue)
+
+    # Deliver an event to every subscriber without waiting on any of them.
+    def publish(self, event: dict):
+        # Loop over a snapshot of the subscribers.
+        for queue in list(self.subscribers):
+            try:
+                # Enqueue the event.
+                queue.put_nowait(event)
+            # If the client has fallen too far behind, replace its backlog with a resync request.
+            except asyncio.QueueFull:
+                # Drop everything still queued for it.
+                while not queue.empty():
+                    queue.get_nowait()
+                # Tell the client to refetch the full state instead.
+                queue.put_nowait({"type": "resync"})
+
+# Create the process-wide broadcaster.
+broadcaster = Broadcaster()
+
+# Define a relay that carries events between the worker processes of a deployment through the task_events table.
+# Each process delivers its own events to its clients immediately, writes them to the table in one batch per interval,
+# and delivers the rows written by the other processes to its clients.
+class EventRelay:
+    # Initialize with an empty outbox; nothing is queued until the relay runs.
+    def __init__(self, interval: float = EVENT_RELAY_SECONDS):
+        # Store the polling interval.
+        self.interval = interval
+        # Name this process so it skips its own rows.
+        self.origin = uuid.uuid4().hex
+        # Store events published here and not yet written.
+        self.outbox = []
+        # Store the ids of rows already delivered within the overlap window, with when they were seen.
+        self.seen = {}
+        # Store the time of the last read; rows written after it (minus the overlap) are read next.
+        self.since = None
+        # Store when old rows were last pruned.
+        self.last_prune = None
+
+    # Queue an event for the other workers.
+    def enqueue(self, event: dict):
+        # Only while the relay runs; with EVENT_RELAY off (a single process, by default) events are never buffered.
+        if self.since is not None:
+            self.outbox.append(event)
+
+    # Run the relay until cancelled at shutdown, with a fresh session each round.
+    async def run(self, session_factory):
+        # Rows written before this process started are not relevant to its clients.
+        self.since = self.last_prune = datetime.now(timezone.utc)
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                async with session_factory() as db:
+                    await self.exchange(db)
+            # Keep relaying after a failure (e.g. the database was briefly locked).
+            except Exception:
+                logger.exception("Event relay failed")
+
+    # Write the outbox and deliver the other workers' new rows.
+    async def exchange(self, db):
+        # Take the outbox; it is put back if the write fails.
+        events, self.outbox = self.outbox, []
+        now = datetime.now(timezone.utc)
+        try:
+            # Write this process's events in one INSERT.
+            if events:
+                db.add_all([models.TaskEvent(origin=self.origin, payload=json.dumps(event), created_at=now) for event in events])
+            # Read the other processes' recent rows, in the order they were written.
+            rows = (await db.execute(
+                select(models.TaskEvent.id, models.TaskEvent.payload)
+                .where(models.TaskEvent.created_at > self.since - timedelta(seconds=EVENT_RELAY_OVERLAP_SECONDS),
+                       models.TaskEvent.origin != self.origin)
+                .order_by(models.TaskEvent.id)
+            )).all()
+            # Now and then delete rows every worker has long since read.
+            if (now - self.last_prune).total_seconds() > EVENT_RETENTION_SECONDS:
+                await db.execute(delete(models.TaskEvent).where(models.TaskEvent.created_at < now - timedelta(seconds=EVENT_RETENTION_SECONDS)))
+                self.last_prune = now
+            await db.commit()
+        except BaseException:
+            self.outbox[:0] = events
+            raise
+        # Deliver each row once, even though the overlap reads it again.
+        for event_id, payload in rows:
+            if event_id not in self.seen:
+                self.seen[event_id] = now
+                broadcaster.publish(json.loads(payload))
+        # Forget ids that have left the overlap window.
+        horizon = now - timedelta(seconds=2 * EVENT_RELAY_OVERLAP_SECONDS)
+        self.seen = {event_id: seen_at for event_id, seen_at in self.seen.items() if seen_at > horizon}
+        self.since = now
+
+# Create the process-wide relay.
+relay = EventRelay()
+
+# Define a helper function that publishes the new state of a task.
+def publish_task(task, kept_by: str = None):
+    # Serialize the task with the same schema the REST endpoints use.
+    data = schemas.Task.model_validate(task).model_dump(mode="json")
+    # Timestamps set in this request are timezone-aware; send them as naive UTC like rows read back from the database.
+    for field in ("start_time", "stop_time", "lease_expires_at"):
+        value = getattr(task, field)
+        if value is not None and value.tzinfo is not None:
+            data[field] = value.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+    # Publish the change together with the keeper's username, here and to the other workers.
+    event = {"type": "task_updated", "task": data, "kept_by": kept_by}
+    broadcaster.publish(event)
+    relay.enqueue(event)
@@ -0,0 +1,92 @@
+# Import os for environment variable access.
+import os
+# Import asyncio for the background sweeper loop.
+import asyncio
+# Import logging for reporting sweeper failures.
+import logging
+# Import datetime helpers for lease deadlines.
+from datetime import datetime, timedelta, timezone
+# Import select and update for the batched reclaim.
+from sqlalchemy import select, update
+# Import AsyncSession for type hints.
+from sqlalchemy.ext.asyncio import AsyncSession
+# Import models module for the Task model.
+import models
+# Import the task change publisher so clients see reclaimed tasks return to the queue.
+from events import publish_task
+
+# Define how long a claim lasts without being renewed, in seconds.
+TASK_LEASE_SECONDS = int(os.getenv("TASK_LEASE_SECONDS", "14400"))
+# Define how often the sweeper looks for expired claims, in seconds.
+LEASE_SWEEP_SECONDS = float(os.getenv("LEASE_SWEEP_SECONDS", "30"))
+# Define how many expired claims one UPDATE returns to the queue.
+LEASE_SWEEP_BATCH = int(os.getenv("LEASE_SWEEP_BATCH", "500"))
+
+# Create the module logger.
+logger = logging.getLogger(__name__)
+
+# Define a helper function that returns the deadline of a lease taken or renewed now.
+def lease_deadline(now: datetime = None) -> datetime:
+    # Count from the given time, or from the current UTC time.
+    return (now or datetime.now(timezone.utc)) + timedelta(seconds=TASK_LEASE_SECONDS)
+
+# Define a function that gives open claims made before leases existed a full lease, so they can expire too.
+async def backfill_leases(db: AsyncSession):
+    # One UPDATE over the claimed, unfinished tasks without a deadline.
+    await db.execute(
+        update(models.Task)
+        .where(models.Task.kept_by_user_id.is_not(None), models.Task.stop_time.is_(None), models.Task.lease_expires_at.is_(None))
+        .values(lease_expires_at=lease_deadline())
+        .execution_options(synchronize_session=False)
+    )
+    # Commit the deadlines.
+    await db.commit()
+
+# Define a function that returns every expired claim to the queue, one batch per transaction.
+# Returns the number of tasks reclaimed.
+async def reclaim_expired(db: AsyncSession, batch: int = LEASE_SWEEP_BATCH) -> int:
+    # Use one cut-off for the whole sweep.
+    now = datetime.now(timezone.utc)
+    reclaimed = 0
+    while True:
+        # Pick the oldest expired claims from the lease index; on PostgreSQL rows locked by claimers are skipped.
+        expired = (
+            select(models.Task.id)
+            .where(models.Task.lease_expires_at <= now, models.Task.stop_time.is_(None))
+            .order_by(models.Task.lease_expires_at)
+            .limit(batch)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        # Release them in one UPDATE; the deadline re-check skips leases renewed since the pick.
+        tasks = (await db.execute(
+            update(models.Task)
+            .where(models.Task.id.in_(expired), models.Task.lease_expires_at <= now, models.Task.stop_time.is_(None))
+            .values(kept_by_user_id=None, start_time=None, lease_expires_at=None)
+            .returning(models.Task)
+            .execution_options(synchronize_session=False)
+        )).scalars().all()
+        # Commit each batch so claimers are never blocked for long.
+        await db.commit()
+        # Notify connected clients that the tasks are back in the queue.
+        for task in tasks:
+            publish_task(task)
+        reclaimed += len(tasks)
+        # A short batch means nothing expired is left.
+        if len(tasks) < batch:
+            return reclaimed
+
+# Define the background loop that sweeps expired claims until cancelled at shutdown.
+async def run_sweeper(session_factory, interval: float = LEASE_SWEEP_SECONDS):
+    while True:
+        try:
+            # Sweep with a fresh session each time.
+            async with session_factory() as db:
+                reclaimed = await reclaim_expired(db)
+            if reclaimed:
+                logger.info("Returned %d expired claims to the queue", reclaimed)
+        # Keep sweeping after a failure (e.g. the database was briefly locked).
+        except Exception:
+            logger.exception("Lease sweep failed")
+        # Wait for the next sweep.
+        await asyncio.sleep(interval)
@@ -1,21 +1,45 @@
     # Import FastAPI for creating the API application.
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-# Import Session from SQLAlchemy ORM for database sessions.
-from sqlalchemy.orm import Session
+# Import AsyncSession from SQLAlchemy asyncio for non-blocking database sessions.
+from sqlalchemy.ext.asyncio import AsyncSession
+# Import select, func and the boolean combinators for building queries and keyset filters.
+from sqlalchemy import select, update, func, and_, or_
 # Import IntegrityError from SQLAlchemy for handling unique constraint errors.
 from sqlalchemy.exc import IntegrityError
 # Import models module for database models.
 import models
 # Import schemas module for Pydantic models.
 import schemas
-# Import engine and get_db from database module.
-from database import engine, get_db
+# Import engine, the async session factory and get_db from database module.
+from database import engine, AsyncSessionLocal, get_db, add_missing_columns, startup_lock
 # Import datetime for handling current time.
-from datetime import datetime, timezone
+from datetime import datetime, timezone, date, timedelta
+# Import Optional and Literal for optional and enumerated query parameters.
+from typing import Optional, Literal
+# Import base64 for opaque pagination cursors.
+import base64
+# Import asyncio and json for the event stream.
+import asyncio
+import json
+# Import the task change broadcaster and the relay carrying changes between worker processes.
+from events import broadcaster, publish_task, relay, EVENT_RELAY
+# Import the time-tracking rollup helpers.
+from stats import record_completion, histogram_percentiles, backfill_rollups
+# Import the username -> id cache.
+from user_cache import user_cache
+# Import the claim lease helpers and the expired-claim sweeper.
+from leases import lease_deadline, backfill_leases, run_sweeper
 
-# Create all database tables using the Base metadata and engine.
-models.Base.metadata.create_all(bind=engine)
+# Define how many times /claim_next retries after losing a race for the same task.
+CLAIM_NEXT_ATTEMPTS = 5
+
+# Define how often an idle event stream sends a keep-alive comment, in seconds.
+EVENT_HEARTBEAT_SECONDS = 15
+
+# Define the number of days /stats endpoints cover when no range is given.
+DEFAULT_STATS_DAYS = 30
 
 # Instantiate the FastAPI application.
 app = FastAPI()
@@ -27,15 +51,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods (GET, POST, etc.)
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Next-Cursor"],  # Let the frontend read the pagination cursor
 )
 
-# Define a startup event handler to populate initial data.
+# Define a startup event handler to prepare the schema and populate initial data.
 @app.on_event("startup")
-def startup_event():
-    # Get a database session using the dependency.
-    db = next(get_db())
+async def startup_event():
+    # With several worker processes (uvicorn --workers, gunicorn) start them one at a time; only the first prepares the database.
+    with startup_lock() as first:
+        if first:
+            # Create all database tables using the Base metadata and engine.
+            models.Base.metadata.create_all(bind=engine)
+            # Create columns and indexes added to existing tables since they were first created, and drop superseded indexes.
+            add_missing_columns(models.Base.metadata, models.DROPPED_INDEXES)
+            # Open a database session for seeding.
+            async with AsyncSessionLocal() as db:
+                await seed_data(db)
+                # Build the time-tracking rollups for tasks completed before they existed.
+                await backfill_rollups(db)
+                # Give claims made before leases existed a deadline.
+                await backfill_leases(db)
+    # Warm this worker's user cache with the most recently created users.
+    async with AsyncSessionLocal() as db:
+        await warm_user_cache(db)
+    # Start returning expired claims to the queue in the background.
+    app.state.background_tasks = [asyncio.create_task(run_sweeper(AsyncSessionLocal))]
+    # Start exchanging task changes with the other workers, so every client sees every change.
+    if EVENT_RELAY:
+        app.state.background_tasks.append(asyncio.create_task(relay.run(AsyncSessionLocal)))
+
+# Define a shutdown event handler to stop the background tasks.
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Cancel each task and wait for it to finish.
+    for task in app.state.background_tasks:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+# Define a helper function that inserts sample tasks and the test user when missing.
+async def seed_data(db: AsyncSession):
     # Check if there are no tasks in the database.
-    if db.query(models.Task).count() == 0:
+    if await db.scalar(select(func.count()).select_from(models.Task)) == 0:
         # Create a list of sample Task objects.
         sample_tasks = [
             models.Task(title="Task 1"),
@@ -47,20 +106,24 @@ def startup_event():
         # Add all sample tasks to the session.
         db.add_all(sample_tasks)
         # Commit the changes to the database.
-        db.commit()
+        await db.commit()
     # Check if a test user exists.
-    if db.query(models.User).filter(models.User.username == "testuser").first() is None:
+    if await db.scalar(select(models.User).filter(models.User.username == "testuser")) is None:
         # Create a test User object.
         test_user = models.User(username="testuser")
         # Add the test user to the session.
         db.add(test_user)
         # Commit the changes to the database.
-        db.commit()
+        await db.commit()
 
 # Define a helper function to get or create a user by username.
-def get_or_create_user(db: Session, username: str):
+async def get_or_create_user(db: AsyncSession, username: str):
+    # Answer from the cache when possible; callers only read id and username, so a detached copy is enough.
+    user_id = user_cache.get(username)
+    if user_id is not None:
+        return models.User(id=user_id, username=username)
     # Query for the user by username.
-    user = db.query(models.User).filter(models.User.username == username).first()
+    user = await db.scalar(select(models.User).filter(models.User.username == username))
     # If user does not exist, create one.
     if not user:
         # Instantiate a new User object.
@@ -70,107 +133,378 @@ def get_or_create_user(db: Session, username: str):
             # Add the user to the session.
             db.add(user)
             # Commit the changes.
-            db.commit()
-            # Refresh the user object with database values.
-            db.refresh(user)
+            await db.commit()
         # Catch IntegrityError if username already exists (race condition).
         except IntegrityError:
             # Rollback the transaction.
-            db.rollback()
+            await db.rollback()
             # Re-query for the user.
-            user = db.query(models.User).filter(models.User.username == username).first()
+            user = await db.scalar(select(models.User).filter(models.User.username == username))
+    # Cache the id now that the row is known to be committed (by us or by the request that won the race).
+    user_cache.put(username, user.id)
     # Return the user object.
     return user
 
+# Define a helper function that preloads the user cache at startup.
+async def warm_user_cache(db: AsyncSession):
+    # Load the newest users up to the cache bound.
+    rows = await db.execute(
+        select(models.User.id, models.User.username).order_by(models.User.id.desc()).limit(user_cache.max_entries)
+    )
+    # Insert oldest first so the newest end up most recently used.
+    for user_id, username in reversed(rows.all()):
+        user_cache.put(username, user_id)
+
+# Define a helper function that encodes a keyset position as an opaque cursor string.
+def encode_cursor(*values) -> str:
+    # JSON, then URL-safe base64.
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+# Define a helper function that decodes a cursor produced by encode_cursor.
+def decode_cursor(cursor: str) -> list:
+    try:
+        # Reverse the encoding.
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    # Covers bad base64, bad UTF-8 and bad JSON.
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    # Cursors always encode a list.
+    if not isinstance(position, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return position
+
+# Define a helper function that narrows a task query to one lifecycle state.
+def filter_state(query, state: Optional[str]):
+    # Not yet started.
+    if state == "unstarted":
+        return query.filter(models.Task.start_time.is_(None))
+    # Started and not stopped.
+    if state == "running":
+        return query.filter(models.Task.start_time.is_not(None), models.Task.stop_time.is_(None))
+    # Stopped.
+    if state == "done":
+        return query.filter(models.Task.stop_time.is_not(None))
+    # No state filter.
+    return query
+
+# Define a helper function that returns one page of a task query, setting X-Next-Cursor if more remain.
+# Pages are in id order, or in queue order (priority descending, then id) with a (priority, id) cursor.
+async def fetch_task_page(db: AsyncSession, query, response: Response, limit: int, cursor: Optional[str], state: Optional[str], by_priority: bool = False):
+    # Apply the state filter.
+    query = filter_state(query, state)
+    # Continue strictly after the last task of the previous page.
+    if cursor:
+        position = decode_cursor(cursor)
+        # Reject cursors that do not hold one integer per sort key.
+        if len(position) != (2 if by_priority else 1) or not all(isinstance(value, int) for value in position):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        if by_priority:
+            # Lower priority, or the same priority and a later id.
+            last_priority, last_id = position
+            query = query.filter(or_(
+                models.Task.priority < last_priority,
+                and_(models.Task.priority == last_priority, models.Task.id > last_id),
+            ))
+        else:
+            last_id = position[0]
+            query = query.filter(models.Task.id > last_id)
+    # Fetch one extra row to know whether another page exists.
+    order = (models.Task.priority.desc(), models.Task.id) if by_priority else (models.Task.id,)
+    tasks = (await db.scalars(query.order_by(*order).limit(limit + 1))).all()
+    # Trim the extra row and hand out the cursor.
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        last = tasks[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.priority, last.id) if by_priority else encode_cursor(last.id)
+    # Return the page.
+    return tasks
+
 # Define GET endpoint for fetching the task queue.
 @app.get("/queue", response_model=list[schemas.Task])
-def get_queue(db: Session = Depends(get_db)):
-    # Query all tasks where kept_by_user_id is None and return them.
-    return db.query(models.Task).filter(models.Task.kept_by_user_id == None).all()
+async def get_queue(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    state: Optional[Literal["unstarted", "running", "done"]] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    # Query tasks where kept_by_user_id is None, served from the partial index in queue order.
+    query = select(models.Task).filter(models.Task.kept_by_user_id == None)
+    # Return one page of them, highest priority first.
+    return await fetch_task_page(db, query, response, limit, cursor, state, by_priority=True)
+
+# Define POST endpoint for adding a task to the queue.
+@app.post("/tasks", response_model=schemas.Task, status_code=status.HTTP_201_CREATED)
+async def create_task(request: schemas.TaskCreate, db: AsyncSession = Depends(get_db)):
+    # Create the unclaimed task.
+    task = models.Task(title=request.title, priority=request.priority)
+    # Add it to the session and commit.
+    db.add(task)
+    await db.commit()
+    # Notify connected clients.
+    publish_task(task)
+    # Return the new task.
+    return task
+
+# Define GET endpoint streaming task changes as Server-Sent Events.
+@app.get("/events")
+async def stream_events():
+    # Subscribe this client to the broadcaster.
+    queue = broadcaster.subscribe()
+
+    # Define the generator that writes events as they arrive.
+    async def event_stream():
+        try:
+            # Loop until the client disconnects (the generator is then cancelled).
+            while True:
+                try:
+                    # Wait for the next event.
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENT_HEARTBEAT_SECONDS)
+                    # Send it as one SSE message.
+                    yield f"data: {json.dumps(event)}\n\n"
+                # Send a comment line so proxies keep an idle connection open.
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            # Unsubscribe when the stream ends.
+            broadcaster.unsubscribe(queue)
+
+    # Return the streaming response.
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 # Define GET endpoint for fetching user's tasks.
 @app.get("/my_tasks", response_model=list[schemas.Task])
-def get_my_tasks(username: str, db: Session = Depends(get_db)):
+async def get_my_tasks(
+    username: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    state: Optional[Literal["unstarted", "running", "done"]] = None,
+    db: AsyncSession = Depends(get_db),
+):
     # Get or create the user.
-    user = get_or_create_user(db, username)
-    # Query tasks kept by the user and return them.
-    return db.query(models.Task).filter(models.Task.kept_by_user_id == user.id).all()
+    user = await get_or_create_user(db, username)
+    # Query tasks kept by the user, served from the (kept_by_user_id, id) index.
+    query = select(models.Task).filter(models.Task.kept_by_user_id == user.id)
+    # Return one page of them.
+    return await fetch_task_page(db, query, response, limit, cursor, state)
+
+# Define a helper function that claims a task for a user in a single conditional UPDATE.
+async def claim_task(db: AsyncSession, task_id: int, user_id: int, start: bool):
+    # Build the values to write, with a fresh lease; assigning also starts the task.
+    now = datetime.now(timezone.utc)
+    values = {"kept_by_user_id": user_id, "lease_expires_at": lease_deadline(now)}
+    if start:
+        values["start_time"] = now
+    # Only an unclaimed task matches, so of two concurrent claims exactly one updates the row.
+    statement = (
+        update(models.Task)
+        .where(models.Task.id == task_id, models.Task.kept_by_user_id.is_(None))
+        .values(**values)
+        .returning(models.Task)
+        .execution_options(synchronize_session=False)
+    )
+    # Execute the UPDATE and check whether a row was claimed.
+    task = (await db.execute(statement)).scalars().first()
+    if task is None:
+        # Nothing was written; tell a missing task apart from a taken one.
+        if await db.get(models.Task, task_id) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Task already taken")
+    # Commit the claim.
+    await db.commit()
+    # Return the claimed task.
+    return task
 
 # Define POST endpoint for keeping a task (assign without starting).
 @app.post("/keep/{task_id}")
-def keep_task(task_id: int, request: schemas.ActionRequest, db: Session = Depends(get_db)):
-    # Query the task by id.
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    # If task not found, raise 404 exception.
-    if not task:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    # If task already taken, raise 400 exception.
-    if task.kept_by_user_id is not None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Task already taken")
+async def keep_task(task_id: int, request: schemas.ActionRequest, db: AsyncSession = Depends(get_db)):
     # Get or create the user.
-    user = get_or_create_user(db, request.username)
-    # Assign the task to the user.
-    task.kept_by_user_id = user.id
-    # Commit the changes.
-    db.commit()
+    user = await get_or_create_user(db, request.username)
+    # Atomically assign the task to the user.
+    task = await claim_task(db, task_id, user.id, start=False)
+    # Notify connected clients.
+    publish_task(task, user.username)
     # Return success message.
     return {"message": "Task kept"}
 
 # Define POST endpoint for assigning a task (assign and start).
 @app.post("/assign/{task_id}")
-def assign_task(task_id: int, request: schemas.ActionRequest, db: Session = Depends(get_db)):
-    # Query the task by id.
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    # If task not found, raise 404 exception.
-    if not task:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    # If task already taken, raise 400 exception.
-    if task.kept_by_user_id is not None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Task already taken")
+async def assign_task(task_id: int, request: schemas.ActionRequest, db: AsyncSession = Depends(get_db)):
     # Get or create the user.
-    user = get_or_create_user(db, request.username)
-    # Assign the task to the user.
-    task.kept_by_user_id = user.id
-    # Set the start time to current UTC time.
-    task.start_time = datetime.now(timezone.utc)  # Set start time automatically
-    # Commit the changes.
-    db.commit()
+    user = await get_or_create_user(db, request.username)
+    # Atomically assign the task to the user and set the start time.
+    task = await claim_task(db, task_id, user.id, start=True)
+    # Notify connected clients.
+    publish_task(task, user.username)
     # Return success message.
     return {"message": "Task assigned and started"}
 
+# Define POST endpoint for claiming the next unclaimed task from the queue (highest priority, then oldest).
+@app.post("/claim_next", response_model=schemas.Task)
+async def claim_next(request: schemas.ClaimRequest, db: AsyncSession = Depends(get_db)):
+    # Get or create the user.
+    user = await get_or_create_user(db, request.username)
+    # Build the values to write, with a fresh lease; optionally start the task as well.
+    now = datetime.now(timezone.utc)
+    values = {"kept_by_user_id": user.id, "lease_expires_at": lease_deadline(now)}
+    if request.start:
+        values["start_time"] = now
+    # Pick the first task in queue order; on PostgreSQL rows locked by other claimers are skipped (ignored on SQLite).
+    oldest = (
+        select(models.Task.id)
+        .where(models.Task.kept_by_user_id.is_(None))
+        .order_by(models.Task.priority.desc(), models.Task.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    # Claim it in the same statement; the IS NULL re-check guards against a concurrent claim.
+    statement = (
+        update(models.Task)
+        .where(models.Task.id == oldest, models.Task.kept_by_user_id.is_(None))
+        .values(**values)
+        .returning(models.Task)
+        .execution_options(synchronize_session=False)
+    )
+    # Retry a few times if another worker won the same row between the pick and the update.
+    for _ in range(CLAIM_NEXT_ATTEMPTS):
+        task = (await db.execute(statement)).scalars().first()
+        if task is not None:
+            # Commit the claim, notify connected clients and return the task.
+            await db.commit()
+            publish_task(task, user.username)
+            return task
+        # Stop early once the queue is really empty.
+        if await db.scalar(select(models.Task.id).where(models.Task.kept_by_user_id.is_(None)).limit(1)) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Queue is empty")
+    # Every attempt lost a race; the client should try again.
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Queue is busy, try again")
+
+# Define a helper function that checks whether an action is allowed on a task, mirroring the single-task endpoints.
+def check_transition(action: str, task, user_id: int):
+    # If task not found, report 404.
+    if task is None:
+        return status.HTTP_404_NOT_FOUND, "Task not found"
+    # Keeping or assigning needs an unclaimed task.
+    if action in ("keep", "assign"):
+        if task.kept_by_user_id is not None:
+            return status.HTTP_400_BAD_REQUEST, "Task already taken"
+        return None
+    # Starting and stopping need the user's own task.
+    if task.kept_by_user_id != user_id:
+        return status.HTTP_403_FORBIDDEN, "Not your task"
+    # Starting needs a task that has not started.
+    if action == "start" and task.start_time is not None:
+        return status.HTTP_400_BAD_REQUEST, "Task already started"
+    # Stopping needs a running task.
+    if action == "stop":
+        if task.start_time is None:
+            return status.HTTP_400_BAD_REQUEST, "Task not started"
+        if task.stop_time is not None:
+            return status.HTTP_400_BAD_REQUEST, "Task already stopped"
+    # Allowed.
+    return None
+
+# Define the success message of each action, matching the single-task endpoints.
+ACTION_MESSAGES = {"keep": "Task kept", "assign": "Task assigned and started", "start": "Task started", "stop": "Task stopped"}
+
+# Define POST endpoint for applying many task actions for one user in a single transaction.
+@app.post("/tasks/batch", response_model=schemas.BatchResponse)
+async def batch_tasks(request: schemas.BatchRequest, db: AsyncSession = Depends(get_db)):
+    # Resolve the user once for the whole batch.
+    user = await get_or_create_user(db, request.username)
+    # Load every referenced task with a single IN query.
+    task_ids = {operation.task_id for operation in request.operations}
+    tasks = {task.id: task for task in (await db.scalars(select(models.Task).where(models.Task.id.in_(task_ids)))).all()}
+    # Use one timestamp for the whole batch.
+    now = datetime.now(timezone.utc)
+    # Track results, tasks claimed by this batch and tasks changed by it.
+    results = []
+    claimed_ids = set()
+    changed = {}
+    # Apply operations in order against the loaded state, so later operations see earlier ones.
+    for operation in request.operations:
+        task = tasks.get(operation.task_id)
+        # Reject operations the single-task endpoint would reject.
+        error = check_transition(operation.action, task, user.id)
+        if error is not None:
+            results.append(schemas.BatchResult(task_id=operation.task_id, action=operation.action, ok=False, status_code=error[0], detail=error[1]))
+            continue
+        # Apply the state change in memory; claiming or starting takes a fresh lease, stopping ends it.
+        if operation.action in ("keep", "assign"):
+            task.kept_by_user_id = user.id
+            claimed_ids.add(task.id)
+        if operation.action in ("assign", "start"):
+            task.start_time = now
+        if operation.action in ("keep", "assign", "start"):
+            task.lease_expires_at = lease_deadline(now)
+        if operation.action == "stop":
+            task.stop_time = now
+            task.lease_expires_at = None
+            # Add the completed task to the time-tracking rollups in the same transaction.
+            await record_completion(db, user.id, task.start_time, task.stop_time)
+        changed[task.id] = task
+        results.append(schemas.BatchResult(task_id=operation.task_id, action=operation.action, ok=True, status_code=status.HTTP_200_OK, detail=ACTION_MESSAGES[operation.action]))
+    # Claim every kept/assigned task in one conditional UPDATE, so a concurrent claimer cannot be overwritten.
+    if claimed_ids:
+        won = set((await db.scalars(
+            update(models.Task)
+            .where(models.Task.id.in_(claimed_ids), models.Task.kept_by_user_id.is_(None))
+            .values(kept_by_user_id=user.id)
+            .returning(models.Task.id)
+            .execution_options(synchronize_session=False)
+        )).all())
+        # Someone else claimed one of the tasks after we loaded it; nothing from this batch is applied.
+        if won != claimed_ids:
+            await db.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Tasks changed concurrently, retry the batch")
+    # Write every change with a single commit.
+    await db.commit()
+    # Notify connected clients of each changed task.
+    for task in changed.values():
+        publish_task(task, user.username if task.kept_by_user_id == user.id else None)
+    # Count outcomes.
+    succeeded = sum(1 for result in results if result.ok)
+    # Return per-item results and totals.
+    return schemas.BatchResponse(results=results, succeeded=succeeded, failed=len(results) - succeeded)
+
 # Define POST endpoint for starting a task.
 @app.post("/start/{task_id}")
-def start_task(task_id: int, request: schemas.ActionRequest, db: Session = Depends(get_db)):
+async def start_task(task_id: int, request: schemas.ActionRequest, db: AsyncSession = Depends(get_db)):
+    # Get or create the user first, since its rollback path would expire an already-loaded task.
+    user = await get_or_create_user(db, request.username)
     # Query the task by id.
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    task = await db.get(models.Task, task_id)
     # If task not found, raise 404 exception.
     if not task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    # Get or create the user.
-    user = get_or_create_user(db, request.username)
     # If not the user's task, raise 403 exception.
     if task.kept_by_user_id != user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your task")
     # If already started, raise 400 exception.
     if task.start_time is not None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Task already started")
-    # Set the start time to current UTC time.
+    # Set the start time to current UTC time, renewing the lease.
     task.start_time = datetime.now(timezone.utc)
+    task.lease_expires_at = lease_deadline(task.start_time)
     # Commit the changes.
-    db.commit()
+    await db.commit()
+    # Notify connected clients.
+    publish_task(task, user.username)
     # Return success message.
     return {"message": "Task started"}
 
 # Define POST endpoint for stopping a task.
 @app.post("/stop/{task_id}")
-def stop_task(task_id: int, request: schemas.ActionRequest, db: Session = Depends(get_db)):
+async def stop_task(task_id: int, request: schemas.ActionRequest, db: AsyncSession = Depends(get_db)):
+    # Get or create the user first, since its rollback path would expire an already-loaded task.
+    user = await get_or_create_user(db, request.username)
     # Query the task by id.
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    task = await db.get(models.Task, task_id)
     # If task not found, raise 404 exception.
     if not task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    # Get or create the user.
-    user = get_or_create_user(db, request.username)
     # If not the user's task, raise 403 exception.
     if task.kept_by_user_id != user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your task")
@@ -180,9 +514,136 @@ def stop_task(task_id: int, request: schemas.ActionRequest, db: Session = Depend
     # If already stopped, raise 400 exception.
     if task.stop_time is not None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Task already stopped")
-    # Set the stop time to current UTC time.
+    # Set the stop time to current UTC time; a finished task needs no lease.
     task.stop_time = datetime.now(timezone.utc)
+    task.lease_expires_at = None
+    # Add the completed task to the time-tracking rollups in the same transaction.
+    await record_completion(db, user.id, task.start_time, task.stop_time)
     # Commit the changes.
-    db.commit()
+    await db.commit()
+    # Notify connected clients.
+    publish_task(task, user.username)
     # Return success message.
-    return {"message": "Task stopped"}
\ No newline at end of file
+    return {"message": "Task stopped"}
+
+# Define POST endpoint for renewing the leases of all of a user's open claims (a heartbeat).
+@app.post("/renew", response_model=schemas.RenewResponse)
+async def renew_leases(request: schemas.ActionRequest, db: AsyncSession = Depends(get_db)):
+    # Get or create the user.
+    user = await get_or_create_user(db, request.username)
+    # Extend every unfinished task the user holds in one UPDATE, served from the (kept_by_user_id, id) index.
+    deadline = lease_deadline()
+    result = await db.execute(
+        update(models.Task)
+        .where(models.Task.kept_by_user_id == user.id, models.Task.stop_time.is_(None))
+        .values(lease_expires_at=deadline)
+        .execution_options(synchronize_session=False)
+    )
+    # Commit the new deadlines.
+    await db.commit()
+    # Return how many claims were renewed and until when.
+    return {"renewed": result.rowcount, "lease_expires_at": deadline}
+
+# Define a helper function that resolves an optional date range to concrete inclusive bounds.
+def stats_range(start: Optional[date], end: Optional[date]):
+    # Default to the last DEFAULT_STATS_DAYS days ending today (UTC).
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=DEFAULT_STATS_DAYS - 1)
+    # Reject inverted ranges.
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must not be after end")
+    return start, end
+
+# Define a helper function that builds a duration summary from rollup values and histogram counts.
+def summarize(completed, total_seconds, min_seconds, max_seconds, counts: dict) -> dict:
+    # Estimate percentiles from the histogram.
+    p50, p90, p99 = histogram_percentiles(counts)
+    # Return the summary fields.
+    return {
+        "completed": completed,
+        "total_seconds": total_seconds,
+        "avg_seconds": total_seconds / completed if completed else None,
+        "min_seconds": min_seconds,
+        "max_seconds": max_seconds,
+        "p50_seconds": p50,
+        "p90_seconds": p90,
+        "p99_seconds": p99,
+    }
+
+# Define GET endpoint for one user's time-tracking statistics.
+@app.get("/stats/users/{username}", response_model=schemas.UserStats)
+async def get_user_stats(username: str, start: Optional[date] = None, end: Optional[date] = None, db: AsyncSession = Depends(get_db)):
+    # Resolve the date range.
+    start, end = stats_range(start, end)
+    # Look up the user without creating one.
+    user = await db.scalar(select(models.User).filter(models.User.username == username))
+    # If user not found, raise 404 exception.
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    # Read the precomputed daily rows for the range.
+    stat = models.UserDailyStat
+    days = (await db.scalars(
+        select(stat).where(stat.user_id == user.id, stat.day >= start, stat.day <= end).order_by(stat.day)
+    )).all()
+    # Read the histogram buckets for the range.
+    histogram = models.DurationHistogram
+    buckets = (await db.execute(
+        select(histogram.day, histogram.bucket, histogram.count)
+        .where(histogram.user_id == user.id, histogram.day >= start, histogram.day <= end)
+    )).all()
+    # Group bucket counts per day and over the whole range.
+    per_day, overall = {}, {}
+    for day, bucket, count in buckets:
+        per_day.setdefault(day, {})[bucket] = count
+        overall[bucket] = overall.get(bucket, 0) + count
+    # Build the per-day summaries.
+    day_stats = [
+        {"day": d.day, **summarize(d.completed_count, d.total_seconds, d.min_seconds, d.max_seconds, per_day.get(d.day, {}))}
+        for d in days
+    ]
+    # Build the range totals from the daily rows.
+    totals = summarize(
+        sum(d.completed_count for d in days),
+        sum(d.total_seconds for d in days),
+        min((d.min_seconds for d in days), default=None),
+        max((d.max_seconds for d in days), default=None),
+        overall,
+    )
+    # Return the statistics.
+    return {"username": username, "totals": totals, "days": day_stats}
+
+# Define GET endpoint for per-day time-tracking statistics across all users.
+@app.get("/stats/daily", response_model=list[schemas.DailyStats])
+async def get_daily_stats(start: Optional[date] = None, end: Optional[date] = None, db: AsyncSession = Depends(get_db)):
+    # Resolve the date range.
+    start, end = stats_range(start, end)
+    # Sum the precomputed per-user rows for each day.
+    stat = models.UserDailyStat
+    days = (await db.execute(
+        select(
+            stat.day,
+            func.sum(stat.completed_count),
+            func.sum(stat.total_seconds),
+            func.min(stat.min_seconds),
+            func.max(stat.max_seconds),
+            func.count(stat.user_id),
+        )
+        .where(stat.day >= start, stat.day <= end)
+        .group_by(stat.day)
+        .order_by(stat.day)
+    )).all()
+    # Merge the histogram buckets for each day.
+    histogram = models.DurationHistogram
+    buckets = (await db.execute(
+        select(histogram.day, histogram.bucket, func.sum(histogram.count))
+        .where(histogram.day >= start, histogram.day <= end)
+        .group_by(histogram.day, histogram.bucket)
+    )).all()
+    per_day = {}
+    for day, bucket, count in buckets:
+        per_day.setdefault(day, {})[bucket] = count
+    # Return one summary per day.
+    return [
+        {"day": day, "active_users": users, **summarize(completed, total_seconds, min_seconds, max_seconds, per_day.get(day, {}))}
+        for day, completed, total_seconds, min_seconds, max_seconds, users in days
+    ]
@@ -1,5 +1,5 @@
 # Import necessary column types and functions from SQLAlchemy.
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Date, Float, Index, text
 # Import relationship from SQLAlchemy ORM for defining associations.
 from sqlalchemy.orm import relationship
 # Import the Base class from the database module.
@@ -35,6 +35,89 @@ class Task(Base):
     start_time = Column(DateTime(timezone=True), nullable=True)  # Start time, if started (aware)
     # Define the stop_time column as DateTime with timezone=True, nullable.
     stop_time = Column(DateTime(timezone=True), nullable=True)  # Stop time, if stopped (aware)
+    # Define the priority column; higher values are served first from the queue.
+    priority = Column(Integer, nullable=False, default=0, server_default=text("0"))  # Priority, 0 by default
+    # Define the lease_expires_at column; a claim not renewed by then returns to the queue.
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)  # Lease deadline, if claimed (aware)
 
     # Define a relationship to User model, back-populating the tasks field.
-    user = relationship("User", back_populates="tasks")  # Relationship to the user who kept it
\ No newline at end of file
+    user = relationship("User", back_populates="tasks")  # Relationship to the user who kept it
+
+    # Define the indexes behind /my_tasks and the lease sweeper (the /queue index follows the class).
+    __table_args__ = (
+        # Composite index for a user's tasks already in id order, so /my_tasks pages (any state) are read without sorting.
+        Index("ix_tasks_kept_by_user_id_id", "kept_by_user_id", "id"),
+        # Partial index over leased tasks only, in deadline order, so the sweeper reads just the expired ones.
+        Index(
+            "ix_tasks_lease_expires_at", "lease_expires_at",
+            sqlite_where=text("lease_expires_at IS NOT NULL"),
+            postgresql_where=text("lease_expires_at IS NOT NULL"),
+        ),
+    )
+
+# Define the index behind /queue and /claim_next: unclaimed tasks (kept_by_user_id IS NULL) form one prefix, already in
+# queue order (highest priority first, then oldest), so a page is read without sorting. Not partial: SQLite's planner
+# only reliably prefers it when the NULL equality matches an index column. Declared outside the class for the descending column.
+Index("ix_tasks_queue_order", Task.kept_by_user_id, Task.priority.desc(), Task.id)
+
+# Define the indexes earlier versions created that are now superseded, per table; the startup migration drops them.
+# The replacements are chosen by query plan: tests/test_query_plans.py checks that /queue, /my_tasks (in every state)
+# and the lease sweeper each read their index in order, without a temporary B-tree.
+DROPPED_INDEXES = {
+    # The partial unclaimed-task index in id order, replaced by ix_tasks_queue_order once /queue orders by priority:
+    # a partial index in id order cannot return a page in (priority desc, id) order without sorting.
+    # The (kept_by_user_id, start_time) index, replaced by ix_tasks_kept_by_user_id_id: its start_time order made /my_tasks sort.
+    "tasks": ["ix_tasks_unclaimed_id", "ix_tasks_kept_by_user_id_start_time"],
+}
+
+# Define the TaskEvent model: task changes relayed between worker processes (see events.EventRelay).
+class TaskEvent(Base):
+    # Set the table name for the TaskEvent model.
+    __tablename__ = "task_events"
+
+    # Define the id column as primary key.
+    id = Column(Integer, primary_key=True)
+    # Define the process that published the event; it has already delivered it to its own clients.
+    origin = Column(String, nullable=False)
+    # Define the event itself, as JSON.
+    payload = Column(String, nullable=False)
+    # Define when the event was written; workers read recent events and old ones are pruned.
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+# Define the UserDailyStat model holding completed-task totals per user per day.
+class UserDailyStat(Base):
+    # Set the table name for the UserDailyStat model.
+    __tablename__ = "user_daily_stats"
+
+    # Define the user id as part of the primary key.
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    # Define the UTC day the tasks were stopped on as part of the primary key.
+    day = Column(Date, primary_key=True)
+    # Define the number of tasks completed that day.
+    completed_count = Column(Integer, nullable=False, default=0)
+    # Define the total time worked on those tasks, in seconds.
+    total_seconds = Column(Float, nullable=False, default=0.0)
+    # Define the shortest task duration that day, in seconds.
+    min_seconds = Column(Float, nullable=True)
+    # Define the longest task duration that day, in seconds.
+    max_seconds = Column(Float, nullable=True)
+
+    # Define an index for date-range queries across all users.
+    __table_args__ = (Index("ix_user_daily_stats_day", "day"),)
+
+# Define the DurationHistogram model holding log-scaled duration bucket counts per user per day.
+class DurationHistogram(Base):
+    # Set the table name for the DurationHistogram model.
+    __tablename__ = "duration_histograms"
+
+    # Define the user id as part of the primary key.
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    # Define the UTC day as part of the primary key.
+    day = Column(Date, primary_key=True)
+    # Define the duration bucket as part of the primary key (see stats.duration_bucket).
+    bucket = Column(Integer, primary_key=True)
+    # Define the number of tasks whose duration fell in the bucket.
+    count = Column(Integer, nullable=False, default=0)
+
+    # Define an index for date-range queries across all users.
+    __table_args__ = (Index("ix_duration_histograms_day_bucket", "day", "bucket"),)
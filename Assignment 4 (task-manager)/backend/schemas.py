@@ -1,9 +1,9 @@
-# Import BaseModel from Pydantic for defining data models.
-from pydantic import BaseModel
-# Import Optional from typing for optional fields.
-from typing import Optional
-# Import datetime for handling date-time fields.
-from datetime import datetime
+# Import BaseModel and Field from Pydantic for defining data models.
+from pydantic import BaseModel, Field
+# Import Optional, List and Literal from typing for optional, list and enumerated fields.
+from typing import Optional, List, Literal
+# Import datetime and date for handling date-time and day fields.
+from datetime import datetime, date
 
 # Define UserBase model with username field.
 class UserBase(BaseModel):
@@ -30,10 +30,10 @@ class TaskBase(BaseModel):
     # Specify the title as a string.
     title: str
 
-# Define TaskCreate model inheriting from TaskBase (no additional fields).
+# Define TaskCreate model inheriting from TaskBase.
 class TaskCreate(TaskBase):
-    # Pass to indicate no new fields.
-    pass
+    # Specify the priority; higher values are served first.
+    priority: int = 0
 
 # Define Task model inheriting from TaskBase.
 class Task(TaskBase):
@@ -45,6 +45,10 @@ class Task(TaskBase):
     start_time: Optional[datetime] = None
     # Add stop_time as optional datetime.
     stop_time: Optional[datetime] = None
+    # Add priority as integer.
+    priority: int = 0
+    # Add lease_expires_at as optional datetime.
+    lease_expires_at: Optional[datetime] = None
 
     # Inner Config class for model settings.
     class Config:
@@ -54,4 +58,93 @@ class Task(TaskBase):
 # Define ActionRequest model for action payloads.
 class ActionRequest(BaseModel):
     # Specify the username as a string.
-    username: str  # Username sent in body for actions
\ No newline at end of file
+    username: str  # Username sent in body for actions
+
+# Define RenewResponse model for lease renewals.
+class RenewResponse(BaseModel):
+    # Number of the user's open claims renewed.
+    renewed: int
+    # New deadline of those claims.
+    lease_expires_at: datetime
+
+# Define ClaimRequest model for claiming the next task from the queue.
+class ClaimRequest(ActionRequest):
+    # Whether to start the task immediately (like assign) instead of only keeping it.
+    start: bool = False
+
+# Define the largest number of operations accepted in one batch.
+MAX_BATCH_OPERATIONS = 1000
+
+# Define BatchOperation model for one action inside a batch.
+class BatchOperation(BaseModel):
+    # Specify the action to perform.
+    action: Literal["keep", "assign", "start", "stop"]
+    # Specify the task the action applies to.
+    task_id: int
+
+# Define BatchRequest model for applying many actions for one user.
+class BatchRequest(BaseModel):
+    # Specify the username performing every operation.
+    username: str
+    # Specify the operations, applied in order.
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=MAX_BATCH_OPERATIONS)
+
+# Define BatchResult model for the outcome of one operation.
+class BatchResult(BaseModel):
+    # Echo the task id.
+    task_id: int
+    # Echo the action.
+    action: str
+    # Whether the operation was applied.
+    ok: bool
+    # HTTP status the single-task endpoint would have returned.
+    status_code: int
+    # Success message or error detail.
+    detail: str
+
+# Define BatchResponse model for the whole batch.
+class BatchResponse(BaseModel):
+    # Per-operation results, in request order.
+    results: List[BatchResult]
+    # Number of operations applied.
+    succeeded: int
+    # Number of operations rejected.
+    failed: int
+
+# Define DurationSummary model with completed-task duration statistics.
+class DurationSummary(BaseModel):
+    # Number of completed tasks.
+    completed: int
+    # Total time worked, in seconds.
+    total_seconds: float
+    # Mean task duration, in seconds.
+    avg_seconds: Optional[float] = None
+    # Shortest task duration, in seconds.
+    min_seconds: Optional[float] = None
+    # Longest task duration, in seconds.
+    max_seconds: Optional[float] = None
+    # Approximate percentiles from the duration histogram, in seconds.
+    p50_seconds: Optional[float] = None
+    p90_seconds: Optional[float] = None
+    p99_seconds: Optional[float] = None
+
+# Define UserDayStats model for one user's statistics on one day.
+class UserDayStats(DurationSummary):
+    # The UTC day.
+    day: date
+
+# Define UserStats model for one user's statistics over a date range.
+class UserStats(BaseModel):
+    # The username.
+    username: str
+    # Totals over the whole range.
+    totals: DurationSummary
+    # Per-day breakdown, oldest first.
+    days: List[UserDayStats]
+
+# Define DailyStats model for all users' statistics on one day.
+class DailyStats(DurationSummary):
+    # The UTC day.
+    day: date
+    # Number of users who completed at least one task that day.
+    active_users: int
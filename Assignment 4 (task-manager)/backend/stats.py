@@ -0,0 +1,98 @@
+# Import math for the logarithmic duration buckets.
+import math
+# Import datetime and timezone for normalizing timestamps.
+from datetime import datetime, timezone
+# Import case for portable min/max in upserts, and select for queries.
+from sqlalchemy import case, select
+# Import the dialect-specific INSERT ... ON CONFLICT constructs.
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+# Import AsyncSession for type hints.
+from sqlalchemy.ext.asyncio import AsyncSession
+# Import models module for the rollup tables.
+import models
+
+# Define how many histogram buckets cover each doubling of duration (about 19% resolution).
+BUCKETS_PER_DOUBLING = 4
+
+# Define a helper function that treats naive timestamps (as SQLite returns them) as UTC.
+def as_utc(value: datetime) -> datetime:
+    # Attach UTC to naive values, convert aware ones.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+# Define a helper function that maps a duration to its histogram bucket.
+def duration_bucket(seconds: float) -> int:
+    # Log-scaled so the histogram stays small for any duration.
+    return int(math.floor(BUCKETS_PER_DOUBLING * math.log2(max(seconds, 0.0) + 1)))
+
+# Define a helper function that returns the upper bound of a histogram bucket, in seconds.
+def bucket_upper_bound(bucket: int) -> float:
+    # Inverse of duration_bucket at the top edge of the bucket.
+    return 2 ** ((bucket + 1) / BUCKETS_PER_DOUBLING) - 1
+
+# Define a helper function that estimates percentiles from bucket counts.
+def histogram_percentiles(counts: dict, quantiles=(0.5, 0.9, 0.99)) -> list:
+    # Total number of samples.
+    total = sum(counts.values())
+    # No samples, no percentiles.
+    if total == 0:
+        return [None] * len(quantiles)
+    # Walk the buckets in order once, answering each quantile as the running count passes it.
+    results = []
+    buckets = sorted(counts)
+    index = 0
+    running = counts[buckets[0]]
+    for q in quantiles:
+        # Advance until at least q of the samples are covered.
+        while running < q * total and index + 1 < len(buckets):
+            index += 1
+            running += counts[buckets[index]]
+        results.append(bucket_upper_bound(buckets[index]))
+    return results
+
+# Define a helper function that picks the INSERT construct with ON CONFLICT support for the session's database.
+def _insert_for(db: AsyncSession):
+    # PostgreSQL and SQLite share the same on_conflict_do_update API.
+    return postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+# Define a function that adds one completed task to the rollups, inside the caller's transaction.
+async def record_completion(db: AsyncSession, user_id: int, start_time: datetime, stop_time: datetime):
+    # Compute the task duration and the day it counts towards.
+    seconds = (as_utc(stop_time) - as_utc(start_time)).total_seconds()
+    day = as_utc(stop_time).date()
+    insert = _insert_for(db)
+    # Upsert the per-user daily totals.
+    stat = models.UserDailyStat
+    statement = insert(stat).values(user_id=user_id, day=day, completed_count=1, total_seconds=seconds, min_seconds=seconds, max_seconds=seconds)
+    statement = statement.on_conflict_do_update(
+        index_elements=[stat.user_id, stat.day],
+        set_={
+            "completed_count": stat.completed_count + 1,
+            "total_seconds": stat.total_seconds + statement.excluded.total_seconds,
+            "min_seconds": case((statement.excluded.min_seconds < stat.min_seconds, statement.excluded.min_seconds), else_=stat.min_seconds),
+            "max_seconds": case((statement.excluded.max_seconds > stat.max_seconds, statement.excluded.max_seconds), else_=stat.max_seconds),
+        },
+    )
+    await db.execute(statement)
+    # Upsert the duration histogram bucket.
+    histogram = models.DurationHistogram
+    statement = insert(histogram).values(user_id=user_id, day=day, bucket=duration_bucket(seconds), count=1)
+    statement = statement.on_conflict_do_update(
+        index_elements=[histogram.user_id, histogram.day, histogram.bucket],
+        set_={"count": histogram.count + 1},
+    )
+    await db.execute(statement)
+
+# Define a function that builds the rollups from existing completed tasks when they have never been built.
+async def backfill_rollups(db: AsyncSession):
+    # Nothing to do once any rollup row exists.
+    if await db.scalar(select(models.UserDailyStat.user_id).limit(1)) is not None:
+        return
+    # Stream completed tasks instead of loading them all at once.
+    completed = await db.stream_scalars(
+        select(models.Task).where(models.Task.stop_time.is_not(None), models.Task.kept_by_user_id.is_not(None))
+    )
+    async for task in completed:
+        await record_completion(db, task.kept_by_user_id, task.start_time, task.stop_time)
+    # Commit the backfilled rollups.
+    await db.commit()
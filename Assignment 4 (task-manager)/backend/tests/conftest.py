@@ -0,0 +1,18 @@
+# Import os and sys for pointing the backend at a throwaway database before it is imported.
+import os
+import sys
+# Import tempfile for the per-run database directory.
+import tempfile
+
+# Define a directory for this test run's SQLite database and startup lock files.
+TEST_DIR = tempfile.mkdtemp(prefix="task-manager-tests-")
+
+# Point the backend at a fresh SQLite file; database.py reads this at import time.
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+# Run as a single process: no relay between workers.
+os.environ["EVENT_RELAY"] = "0"
+# Keep the background sweeper out of the way; the tests run the sweep themselves.
+os.environ["LEASE_SWEEP_SECONDS"] = "3600"
+
+# Make the backend modules importable the way uvicorn imports them (main, models, database, ...).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,137 @@
+# Tests for claim races: concurrent /keep, /claim_next and /tasks/batch requests for the same tasks.
+# Requests run concurrently on the app's own event loop; a lost race is forced where SQLite would never produce one.
+
+# Import asyncio for sending requests concurrently.
+import asyncio
+# Import itertools for unique usernames and task titles.
+import itertools
+# Import pytest for fixtures.
+import pytest
+# Import httpx to send concurrent requests through the app's ASGI interface.
+import httpx
+# Import event and text for injecting a concurrent claim and reading task rows.
+from sqlalchemy import event, text
+# Import the FastAPI test client.
+from fastapi.testclient import TestClient
+# Import the application and its models.
+import main
+import models
+# Import the engines: the async one serves requests, the sync one plays the rival worker.
+from database import engine, async_engine
+
+# Define a counter for names that no other test uses.
+names = itertools.count()
+
+# Define a module-wide client whose startup has created the schema.
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+# Define a helper function that creates unclaimed tasks ahead of everything else in the queue and returns their ids.
+def create_tasks(client, count: int, priority: int = 1000) -> list:
+    ids = []
+    for _ in range(count):
+        response = client.post("/tasks", json={"title": f"Race task {next(names)}", "priority": priority})
+        assert response.status_code == 201
+        ids.append(response.json()["id"])
+    return ids
+
+# Define a helper function that returns the user id keeping a task (None if unclaimed).
+def keeper_of(task_id: int):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT kept_by_user_id FROM tasks WHERE id = :id"), {"id": task_id}).scalar()
+
+# Define a helper function that sends requests concurrently on the app's event loop and returns the responses in order.
+def send_concurrently(client, requests: list) -> list:
+    async def send():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(http.post(url, json=body) for url, body in requests))
+    return client.portal.call(send)
+
+# Define a helper function that runs `before` just before each matching statement the app sends, and returns a function that stops it.
+def listen_before(marker: str, before):
+    def hook(conn, cursor, statement, parameters, context, executemany):
+        if marker in statement:
+            return before(statement, parameters)
+        return statement, parameters
+    event.listen(async_engine.sync_engine, "before_cursor_execute", hook, retval=True)
+    return lambda: event.remove(async_engine.sync_engine, "before_cursor_execute", hook)
+
+# Check concurrent /keep requests for one task: exactly one wins, the others are told it is taken.
+def test_concurrent_keep_has_one_winner(client):
+    (task_id,) = create_tasks(client, 1)
+    users = [f"keeper{next(names)}" for _ in range(8)]
+    responses = send_concurrently(client, [(f"/keep/{task_id}", {"username": user}) for user in users])
+    statuses = [response.status_code for response in responses]
+    assert statuses.count(200) == 1, statuses
+    assert all(response.json()["detail"] == "Task already taken" for response in responses if response.status_code != 200)
+    # The task belongs to the winner.
+    winner = users[statuses.index(200)]
+    mine = client.get("/my_tasks", params={"username": winner}).json()
+    assert [task["id"] for task in mine] == [task_id]
+
+# Check concurrent /claim_next requests each get a different task.
+def test_concurrent_claim_next_gives_distinct_tasks(client):
+    task_ids = create_tasks(client, 6, priority=2000)
+    responses = send_concurrently(client, [("/claim_next", {"username": f"claimer{next(names)}"}) for _ in task_ids])
+    assert [response.status_code for response in responses] == [200] * len(task_ids)
+    claimed = [response.json()["id"] for response in responses]
+    assert sorted(claimed) == sorted(task_ids)
+
+# Check /claim_next gives up with 409 when every attempt loses its race, and claims nothing.
+def test_claim_next_returns_409_when_every_attempt_loses(client):
+    (task_id,) = create_tasks(client, 1, priority=3000)
+    attempts = []
+    # On PostgreSQL another worker can claim the picked row between the pick and the update; force that on every attempt.
+    def lose_race(statement, parameters):
+        attempts.append(statement)
+        return statement.replace("kept_by_user_id IS NULL RETURNING", "kept_by_user_id IS NULL AND 0 RETURNING"), parameters
+    stop = listen_before("UPDATE tasks", lose_race)
+    try:
+        response = client.post("/claim_next", json={"username": f"claimer{next(names)}"})
+    finally:
+        stop()
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Queue is busy, try again"
+    assert len(attempts) == main.CLAIM_NEXT_ATTEMPTS
+    assert keeper_of(task_id) is None
+
+# Check a batch that loses a claim race to another worker is rejected with 409 and applies none of its operations.
+def test_batch_lost_race_applies_nothing(client):
+    first, second = create_tasks(client, 2)
+    with engine.begin() as conn:
+        rival_id = conn.execute(models.User.__table__.insert().values(username=f"rival{next(names)}")).inserted_primary_key[0]
+    # Another worker claims the second task after the batch has loaded it, just before the batch claims it.
+    def rival_claims(statement, parameters):
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE tasks SET kept_by_user_id = :user WHERE id = :id"), {"user": rival_id, "id": second})
+        return statement, parameters
+    stop = listen_before("kept_by_user_id IS NULL RETURNING", rival_claims)
+    try:
+        response = client.post("/tasks/batch", json={"username": f"batcher{next(names)}", "operations": [
+            {"action": "keep", "task_id": first},
+            {"action": "assign", "task_id": second},
+        ]})
+    finally:
+        stop()
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Tasks changed concurrently, retry the batch"
+    # Nothing from the batch was applied; the rival keeps its task.
+    assert keeper_of(first) is None
+    assert keeper_of(second) == rival_id
+
+# Check a batch applies what it can and reports the rest per operation, like the single-task endpoints.
+def test_batch_reports_rejected_operations(client):
+    free, taken = create_tasks(client, 2)
+    assert client.post(f"/keep/{taken}", json={"username": f"other{next(names)}"}).status_code == 200
+    response = client.post("/tasks/batch", json={"username": f"batcher{next(names)}", "operations": [
+        {"action": "keep", "task_id": free},
+        {"action": "keep", "task_id": taken},
+        {"action": "start", "task_id": free},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert [(result["ok"], result["status_code"]) for result in body["results"]] == [(True, 200), (False, 400), (True, 200)]
+    assert (body["succeeded"], body["failed"]) == (2, 1)
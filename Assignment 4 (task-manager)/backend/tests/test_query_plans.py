@@ -0,0 +1,127 @@
+# Tests that the hot task queries are served from their indexes, in order, without a sort.
+# Each test captures the SQL an endpoint actually sends and asks SQLite for its EXPLAIN QUERY PLAN.
+
+# Import contextmanager for the statement capture.
+from contextlib import contextmanager
+# Import datetime helpers for seeding leases.
+from datetime import datetime, timedelta, timezone
+# Import pytest for fixtures and parametrization.
+import pytest
+# Import event and text for capturing statements and running ANALYZE.
+from sqlalchemy import event, text
+# Import the FastAPI test client.
+from fastapi.testclient import TestClient
+# Import the application and its models.
+import main
+import models
+# Import the engines (the async one serves requests, the sync one runs EXPLAIN) and the startup migration.
+from database import engine, async_engine, AsyncSessionLocal, add_missing_columns
+# Import the sweep run by the background sweeper.
+from leases import reclaim_expired
+
+# Define how many users and tasks to seed; enough that the planner's choices matter.
+USERS = 50
+TASKS = 5000
+
+# Define a module-wide client whose startup has created the schema, with a realistic mix of tasks and fresh statistics.
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        now = datetime.now(timezone.utc)
+        with engine.begin() as conn:
+            # Seed users, then tasks: some unclaimed, the rest kept by a user and unstarted, running or done.
+            conn.execute(models.User.__table__.insert(), [{"username": f"user{i}"} for i in range(USERS)])
+            user_ids = [row[0] for row in conn.execute(text("SELECT id FROM users ORDER BY id"))]
+            tasks = []
+            for i in range(TASKS):
+                task = {"title": f"Task {i}", "priority": i % 5, "kept_by_user_id": None, "start_time": None,
+                        "stop_time": None, "lease_expires_at": None}
+                if i % 4:
+                    task["kept_by_user_id"] = user_ids[i % len(user_ids)]
+                    task["lease_expires_at"] = now + timedelta(hours=1)
+                    if i % 4 >= 2:
+                        task["start_time"] = now - timedelta(hours=2)
+                    if i % 4 == 3:
+                        task["stop_time"] = now - timedelta(hours=1)
+                        task["lease_expires_at"] = None
+                tasks.append(task)
+            conn.execute(models.Task.__table__.insert(), tasks)
+            # Gather statistics, as a long-running database would have them.
+            conn.execute(text("ANALYZE"))
+        yield client
+
+# Define a context manager that records every statement the request handlers send.
+@contextmanager
+def captured_statements():
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+# Define a helper function that returns the last captured statement containing the given text.
+def last_statement(statements, marker: str):
+    matching = [entry for entry in statements if marker in entry[0]]
+    assert matching, f"no statement containing {marker!r} was sent"
+    return matching[-1]
+
+# Define a helper function that returns the detail lines of a statement's query plan.
+def query_plan(statement: str, parameters) -> list:
+    with engine.connect() as conn:
+        return [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+# Define a helper function that asserts a plan reads the named index and never sorts.
+def assert_index_without_sort(plan: list, index: str):
+    assert any(f"INDEX {index} " in line for line in plan), plan
+    assert not any("TEMP B-TREE" in line for line in plan), plan
+
+# Check /queue pages, in every state, come from the queue-order index.
+@pytest.mark.parametrize("state", [None, "unstarted", "running", "done"])
+def test_queue_uses_queue_order_index(client, state):
+    params = {"limit": 20} if state is None else {"limit": 20, "state": state}
+    with captured_statements() as statements:
+        assert client.get("/queue", params=params).status_code == 200
+    plan = query_plan(*last_statement(statements, "FROM tasks"))
+    assert_index_without_sort(plan, "ix_tasks_queue_order")
+
+# Check a later /queue page, with its (priority, id) keyset, still reads the index in order.
+def test_queue_next_page_uses_queue_order_index(client):
+    first = client.get("/queue", params={"limit": 20})
+    with captured_statements() as statements:
+        assert client.get("/queue", params={"limit": 20, "cursor": first.headers["X-Next-Cursor"]}).status_code == 200
+    plan = query_plan(*last_statement(statements, "FROM tasks"))
+    assert_index_without_sort(plan, "ix_tasks_queue_order")
+
+# Check /my_tasks pages, in every state, come from the per-user index in id order.
+@pytest.mark.parametrize("state", [None, "unstarted", "running", "done"])
+def test_my_tasks_uses_user_index(client, state):
+    params = {"username": "user3", "limit": 20} if state is None else {"username": "user3", "limit": 20, "state": state}
+    with captured_statements() as statements:
+        assert client.get("/my_tasks", params=params).status_code == 200
+    plan = query_plan(*last_statement(statements, "FROM tasks"))
+    assert_index_without_sort(plan, "ix_tasks_kept_by_user_id_id")
+
+# Check the lease sweeper picks expired claims from the partial lease index, in deadline order.
+def test_sweeper_uses_lease_index(client):
+    async def sweep():
+        async with AsyncSessionLocal() as db:
+            return await reclaim_expired(db)
+    with captured_statements() as statements:
+        client.portal.call(sweep)
+    plan = query_plan(*last_statement(statements, "lease_expires_at <="))
+    assert_index_without_sort(plan, "ix_tasks_lease_expires_at")
+
+# Check the startup migration drops the indexes earlier versions created and keeps the current ones.
+def test_superseded_indexes_are_dropped(client):
+    # Recreate the indexes an older database would still have.
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX ix_tasks_unclaimed_id ON tasks (id) WHERE kept_by_user_id IS NULL"))
+        conn.execute(text("CREATE INDEX ix_tasks_kept_by_user_id_start_time ON tasks (kept_by_user_id, start_time)"))
+    add_missing_columns(models.Base.metadata, models.DROPPED_INDEXES)
+    with engine.connect() as conn:
+        names = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tasks'"))}
+    assert names.isdisjoint(models.DROPPED_INDEXES["tasks"])
+    assert {"ix_tasks_queue_order", "ix_tasks_kept_by_user_id_id", "ix_tasks_lease_expires_at"} <= names
@@ -0,0 +1,49 @@
+# Import os for environment variable access.
+import os
+# Import OrderedDict to keep entries in least-recently-used order.
+from collections import OrderedDict
+
+# Define the maximum number of usernames remembered per process.
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+# Define a bounded, process-local cache of username -> user id.
+# Users are never renamed or deleted, so a cached id stays valid; only committed rows are ever cached.
+class UserCache:
+    # Initialize an empty cache.
+    def __init__(self, max_entries: int = USER_CACHE_MAX_ENTRIES):
+        # Store the eviction threshold.
+        self.max_entries = max_entries
+        # Store username -> id, oldest first.
+        self.entries = OrderedDict()
+        # Count lookups answered from memory and lookups that went to the database.
+        self.hits = 0
+        self.misses = 0
+
+    # Look up a username, returning its id or None.
+    def get(self, username: str):
+        # Fetch the id if present.
+        user_id = self.entries.get(username)
+        # Record a miss.
+        if user_id is None:
+            self.misses += 1
+            return None
+        # Mark the entry most recently used and record a hit.
+        self.entries.move_to_end(username)
+        self.hits += 1
+        return user_id
+
+    # Remember the id of a committed user.
+    def put(self, username: str, user_id: int):
+        # Insert or refresh the entry.
+        self.entries[username] = user_id
+        self.entries.move_to_end(username)
+        # Evict from the cold end once over the bound.
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    # Forget every entry.
+    def clear(self):
+        self.entries.clear()
+
+# Define the shared cache used by the application (the event loop is single-threaded, so no lock).
+user_cache = UserCache()
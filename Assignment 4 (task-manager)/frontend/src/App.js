@@ -5,10 +5,16 @@ import Queue from './Queue';
 // Import MyTasks component.
 import MyTasks from './MyTasks';
 // Import API functions.
-import { getQueue, getMyTasks, keepTask, assignTask, startTask, stopTask } from './api';
+import { getQueue, getMyTasks, keepTask, assignTask, startTask, stopTask, renewLeases, subscribeToTaskEvents } from './api';
 // Import CSS for styling.
 import './App.css';  // Optional styling
 
+// Define how often the user's claims are renewed while the app is open (well inside the server's lease).
+const LEASE_RENEW_MS = 5 * 60 * 1000;
+
+// Define the queue order the server uses: highest priority first, then oldest.
+const byQueueOrder = (a, b) => (b.priority - a.priority) || (a.id - b.id);
+
 // Define the main App component.
 function App() {
   // State for username input.
@@ -35,17 +41,48 @@ function App() {
     }
   };
 
-  // Use effect for polling data.
+  // Define function to apply one task change pushed by the server.
+  const applyTaskEvent = (event) => {
+    // Server asked for a full refresh (we fell behind).
+    if (event.type === 'resync') {
+      fetchData();
+      return;
+    }
+    // Ignore anything we do not understand.
+    if (event.type !== 'task_updated') return;
+    const task = event.task;
+    // Replace the task in a list if present, otherwise append it.
+    const upsert = (tasks) => tasks.some(t => t.id === task.id)
+      ? tasks.map(t => (t.id === task.id ? task : t))
+      : [...tasks, task];
+    // A kept task leaves the queue; an unkept one (e.g. released or expired) returns to it, in queue order.
+    setQueueTasks(prev => task.kept_by_user_id === null ? upsert(prev).sort(byQueueOrder) : prev.filter(t => t.id !== task.id));
+    // Only our own tasks belong in My Tasks.
+    setMyTasks(prev => event.kept_by === username ? upsert(prev) : prev.filter(t => t.id !== task.id));
+  };
+
+  // Use effect for live updates pushed by the server.
   useEffect(() => {
-    // Initial data fetch.
-    fetchData();  // Initial fetch
-    // Set interval for polling every 5 seconds.
-    const interval = setInterval(fetchData, 5000);  // Poll every 5s
-    // Return cleanup function to clear interval.
-    return () => clearInterval(interval);  // Cleanup
+    // Only subscribe once logged in.
+    if (!isLoggedIn) return;
+    // Fetch the full state whenever the stream (re)connects, then apply changes as they arrive.
+    const unsubscribe = subscribeToTaskEvents(applyTaskEvent, fetchData);
+    // Return cleanup function to close the stream.
+    return unsubscribe;  // Cleanup
   // Dependencies: re-run if isLoggedIn or username changes.
   }, [isLoggedIn, username]);
 
+  // Use effect for keeping the user's claims alive while the app is open.
+  useEffect(() => {
+    // Only renew once logged in.
+    if (!isLoggedIn) return;
+    // Renew now and then periodically; claims of users who leave expire and return to the queue.
+    renewLeases(username);
+    const timer = setInterval(() => renewLeases(username), LEASE_RENEW_MS);
+    // Return cleanup function to stop renewing.
+    return () => clearInterval(timer);
+  }, [isLoggedIn, username]);
+
   // Define function to handle actions.
   const handleAction = async (actionType, taskId) => {
     // If no username, return early.
@@ -81,8 +118,7 @@ function App() {
         // Break switch.
         break;
     }
-    // Refetch data after action.
-    fetchData();  // Refetch immediately after action for instant update
+    // No refetch needed: the change arrives on the event stream.
   };
 
   // Define function to handle username submission.
@@ -96,8 +132,7 @@ function App() {
       // Clear any old data.
       setQueueTasks([]);
       setMyTasks([]);
-      // Fetch fresh data after login.
-      setTimeout(fetchData, 500);  // Small delay to ensure state updates
+      // Fresh data is fetched when the event stream connects.
     }
   };
 
@@ -16,6 +16,7 @@ const Queue = ({ tasks, username, onAction }) => {
             {tasks.map(task => (
                 <li key={task.id} className="task-item">
                 <strong>{task.title}</strong>
+                <span className="badge priority">P{task.priority}</span>
 
                 <div className="actions">
                     <button
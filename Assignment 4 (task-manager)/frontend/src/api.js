@@ -41,6 +41,20 @@ export const getMyTasks = async (username) => {
   }
 };
 
+// Define function to subscribe to live task changes over Server-Sent Events.
+export const subscribeToTaskEvents = (onEvent, onOpen) => {
+  // Open the event stream.
+  const source = new EventSource(`${API_BASE_URL}/events`);
+  // Called on connect and on every automatic reconnect.
+  source.onopen = onOpen;
+  // Parse each message and hand it to the caller.
+  source.onmessage = (message) => onEvent(JSON.parse(message.data));
+  // Log errors; EventSource reconnects by itself.
+  source.onerror = () => console.error('Task event stream interrupted, reconnecting...');
+  // Return a function that closes the stream.
+  return () => source.close();
+};
+
 // (Keep the rest of the functions the same — keepTask, assignTask, etc.)
 export const keepTask = async (taskId, username) => {
   try {
@@ -66,6 +80,14 @@ export const startTask = async (taskId, username) => {
   }
 };
 
+export const renewLeases = async (username) => {
+  try {
+    await axios.post(`${API_BASE_URL}/renew`, { username });
+  } catch (error) {
+    console.error('Error renewing leases:', error.message);
+  }
+};
+
 export const stopTask = async (taskId, username) => {
   try {
     await axios.post(`${API_BASE_URL}/stop/${taskId}`, { username });
@@ -0,0 +1,224 @@
+# Import os for paths and environment variable access.
+import os
+# Import json for serializing cache entries.
+import json
+# Import threading for a lock shared by request threads.
+import threading
+# Import time for entry expiry.
+import time
+# Import logging for reporting failed invalidation polls.
+import logging
+# Import datetime for reading the invalidation log by age.
+from datetime import datetime, timedelta
+# Import OrderedDict to keep entries in least-recently-used order.
+from collections import OrderedDict
+# Import the session factory and the invalidation log shared by all worker processes.
+from database import SessionLocal
+from models import CacheInvalidation
+
+# Directory for cache entries that survive restarts.
+CACHE_DIR = os.getenv("CACHE_DIR", "./cache")
+# Memory budget for the in-process LRU, in bytes of serialized entries.
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Maximum number of verified tokens kept in memory.
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# Longest time a verified token is trusted without re-checking the user, in seconds.
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+# How often each worker process reads the invalidation log, in seconds; bounds how long another worker's change goes unseen.
+INVALIDATION_POLL_SECONDS = float(os.getenv("INVALIDATION_POLL_SECONDS", "1"))
+# How far back each poll re-reads, in seconds, so entries committed late (e.g. out of id order on PostgreSQL) are not missed.
+INVALIDATION_OVERLAP_SECONDS = float(os.getenv("INVALIDATION_OVERLAP_SECONDS", "5"))
+# How long invalidation entries are kept before being pruned, in seconds.
+INVALIDATION_RETENTION_SECONDS = int(os.getenv("INVALIDATION_RETENTION_SECONDS", "3600"))
+
+# Create the module logger.
+logger = logging.getLogger(__name__)
+
+# Size-bounded least-recently-used cache of JSON-serializable values.
+class LRUCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes  # Eviction threshold.
+        self.entries = OrderedDict()  # key -> (value, size); oldest first.
+        self.size = 0  # Total size of cached entries.
+        self.evictions = 0  # Entries dropped to stay under max_bytes.
+        self.lock = threading.Lock()  # Requests run on several threads.
+
+    # Look up a key, marking it most recently used.
+    def get(self, key: str):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)  # Now the most recently used.
+            return self.entries[key][0]
+
+    # Insert or replace a key, evicting the least recently used entries if over budget.
+    def put(self, key: str, value, size: int):
+        with self.lock:
+            if key in self.entries:  # Replace the old entry.
+                self.size -= self.entries.pop(key)[1]
+            if size > self.max_bytes:  # Would evict everything else and still not fit.
+                return
+            self.entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:  # Evict from the cold end.
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    # Remove a key if present.
+    def discard(self, key: str):
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+
+# Two-level forecast cache keyed by the SHA-256 of the uploaded file: memory LRU over JSON files on disk.
+class ForecastCache:
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory  # On-disk store.
+        self.memory = LRUCache(max_bytes)  # Hot entries.
+        self.hits = 0  # Lookups answered from memory.
+        self.disk_hits = 0  # Lookups answered from disk (and promoted to memory).
+        self.misses = 0  # Lookups that needed a full run.
+
+    # Path of the on-disk entry for a content hash.
+    def _path(self, content_hash: str) -> str:
+        return os.path.join(self.directory, f"{content_hash}.json")
+
+    # Look up a content hash, returning the cached entry or None.
+    def get(self, content_hash: str):
+        entry = self.memory.get(content_hash)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        try:
+            with open(self._path(content_hash)) as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        entry = json.loads(data)
+        self.memory.put(content_hash, entry, len(data))  # Promote to memory.
+        self.disk_hits += 1
+        return entry
+
+    # Store an entry in memory and on disk.
+    def put(self, content_hash: str, entry: dict):
+        data = json.dumps(entry)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self._path(content_hash)}.{os.getpid()}.tmp"  # Workers may write concurrently.
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(content_hash))  # Atomic publish.
+        self.memory.put(content_hash, entry, len(data))
+
+    # Drop an entry, e.g. once its dataset has changed.
+    def discard(self, content_hash: str):
+        self.memory.discard(content_hash)
+        try:
+            os.remove(self._path(content_hash))
+        except FileNotFoundError:
+            pass
+
+    # Counters for monitoring.
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self.memory.entries),
+            "bytes": self.memory.size,
+            "max_bytes": self.memory.max_bytes,
+            "evictions": self.memory.evictions,
+        }
+
+# Bounded cache of verified bearer tokens -> user, expiring with the token.
+class PrincipalCache:
+    def __init__(self, max_entries: int = AUTH_CACHE_MAX_ENTRIES, ttl_seconds: int = AUTH_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries  # Eviction threshold.
+        self.ttl_seconds = ttl_seconds  # Upper bound on how stale a cached user can be.
+        self.entries = OrderedDict()  # token -> (user, expires_at); least recently used first.
+        self.hits = 0  # Requests authenticated without the database.
+        self.misses = 0  # Requests that decoded the token and queried the user.
+        self.lock = threading.Lock()  # Requests run on several threads.
+
+    # Look up a token, returning the cached user or None if absent or expired.
+    def get(self, token: str):
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is None or entry[1] <= time.time():  # Unknown or expired.
+                self.entries.pop(token, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(token)  # Now the most recently used.
+            self.hits += 1
+            return entry[0]
+
+    # Cache a verified token until the earlier of its exp claim and the TTL.
+    def put(self, token: str, user, exp: float):
+        with self.lock:
+            self.entries[token] = (user, min(exp, time.time() + self.ttl_seconds))
+            self.entries.move_to_end(token)
+            while len(self.entries) > self.max_entries:  # Evict from the cold end.
+                self.entries.popitem(last=False)
+
+    # Drop every cached token for a user, e.g. after their role changes.
+    def invalidate_email(self, email: str):
+        with self.lock:
+            for token in [t for t, (user, _) in self.entries.items() if user.email == email]:
+                del self.entries[token]
+
+# Process-wide forecast cache.
+forecast_cache = ForecastCache()
+# Process-wide token cache used by get_current_user.
+principal_cache = PrincipalCache()
+
+# Function to drop an entry from this process's caches; applying the same invalidation twice is harmless.
+def apply_invalidation(cache: str, key: str):
+    if cache == "forecast":
+        forecast_cache.memory.discard(key)  # The file on disk was already removed by the worker that changed it.
+    elif cache == "principal":
+        principal_cache.invalidate_email(key)
+
+# Background thread applying invalidations recorded by other worker processes to this one's in-memory caches.
+# Writers add a CacheInvalidation row in the same transaction as the change, so a committed change is always logged.
+class InvalidationListener:
+    def __init__(self, interval: float = INVALIDATION_POLL_SECONDS):
+        self.interval = interval  # Seconds between polls.
+        self.since = None  # Entries created after this (minus the overlap) are still to be read.
+        self.last_prune = 0.0  # When old entries were last deleted.
+        self.stop_event = threading.Event()  # Set at shutdown.
+
+    # Start polling; the caches start empty, so entries logged before now do not apply.
+    def start(self):
+        self.since = datetime.utcnow()
+        threading.Thread(target=self._run, name="cache-invalidation", daemon=True).start()
+
+    # Stop polling.
+    def stop(self):
+        self.stop_event.set()
+
+    # Poll until stopped, surviving database errors (e.g. a locked SQLite file).
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Cache invalidation poll failed")
+
+    # Apply every entry logged since the last poll, and prune old entries now and then.
+    def poll(self):
+        started = datetime.utcnow()
+        with SessionLocal() as db:
+            since = self.since - timedelta(seconds=INVALIDATION_OVERLAP_SECONDS)
+            entries = db.query(CacheInvalidation.cache, CacheInvalidation.key).filter(CacheInvalidation.created_at > since).all()
+            if time.time() - self.last_prune > INVALIDATION_RETENTION_SECONDS:
+                cutoff = started - timedelta(seconds=INVALIDATION_RETENTION_SECONDS)
+                db.query(CacheInvalidation).filter(CacheInvalidation.created_at < cutoff).delete(synchronize_session=False)
+                db.commit()
+                self.last_prune = time.time()
+        for cache, key in entries:
+            apply_invalidation(cache, key)
+        self.since = started
+
+# Process-wide listener, started at application startup.
+invalidation_listener = InvalidationListener()
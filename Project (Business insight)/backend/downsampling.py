@@ -0,0 +1,42 @@
+# Import numpy for vectorized bucket arithmetic.
+import numpy as np
+
+# Function to pick `points` indices of (x, y) with Largest-Triangle-Three-Buckets, which keeps a line's visual shape.
+# Always keeps the first and last points; returns every index when there are no more than `points`.
+def lttb_indices(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    n = len(x)
+    if points >= n:  # Nothing to drop.
+        return np.arange(n)
+    if points < 3:  # Only the endpoints fit.
+        return np.array([0, n - 1])[:points]
+    edges = np.linspace(1, n - 1, points - 1).astype(int)  # Interior buckets between the fixed endpoints.
+    selected = np.empty(points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(points - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        # The next bucket's mean stands in for the point that will be chosen there.
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[next_start:max(next_end, next_start + 1)].mean()
+        next_y = y[next_start:max(next_end, next_start + 1)].mean()
+        # Keep the point forming the largest triangle with the previous choice and the next bucket's mean.
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+# Function to pick at most `points` indices by keeping the minimum and maximum of each equal-width bucket.
+# Preserves spikes exactly; output stays in x order.
+def minmax_indices(y: np.ndarray, points: int) -> np.ndarray:
+    n = len(y)
+    if points >= n:  # Nothing to drop.
+        return np.arange(n)
+    buckets = max(points // 2, 1)  # Two points per bucket.
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    selected = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        segment = y[start:end]
+        selected.extend(sorted({start + int(np.argmin(segment)), start + int(np.argmax(segment))}))
+    return np.array(selected, dtype=int)
@@ -0,0 +1,205 @@
+# Import os for environment variable access.
+import os
+# Import the process pool used to backtest candidate models side by side.
+from concurrent.futures import ProcessPoolExecutor
+# Import multiprocessing for choosing how backtest processes are started.
+import multiprocessing
+# Import numpy for the models and error metrics.
+import numpy as np
+# Import gradient boosting for the lag-feature model.
+from sklearn.ensemble import GradientBoostingRegressor
+# Import the closed-form trend fit and the forecast horizon.
+from forecasting import fit_linear_trends, FORECAST_HORIZON_DAYS
+# Import the process counts the backtest pool is sized against.
+from jobs import WEB_CONCURRENCY, JOB_WORKERS
+
+# Number of time-ordered backtest folds per candidate.
+BACKTEST_FOLDS = int(os.getenv("BACKTEST_FOLDS", "3"))
+# Processes used to backtest candidates in parallel. Each job worker gets its own pool, so the default splits the
+# cores left over by the job workers of every API worker instead of oversubscribing them. With the default
+# JOB_WORKERS (one per core) nothing is left over and backtests run serially: parallel backtests are opt-in,
+# by setting MODEL_WORKERS, or by lowering JOB_WORKERS so each job gets several cores.
+MODEL_WORKERS = int(os.getenv("MODEL_WORKERS", str(max(1, (os.cpu_count() or 1) // (WEB_CONCURRENCY * JOB_WORKERS)))))
+# Series shorter than this are backtested serially; starting processes would cost more than it saves.
+PARALLEL_MIN_POINTS = int(os.getenv("PARALLEL_MIN_POINTS", "500"))
+
+# Function to infer the typical spacing between observations, in days.
+def observation_spacing(x: np.ndarray) -> float:
+    if len(x) < 2:  # A single point has no spacing; treat it as daily.
+        return 1.0
+    return max(float(np.median(np.diff(x))), 1.0)
+
+# Function to infer the seasonal period, in observations, from the spacing.
+def seasonal_period(x: np.ndarray) -> int:
+    spacing = observation_spacing(x)
+    if spacing < 2:  # Daily data: weekly cycle.
+        return 7
+    if 5 <= spacing <= 9:  # Weekly data: yearly cycle.
+        return 52
+    if 25 <= spacing <= 35:  # Monthly data: yearly cycle.
+        return 12
+    return 1  # Unknown cadence: no seasonality.
+
+# Function to convert future day numbers to steps ahead of the last observation.
+def steps_ahead(x: np.ndarray, x_future: np.ndarray) -> np.ndarray:
+    return np.maximum(np.rint((x_future - x[-1]) / observation_spacing(x)).astype(int), 1)
+
+# Candidate: straight-line trend over day numbers (the previous model, fitted in closed form).
+class LinearTrend:
+    name = "linear_trend"
+    min_points = 2
+
+    def fit(self, x: np.ndarray, y: np.ndarray):
+        slope, intercept, _, _ = fit_linear_trends(x, y[:, None])
+        self.slope, self.intercept = slope[0], intercept[0]
+        return self
+
+    def predict(self, x_future: np.ndarray) -> np.ndarray:
+        return self.intercept + self.slope * x_future
+
+# Candidate: repeat the value from one season earlier (the last value when there is no season).
+class SeasonalNaive:
+    name = "seasonal_naive"
+    min_points = 1
+
+    def fit(self, x: np.ndarray, y: np.ndarray):
+        self.x = x
+        period = seasonal_period(x)
+        self.period = period if len(y) >= period else 1  # Too short for a full season.
+        self.last_season = y[-self.period:]
+        return self
+
+    def predict(self, x_future: np.ndarray) -> np.ndarray:
+        return self.last_season[(steps_ahead(self.x, x_future) - 1) % self.period]
+
+# Candidate: Holt's exponential smoothing with a damped trend, parameters chosen by one-step error.
+class ExponentialSmoothing:
+    name = "exponential_smoothing"
+    min_points = 3
+    alphas = (0.1, 0.3, 0.5, 0.7, 0.9)  # Level smoothing.
+    betas = (0.05, 0.1, 0.3)  # Trend smoothing.
+    phis = (0.9, 0.98)  # Trend damping.
+
+    # Run the smoothing recursion, returning the final level, trend and one-step squared error.
+    @staticmethod
+    def _smooth(y: np.ndarray, alpha: float, beta: float, phi: float):
+        level, trend, sse = y[0], y[1] - y[0], 0.0
+        for value in y[1:]:
+            forecast = level + phi * trend
+            sse += (value - forecast) ** 2
+            new_level = alpha * value + (1 - alpha) * forecast
+            trend = beta * (new_level - level) + (1 - beta) * phi * trend
+            level = new_level
+        return level, trend, sse
+
+    def fit(self, x: np.ndarray, y: np.ndarray):
+        self.x = x
+        best = None
+        for alpha in self.alphas:
+            for beta in self.betas:
+                for phi in self.phis:
+                    level, trend, sse = self._smooth(y, alpha, beta, phi)
+                    if best is None or sse < best[0]:
+                        best = (sse, level, trend, phi)
+        _, self.level, self.trend, self.phi = best
+        return self
+
+    def predict(self, x_future: np.ndarray) -> np.ndarray:
+        h = steps_ahead(self.x, x_future)
+        damped = np.array([sum(self.phi ** i for i in range(1, k + 1)) for k in h])  # phi + phi^2 + ... + phi^h
+        return self.level + damped * self.trend
+
+# Candidate: gradient-boosted trees on lagged differences, forecast recursively.
+# Differencing lets the trees follow a trend they could not extrapolate from raw levels.
+class GradientBoostedLags:
+    name = "gradient_boosted_lags"
+    min_points = 20
+
+    def fit(self, x: np.ndarray, y: np.ndarray):
+        self.x = x
+        diffs = np.diff(y)
+        self.lags = max(1, min(seasonal_period(x), len(diffs) // 4))
+        # Row t holds diffs[t - lags .. t - 1] and predicts diffs[t].
+        features = np.lib.stride_tricks.sliding_window_view(diffs[:-1], self.lags)
+        targets = diffs[self.lags:]
+        self.model = GradientBoostingRegressor(n_estimators=100, max_depth=3, learning_rate=0.1, random_state=42)
+        self.model.fit(features, targets)
+        self.history = list(diffs[-self.lags:])
+        self.last_value = y[-1]
+        return self
+
+    def predict(self, x_future: np.ndarray) -> np.ndarray:
+        h = steps_ahead(self.x, x_future)
+        history, value, path = list(self.history), self.last_value, []
+        for _ in range(h.max()):  # One step at a time, feeding predictions back in as lags.
+            step = self.model.predict(np.array([history[-self.lags:]]))[0]
+            history.append(step)
+            value += step
+            path.append(value)
+        return np.array(path)[h - 1]
+
+# Registry of candidate models; add a class here to make it eligible for selection.
+CANDIDATE_MODELS = {model.name: model for model in (LinearTrend, SeasonalNaive, ExponentialSmoothing, GradientBoostedLags)}
+
+# Function to compute error metrics for a set of forecasts.
+def error_metrics(actual: np.ndarray, predicted: np.ndarray) -> dict:
+    errors = predicted - actual
+    total = np.abs(actual).sum()
+    return {
+        "mae": float(np.abs(errors).mean()),
+        "rmse": float(np.sqrt((errors ** 2).mean())),
+        "wape": float(np.abs(errors).sum() / total) if total > 0 else None,  # Scale-free: error as a share of volume.
+    }
+
+# Function to backtest one candidate on expanding windows, each followed by one horizon of held-out points.
+# Runs in a pool process, so it takes only picklable arguments.
+def evaluate_candidate(name: str, x: np.ndarray, y: np.ndarray, horizon: int, folds: int = BACKTEST_FOLDS):
+    model_class = CANDIDATE_MODELS[name]
+    actual, predicted = [], []
+    for fold in range(folds, 0, -1):  # Oldest cutoff first; training never sees the future.
+        cutoff = len(y) - fold * horizon
+        if cutoff < max(model_class.min_points, 2):  # Not enough history before this cutoff.
+            continue
+        model = model_class().fit(x[:cutoff], y[:cutoff])
+        test = slice(cutoff, cutoff + horizon)
+        actual.append(y[test])
+        predicted.append(model.predict(x[test]))
+    if not actual:  # Series too short to backtest this candidate.
+        return name, None
+    metrics = error_metrics(np.concatenate(actual), np.concatenate(predicted))
+    metrics["folds"] = len(actual)
+    return name, metrics
+
+# Lazily created pool for parallel backtests, one per job worker process.
+_model_executor = None
+
+# Function to get (and create on first use) the backtest pool.
+def get_model_executor() -> ProcessPoolExecutor:
+    global _model_executor
+    if _model_executor is None:
+        # Spawned, like the job workers themselves: forking a job worker would copy whatever locks its threads hold.
+        _model_executor = ProcessPoolExecutor(max_workers=MODEL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _model_executor
+
+# Function to backtest every candidate, pick the lowest-error one, refit it on all data and forecast.
+def select_model(x: np.ndarray, y: np.ndarray) -> dict:
+    horizon = max(1, round(FORECAST_HORIZON_DAYS / observation_spacing(x)))  # Held-out points per fold.
+    names = list(CANDIDATE_MODELS)
+    if MODEL_WORKERS > 1 and len(y) >= PARALLEL_MIN_POINTS:  # Candidates are independent: backtest them side by side.
+        results = dict(get_model_executor().map(evaluate_candidate, names, [x] * len(names), [y] * len(names), [horizon] * len(names)))
+    else:
+        results = dict(evaluate_candidate(name, x, y, horizon) for name in names)
+    scored = {name: metrics for name, metrics in results.items() if metrics is not None}
+    # Lowest backtest MAE wins; with no backtest possible, fall back to the linear trend.
+    best = min(scored, key=lambda name: scored[name]["mae"]) if scored else LinearTrend.name
+    model = CANDIDATE_MODELS[best]().fit(x, y)  # Refit on the full history.
+    predicted_value = float(model.predict(np.array([x[-1] + FORECAST_HORIZON_DAYS]))[0])
+    metrics = scored.get(best)
+    wape = metrics["wape"] if metrics else None
+    return {
+        "model": best,
+        "predicted_value": predicted_value,
+        "confidence": max(0.0, 1.0 - wape) if wape is not None else 0.0,  # 1 = perfect backtest, 0 = error as large as the data.
+        "metrics": metrics,
+        "candidates": results,  # Backtest metrics of every candidate, None where the series was too short.
+    }
@@ -0,0 +1,60 @@
+# Import numpy for the batched least-squares fit.
+import numpy as np
+# Import pandas for the date x category matrix.
+import pandas as pd
+
+# Days past the last observed date that forecasts are made for.
+FORECAST_HORIZON_DAYS = 30
+
+# Function to fit y = intercept + slope * x for every column of Y in one pass.
+def fit_linear_trends(x: np.ndarray, Y: np.ndarray):
+    # x has shape (n,), Y has shape (n, k) with NaN where a category has no value on a date.
+    mask = ~np.isnan(Y)  # Observed cells.
+    M = mask.astype("float64")
+    Y0 = np.where(mask, Y, 0.0)  # Missing cells contribute nothing to the sums.
+    xc = x - x.mean()  # Center x so the normal equations stay well conditioned.
+    
+    # Per-column sufficient statistics, each a single matrix-vector product.
+    n = M.sum(axis=0)
+    sx = xc @ M
+    sxx = (xc * xc) @ M
+    sy = Y0.sum(axis=0)
+    sxy = xc @ Y0
+    
+    # Closed-form ordinary least squares for every column at once.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom = n * sxx - sx * sx
+        slope = np.where(denom > 0, (n * sxy - sx * sy) / denom, 0.0)  # Flat trend when x does not vary.
+        intercept = np.where(n > 0, (sy - slope * sx) / n, 0.0)
+        residuals = np.where(mask, Y0 - (intercept + np.outer(xc, slope)), 0.0)
+        mse = np.where(n > 0, (residuals ** 2).sum(axis=0) / n, 0.0)
+        volume = np.abs(Y0).sum(axis=0)
+        wape = np.where(volume > 0, np.abs(residuals).sum(axis=0) / volume, 1.0)  # Error as a share of volume.
+    
+    # Shift the intercept back to the original x scale.
+    intercept = intercept - slope * x.mean()
+    return slope, intercept, mse, wape
+
+# Function to forecast every category from per-(date, category) totals.
+def forecast_categories(totals: pd.Series) -> pd.DataFrame:
+    matrix = totals.unstack("category").sort_index()  # Dates x categories, NaN where absent.
+    dates = matrix.index
+    x = (dates - dates.min()).days.to_numpy(dtype="float64")  # Same day_num feature as the overall model.
+    Y = matrix.to_numpy(dtype="float64")
+    
+    slope, intercept, mse, wape = fit_linear_trends(x, Y)
+    next_day = x.max() + FORECAST_HORIZON_DAYS  # Forecast a month past the last date.
+    predicted = intercept + slope * next_day
+    
+    # Last observed value of each category, for the change percentage.
+    last_value = matrix.ffill().iloc[-1].to_numpy(dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_pct = np.where(last_value != 0, (predicted - last_value) / last_value * 100, 0.0)
+    
+    return pd.DataFrame({
+        "category": matrix.columns.astype(str),
+        "predicted_value": predicted,
+        "confidence": np.clip(1 - wape, 0.0, 1.0),  # Scale-free, like the overall model's (in-sample here).
+        "change_pct": change_pct,
+        "wape": wape,
+    })
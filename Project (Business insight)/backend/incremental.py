@@ -0,0 +1,181 @@
+# Import math for the trend's error estimate.
+import math
+# Import pandas for the per-(date, category) delta totals.
+import pandas as pd
+# Import func for recomputing normalization bounds.
+from sqlalchemy import func
+# Import Session from SQLAlchemy ORM for database sessions.
+from sqlalchemy.orm import Session
+# Import the models maintained here.
+from models import Dataset, DateTotal, SeriesStats
+# Import the forecast horizon shared with the other forecasters.
+from forecasting import FORECAST_HORIZON_DAYS
+# Import the overall model selection, insight text and the forecast writer.
+from pipeline import finalize_aggregate, forecast_overall, overall_prediction_row, describe_change, save_predictions
+# Import the trend model the category forecasts use.
+from forecast_engine import LinearTrend
+# Import stage timing.
+from instrumentation import span
+
+# Name of the overall-total series in series_stats.
+OVERALL = ""
+# Largest IN list sent to the database at once (SQLite's historical bound-parameter limit is 999).
+IN_CLAUSE_BATCH = 500
+
+# Function to move every series of a dataset to an earlier day-number origin (x -> x + shift).
+def shift_origin(stats: SeriesStats, shift: float):
+    stats.sum_xy += shift * stats.sum_y
+    stats.sum_xx += 2 * shift * stats.sum_x + stats.n * shift * shift
+    stats.sum_x += stats.n * shift
+
+# Function to apply one date's total changing from old (None if the date is new) to new.
+# Returns True when the change may have moved a normalization bound inwards, which needs a recompute.
+def update_series(stats: SeriesStats, date, x: float, old, new: float) -> bool:
+    is_new = old is None
+    if is_new:  # New date: one more point.
+        stats.n += 1
+        stats.sum_x += x
+        stats.sum_xx += x * x
+        old = 0.0
+    stats.sum_y += new - old
+    stats.sum_xy += x * (new - old)
+    stats.sum_yy += new * new - old * old
+    if stats.last_date is None or date >= stats.last_date:  # Latest date seen so far.
+        stats.last_date, stats.last_value = date, new
+    stale = not is_new and ((old == stats.min_value and new > old) or (old == stats.max_value and new < old))
+    stats.min_value = new if stats.min_value is None else min(stats.min_value, new)
+    stats.max_value = new if stats.max_value is None else max(stats.max_value, new)
+    return stale
+
+# Function to recompute a series' normalization bounds from the stored totals (rare: only when a bound moved inwards).
+def recompute_bounds(db: Session, dataset_id: int, stats: SeriesStats):
+    totals = db.query(DateTotal.date, func.sum(DateTotal.metric_value).label("total")).filter(DateTotal.dataset_id == dataset_id)
+    if stats.series != OVERALL:
+        totals = totals.filter(DateTotal.category == stats.series)
+    totals = totals.group_by(DateTotal.date).subquery()
+    stats.min_value, stats.max_value = db.query(func.min(totals.c.total), func.max(totals.c.total)).one()
+
+# Function to merge per-(date, category) delta totals into a dataset's stored aggregates and streaming statistics.
+# Work is proportional to the delta: only its dates are read back, and each series is updated in place.
+def apply_delta(db: Session, dataset: Dataset, delta: pd.Series):
+    if delta.empty:
+        return
+    delta = delta.groupby(level=["date", "category"], observed=True).sum()  # One value per pair.
+    dates = delta.index.get_level_values("date").unique()
+    stats = {s.series: s for s in db.query(SeriesStats).filter(SeriesStats.dataset_id == dataset.id)}
+
+    # Dates earlier than the current origin move the origin back; shift the sums instead of recomputing them.
+    earliest = dates.min().to_pydatetime()
+    if dataset.first_date is None or earliest < dataset.first_date:
+        if dataset.first_date is not None:
+            shift = (dataset.first_date - earliest).days
+            for series_stats in stats.values():
+                shift_origin(series_stats, shift)
+        dataset.first_date = earliest
+
+    # Read back the stored totals for the delta's dates only.
+    stored = {}
+    date_list = [d.to_pydatetime() for d in dates]
+    for start in range(0, len(date_list), IN_CLAUSE_BATCH):
+        batch = date_list[start:start + IN_CLAUSE_BATCH]
+        for row in db.query(DateTotal).filter(DateTotal.dataset_id == dataset.id, DateTotal.date.in_(batch)):
+            stored[(row.date, row.category)] = row
+
+    # Get (or start) a series' statistics.
+    def series(name: str) -> SeriesStats:
+        if name not in stats:
+            stats[name] = SeriesStats(dataset_id=dataset.id, series=name, n=0, sum_x=0.0, sum_y=0.0, sum_xx=0.0, sum_xy=0.0, sum_yy=0.0)
+            db.add(stats[name])
+        return stats[name]
+
+    stale = set()  # Series whose bounds need a recompute.
+    old_overall = {}  # date -> previous overall total (sum over the stored categories).
+    for (date, category), row in stored.items():
+        old_overall[date] = old_overall.get(date, 0.0) + row.metric_value
+
+    # Per-category totals and series.
+    new_rows = []
+    for (date, category), amount in delta.items():
+        date = date.to_pydatetime()
+        x = float((date - dataset.first_date).days)
+        row = stored.get((date, category))
+        old = row.metric_value if row is not None else None
+        new = (old or 0.0) + float(amount)
+        if row is not None:
+            row.metric_value = new
+        else:
+            new_rows.append({"dataset_id": dataset.id, "date": date, "category": category, "metric_value": new})
+        if update_series(series(category), date, x, old, new):
+            stale.add(category)
+    if new_rows:
+        db.bulk_insert_mappings(DateTotal, new_rows)  # Single executemany for the new pairs.
+
+    # Overall series, from the per-date change.
+    for date, amount in delta.groupby(level="date", observed=True).sum().items():
+        date = date.to_pydatetime()
+        x = float((date - dataset.first_date).days)
+        old = old_overall.get(date)
+        if update_series(series(OVERALL), date, x, old, (old or 0.0) + float(amount)):
+            stale.add(OVERALL)
+
+    db.flush()  # Make the new totals visible to the bound recompute.
+    for name in stale:
+        recompute_bounds(db, dataset.id, stats[name])
+
+# Function to read a dataset's stored per-(date, category) totals back as the Series the pipeline builds.
+def load_totals(db: Session, dataset_id: int) -> pd.Series:
+    rows = db.query(DateTotal.date, DateTotal.category, DateTotal.metric_value).filter(DateTotal.dataset_id == dataset_id).all()
+    index = pd.MultiIndex.from_arrays([[row.date for row in rows], [row.category for row in rows]], names=["date", "category"])
+    return pd.Series([row.metric_value for row in rows], index=index, dtype="float64")
+
+# Function to fit y = intercept + slope * x from a series' sufficient statistics.
+def trend_from_stats(stats: SeriesStats):
+    n = stats.n
+    denom = n * stats.sum_xx - stats.sum_x ** 2
+    slope = (n * stats.sum_xy - stats.sum_x * stats.sum_y) / denom if denom > 0 else 0.0  # Flat trend for a single date.
+    intercept = (stats.sum_y - slope * stats.sum_x) / n
+    # Residual sum of squares, expanded in terms of the same sums.
+    sse = (stats.sum_yy - 2 * intercept * stats.sum_y - 2 * slope * stats.sum_xy
+           + n * intercept ** 2 + 2 * intercept * slope * stats.sum_x + slope ** 2 * stats.sum_xx)
+    rmse = math.sqrt(max(sse, 0.0) / n)
+    mean = abs(stats.sum_y / n)
+    confidence = max(0.0, 1.0 - rmse / mean) if mean > 0 else 0.0  # 1 - coefficient of variation of the residuals.
+    return slope, intercept, confidence
+
+# Function to read a dataset's overall per-date totals back, summed over categories in the database.
+def load_date_totals(db: Session, dataset_id: int) -> pd.Series:
+    rows = (db.query(DateTotal.date, func.sum(DateTotal.metric_value)).filter(DateTotal.dataset_id == dataset_id)
+            .group_by(DateTotal.date).order_by(DateTotal.date).all())
+    return pd.Series([row[1] for row in rows], index=pd.DatetimeIndex([row[0] for row in rows], name="date"), dtype="float64")
+
+# Function to replace a dataset's forecasts after an append.
+# The overall series goes through the same backtest-based model selection as an upload, over the stored per-date
+# totals (one value per date, however many rows were uploaded). Categories keep their linear trends, refreshed
+# from the streaming statistics without reading their history.
+def refresh_predictions(db: Session, dataset: Dataset) -> dict:
+    stats = {s.series: s for s in db.query(SeriesStats).filter(SeriesStats.dataset_id == dataset.id)}
+    overall = stats[OVERALL]
+    with span("load_date_totals"):
+        series = load_date_totals(db, dataset.id)
+    result = forecast_overall(finalize_aggregate(series))  # Select, fit and forecast, as for a new upload.
+    rows = [overall_prediction_row(result, dataset.id)]  # Overall forecast first, as in run_job.
+    next_day = (overall.last_date - dataset.first_date).days + FORECAST_HORIZON_DAYS  # A month past the last date.
+    for name in sorted(n for n in stats if n != OVERALL):
+        series_stats = stats[name]
+        slope, intercept, confidence = trend_from_stats(series_stats)
+        predicted_value = intercept + slope * next_day
+        last_value = series_stats.last_value
+        change_pct = (predicted_value - last_value) / last_value * 100 if last_value else 0.0
+        rows.append({
+            "dataset_id": dataset.id,
+            "category": name,
+            "predicted_value": predicted_value,
+            "confidence": confidence,
+            "insight_text": describe_change(change_pct, subject=name),
+            "model_name": LinearTrend.name,
+            "metrics": None,  # No in-sample error: refreshed from streaming statistics.
+        })
+    save_predictions(db, dataset.id, rows)  # Old forecasts are superseded.
+    result["normalization"] = {"min": overall.min_value, "max": overall.max_value}
+    result["category_forecasts"] = len(rows) - 1
+    return result
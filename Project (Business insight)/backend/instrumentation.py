@@ -0,0 +1,188 @@
+# Import os for environment variable access and profile paths.
+import os
+# Import sys for sampling thread stacks.
+import sys
+# Import threading for the metric lock and the sampler thread.
+import threading
+# Import time for span timing.
+import time
+# Import contextlib for the span context manager.
+import contextlib
+# Import defaultdict and Counter for accumulating samples and per-job totals.
+from collections import defaultdict, Counter
+
+# Upper bounds (seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Whether requests are profiled from startup; can be switched at runtime through PUT /profiling.
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0") == "1"
+# Directory where per-request profiles are written.
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+# Sampling interval of the profiler, in seconds.
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.005"))
+# Requests faster than this are not written out, in seconds.
+PROFILE_MIN_SECONDS = float(os.getenv("PROFILE_MIN_SECONDS", "0"))
+
+# Function to format label pairs as a Prometheus label set ("" when there are none).
+def format_labels(pairs) -> str:
+    body = ",".join(f'{name}="{value}"' for name, value in pairs)
+    return f"{{{body}}}" if body else ""
+
+# Cumulative histogram with one series per label combination, exposed in Prometheus text format.
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name  # Metric name.
+        self.help_text = help_text  # HELP line.
+        self.labels = labels  # Label names, in order.
+        self.buckets = buckets  # Bucket upper bounds, ascending.
+        self.series = {}  # label values -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()  # Sync endpoints observe from several threads.
+
+    # Record one observation.
+    def observe(self, value: float, *label_values):
+        with self.lock:
+            counts = self.series.setdefault(label_values, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:  # Only the first matching bucket; cumulated at exposition.
+                    counts[i] += 1
+                    break
+            counts[-2] += value  # Sum.
+            counts[-1] += 1  # Count.
+
+    # Render the Prometheus text exposition lines.
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for label_values, counts in sorted(self.series.items()):
+                base = list(zip(self.labels, label_values))
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{format_labels(base + [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_bucket{format_labels(base + [('le', '+Inf')])} {counts[-1]}")
+                suffix = format_labels(base)
+                lines.append(f"{self.name}_sum{suffix} {counts[-2]}")
+                lines.append(f"{self.name}_count{suffix} {counts[-1]}")
+        return lines
+
+# Monotonic counter with one series per label combination.
+class CounterMetric:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name  # Metric name.
+        self.help_text = help_text  # HELP line.
+        self.labels = labels  # Label names, in order.
+        self.series = defaultdict(float)  # label values -> total
+        self.lock = threading.Lock()  # Sync endpoints increment from several threads.
+
+    # Add to the counter.
+    def inc(self, amount: float = 1, *label_values):
+        with self.lock:
+            self.series[label_values] += amount
+
+    # Render the Prometheus text exposition lines.
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for label_values, total in sorted(self.series.items()):
+                lines.append(f"{self.name}{format_labels(zip(self.labels, label_values))} {total:g}")
+        return lines
+
+# Metrics of this process; worker-process metrics are merged in when their jobs finish.
+REQUEST_SECONDS = Histogram("insightforge_request_duration_seconds", "HTTP request latency.", ("method", "route", "status"))
+STAGE_SECONDS = Histogram("insightforge_stage_duration_seconds", "Time spent in each pipeline stage, per request or job.", ("stage",))
+ROWS_PROCESSED = CounterMetric("insightforge_rows_processed_total", "CSV rows parsed by jobs, by outcome.", ("outcome",))
+BYTES_PROCESSED = CounterMetric("insightforge_bytes_processed_total", "Bytes received by uploads and parsed by jobs.", ("source",))
+METRICS = [REQUEST_SECONDS, STAGE_SECONDS, ROWS_PROCESSED, BYTES_PROCESSED]
+
+# Per-thread span collector; set while a job is running so stage times are summed per job.
+_local = threading.local()
+
+# Context manager timing one named pipeline stage.
+@contextlib.contextmanager
+def span(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        collector = getattr(_local, "collector", None)
+        if collector is None:  # Outside a job: one observation per span.
+            STAGE_SECONDS.observe(elapsed, stage)
+        else:  # Inside a job: stages repeated per chunk are summed into one observation each.
+            collector["stages"][stage] += elapsed
+
+# Function to count processed rows or bytes, into the running job's report when there is one.
+def count(metric: str, amount: float, label: str):
+    collector = getattr(_local, "collector", None)
+    if collector is None:
+        {"rows": ROWS_PROCESSED, "bytes": BYTES_PROCESSED}[metric].inc(amount, label)
+    else:
+        collector[metric][label] += amount
+
+# Context manager collecting a job's spans and counts into a picklable report.
+# Workers run in other processes, so the report is returned with the job and merged by the parent.
+@contextlib.contextmanager
+def collect_job_metrics():
+    report = {"stages": Counter(), "rows": Counter(), "bytes": Counter()}
+    _local.collector = report
+    try:
+        yield report
+    finally:
+        _local.collector = None
+
+# Function to fold a job's metrics report into this process's metrics.
+def merge_job_metrics(report: dict):
+    for stage, seconds in report["stages"].items():
+        STAGE_SECONDS.observe(seconds, stage)
+    for outcome, rows in report["rows"].items():
+        ROWS_PROCESSED.inc(rows, outcome)
+    for source, size in report["bytes"].items():
+        BYTES_PROCESSED.inc(size, source)
+
+# Function to render every metric in Prometheus text format.
+def render_metrics() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+# Sampling profiler: a background thread records every other thread's stack at a fixed interval.
+# Output is one collapsed-stack ("folded") file per request, readable by flamegraph.pl or speedscope.
+# Concurrent requests share threads (the event loop), so their samples can appear in each other's profiles.
+class SamplingProfiler:
+    enabled = PROFILE_REQUESTS  # Toggled at runtime by PUT /profiling.
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.interval = interval  # Seconds between samples.
+        self.samples = Counter()  # Folded stack -> sample count.
+        self.stopped = threading.Event()  # Signals the sampler thread to finish.
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    # Take samples until stopped.
+    def _run(self):
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        while not self.stopped.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:  # Skip the sampler itself.
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))  # Thread as the root frame.
+                self.samples[";".join(reversed(stack))] += 1
+
+    # Start sampling.
+    def start(self):
+        self.thread.start()
+
+    # Stop sampling and write the profile if the request was slow enough.
+    def stop(self, label: str, elapsed: float):
+        self.stopped.set()
+        self.thread.join()
+        if elapsed < PROFILE_MIN_SECONDS or not self.samples:
+            return None
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%dT%H%M%S')}-{int(elapsed * 1000)}ms-{label}.folded")
+        with open(path, "w") as f:
+            for stack, n in self.samples.most_common():
+                f.write(f"{stack} {n}\n")
+        return path
@@ -0,0 +1,86 @@
+# Import os for environment variable access.
+import os
+# Import importlib for loading the job bodies ahead of use.
+import importlib
+# Import the process pool used to run CPU-bound work off the event loop.
+from concurrent.futures import ProcessPoolExecutor
+# Import multiprocessing for choosing how worker processes are started.
+import multiprocessing
+# Import datetime for status timestamps.
+from datetime import datetime
+# Import Session from SQLAlchemy ORM for database sessions.
+from sqlalchemy.orm import Session
+# Import the session factory from the database module.
+from database import SessionLocal
+# Import the job model.
+from models import Job
+# Import stage timing, and the merge of the per-job metrics reports workers send back.
+from instrumentation import span, merge_job_metrics
+
+# Job queueing and status tracking. The job bodies live in workers.py, which loads the analytics stack
+# (pandas, numpy, scikit-learn); keeping it out of this module lets the API start without it.
+
+# Number of API worker processes on this machine; uvicorn and gunicorn start this many when it is set.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Number of job worker processes per API worker; by default the cores are split between the API workers.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY))))
+# Directory where uploads are spooled until a worker has processed them.
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
+
+# Lazily created process pool shared by all requests.
+_executor = None
+
+# Function to get (and create on first use) the shared process pool.
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:  # First job since startup.
+        # Spawned, not forked: a fork from a request thread can copy locks other threads hold (e.g. mid-import), deadlocking the child.
+        _executor = ProcessPoolExecutor(max_workers=JOB_WORKERS, initializer=_init_worker, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+# Function to shut the pool down on application exit.
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)  # Queued jobs are marked failed on next startup.
+        _executor = None
+
+# Initializer run once in each worker process.
+def _init_worker():
+    # Load the analytics stack now, so the first job in each worker does not pay for it. Imported for the side effect only.
+    importlib.import_module("workers")
+
+# Function to update a job row and commit.
+def update_job(db: Session, job_id: int, **fields):
+    fields["updated_at"] = datetime.utcnow()  # Record when the job last changed.
+    with span("job_status_update"):
+        db.query(Job).filter(Job.id == job_id).update(fields)  # Single UPDATE by primary key.
+        db.commit()  # Commit.
+
+# Function to mark jobs interrupted by a restart as failed so clients stop waiting on them.
+# Only the first API worker of a deployment may call this: later ones would fail jobs their siblings are running.
+def fail_stale_jobs(db: Session):
+    db.query(Job).filter(Job.status.in_(["queued", "running"])).update(
+        {"status": "failed", "error": "Interrupted by server restart", "updated_at": datetime.utcnow()},
+        synchronize_session=False,
+    )
+    db.commit()  # Commit.
+
+# Function to queue a job on the process pool.
+def submit_job(job_id: int, fn, *args):
+    future = get_executor().submit(fn, job_id, *args)  # Hand off to a worker process.
+    future.add_done_callback(lambda f: _on_job_done(f, job_id))  # Catch workers that die mid-job.
+
+# Callback run in the parent when a worker future completes.
+def _on_job_done(future, job_id: int):
+    if future.cancelled():  # Never ran.
+        return
+    if future.exception() is None:  # Normal completion is recorded by the worker.
+        if future.result() is not None:
+            merge_job_metrics(future.result())  # Worker stage timings into this process's /metrics.
+        return
+    db = SessionLocal()  # The worker crashed (e.g. BrokenProcessPool), so record it here.
+    try:
+        update_job(db, job_id, status="failed", error=str(future.exception()))
+    finally:
+        db.close()  # Close the session.
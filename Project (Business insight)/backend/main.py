@@ -1,11 +1,19 @@
 # Import necessary modules for FastAPI application setup.
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Response, Query, Request
+# Import the plain-text response used by /metrics.
+from fastapi.responses import PlainTextResponse, JSONResponse
+# Import run_in_threadpool so writing a profile does not block the event loop.
+from fastapi.concurrency import run_in_threadpool
 # Import security schemes for OAuth2 password flow.
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-# Import SQLAlchemy components for database modeling and sessions.
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+# Import Session from SQLAlchemy ORM for database sessions.
+from sqlalchemy.orm import Session
+# Import AsyncSession for non-blocking database access in request handlers.
+from sqlalchemy.ext.asyncio import AsyncSession
+# Import select and boolean combinators for queries and keyset pagination filters.
+from sqlalchemy import select, and_, or_, func
+# Import IntegrityError for a job refused by the one-active-job-per-dataset index.
+from sqlalchemy.exc import IntegrityError
 # Import datetime utilities for handling time-based operations.
 from datetime import datetime, timedelta
 # Import JWT library for token encoding and decoding.
@@ -14,70 +22,57 @@ import jwt  # PyJWT for token handling
 from jwt.exceptions import InvalidTokenError
 # Import os for environment variable access.
 import os
+# Import json for decoding stored job results.
+import json
+# Import base64 for opaque pagination cursors.
+import base64
+# Import Optional and Literal for optional and enumerated query parameters.
+from typing import Optional, Literal
+# Import hashlib for content-hashing uploads.
+import hashlib
+# Import uuid for unique spool file names.
+import uuid
+# Import time for request timing.
+import time
+# Import zipfile for batch uploads sent as one archive.
+import zipfile
+# Import shutil for removing stores of a batch that could not be saved.
+import shutil
+# Import threading for warming up the analytics stack in the background.
+import threading
+# Import importlib for loading the analytics stack ahead of use.
+import importlib
 # Import dotenv to load environment variables from .env file.
 from dotenv import load_dotenv
-# Import pandas for data manipulation.
-import pandas as pd
-# Import scikit-learn components for machine learning tasks.
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error
-# Import numpy for numerical operations.
-import numpy as np
 # Import for Pydantic models
 from pydantic import BaseModel
 # CORS
 from fastapi.middleware.cors import CORSMiddleware
-# Standard way for in-memory string CSV reading
-from io import StringIO
+# Import get_db and get_async_db from database module.
+from database import get_db, get_async_db, SessionLocal, startup_lock
+# Import the database models.
+from models import User, Dataset, Prediction, Job, DateTotal, SeriesStats, CacheInvalidation
+# Import the schema migration run at startup.
+from migrate import run_migrations
+# Import the background job helpers; the job bodies (workers.py) are imported when work is queued.
+from jobs import UPLOAD_DIR, get_executor, submit_job, fail_stale_jobs, shutdown_executor
+# Import the content-hash keyed forecast cache and the verified-token cache.
+from cache import forecast_cache, principal_cache, invalidation_listener
+# Import the rate limits shared by all worker processes.
+from ratelimit import login_limiter, upload_limiter, prune_buckets
+# Import request/stage metrics and the sampling profiler.
+from instrumentation import REQUEST_SECONDS, SamplingProfiler, PROFILE_DIR, span, count, merge_job_metrics, render_metrics
+
+# The analytics stack (pandas, numpy, scikit-learn, and the pipeline, storage and worker modules built on it)
+# is imported inside the endpoints that use it, so workers serving only auth and reads boot without it.
 
 # Load environment variables from .env file to access secrets like SECRET_KEY.
 load_dotenv()  # Load .env for SECRET_KEY
 
-# Set up the database URL for SQLite, using a local file for simplicity in demos.
-SQLALCHEMY_DATABASE_URL = "sqlite:///./insightforge.db"
-# Create the SQLAlchemy engine to connect to the database.
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-# Create a session maker for managing database sessions.
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-# Define the base class for declarative models.
-Base = declarative_base()
-
-# Define a dependency function to get a database session, ensuring it's closed after use.
-def get_db():
-    db = SessionLocal()  # Create a new session.
-    try:
-        yield db  # Yield the session for use in dependencies.
-    finally:
-        db.close()  # Close the session after the request.
-
-# Define the User model class inheriting from Base.
-class User(Base):
-    __tablename__ = "users"  # Set the table name.
-    id = Column(Integer, primary_key=True, index=True)  # Primary key with indexing.
-    email = Column(String, unique=True, index=True)  # Unique email with indexing.
-    password = Column(String)  # Store hashed password (plaintext for demo).
-    role = Column(String, default="viewer")  # Default role is viewer; can be admin.
-
-# Define the Dataset model class.
-class Dataset(Base):
-    __tablename__ = "datasets"  # Set the table name.
-    id = Column(Integer, primary_key=True, index=True)  # Primary key.
-    filename = Column(String)  # Store the uploaded file name.
-    uploaded_by = Column(Integer, ForeignKey("users.id"))  # Foreign key to user who uploaded.
-    created_at = Column(DateTime, default=datetime.utcnow)  # Timestamp of upload.
-
-# Define the Prediction model class.
-class Prediction(Base):
-    __tablename__ = "predictions"  # Set the table name.
-    id = Column(Integer, primary_key=True, index=True)  # Primary key.
-    dataset_id = Column(Integer, ForeignKey("datasets.id"))  # Foreign key to dataset.
-    predicted_value = Column(Float)  # Store the ML predicted value.
-    confidence = Column(Float)  # Store a confidence score (dummy for demo).
-    insight_text = Column(String)  # Store the generated business insight text.
-
-# Create all tables in the database if they don't exist.
-Base.metadata.create_all(bind=engine)  # Create tables if not exist
+# Whether startup creates missing tables and columns; set to 0 when `python migrate.py` runs as a deploy step.
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "1") == "1"
+# Whether startup loads the analytics stack in the background, so the first upload or chart does not wait for it.
+WARM_UP_ANALYTICS = os.getenv("WARM_UP_ANALYTICS", "1") == "1"
 
 # Initialize the FastAPI application instance.
 app = FastAPI()
@@ -89,8 +84,59 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods (GET, POST, etc.)
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Next-Cursor", "ETag"],  # Let the frontend read the pagination cursor and series version
 )
 
+# Middleware timing every request, labelled by route template, and profiling it when profiling is on.
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    profiler = SamplingProfiler() if SamplingProfiler.enabled else None  # Opt-in only.
+    if profiler is not None:
+        profiler.start()
+    started = time.perf_counter()
+    status_code = 500  # Reported if the handler raises.
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")  # Template such as /jobs/{job_id}, set by the router.
+        template = route.path if route is not None else "unmatched"  # Raw paths would make unbounded label values.
+        REQUEST_SECONDS.observe(elapsed, request.method, template, str(status_code))
+        if profiler is not None:
+            label = f"{request.method}{template}".replace("/", "_").replace("{", "").replace("}", "")
+            await run_in_threadpool(profiler.stop, label, elapsed)  # Writes the profile file.
+    response.headers["Server-Timing"] = f"app;dur={elapsed * 1000:.1f}"  # Visible in the browser's network panel.
+    return response
+
+# Function to import the analytics stack ahead of its first use.
+def warm_up_analytics():
+    # Pulls in pandas, numpy, scikit-learn and the pipeline modules; imported for the side effect only.
+    for module in ("workers", "downsampling"):
+        importlib.import_module(module)
+
+# Define a startup event handler to prepare the schema and clean up jobs left behind by a previous run.
+# With several worker processes (WEB_CONCURRENCY, uvicorn --workers, gunicorn) only the first one to start does this.
+@app.on_event("startup")
+def startup_event():
+    with startup_lock() as first:  # Workers start one at a time.
+        if first:
+            if AUTO_MIGRATE:  # Otherwise the schema is managed by the deploy.
+                run_migrations()  # Create missing tables and columns.
+            with SessionLocal() as db:
+                fail_stale_jobs(db)  # Their worker processes are gone.
+                prune_buckets(db)  # Drop rate-limit buckets that have long been full.
+    os.makedirs(UPLOAD_DIR, exist_ok=True)  # Make sure the spool directory exists.
+    invalidation_listener.start()  # Apply cache invalidations made by the other workers.
+    if WARM_UP_ANALYTICS:  # Off the startup path: requests are served while it loads.
+        threading.Thread(target=warm_up_analytics, name="analytics-warm-up", daemon=True).start()
+
+# Define a shutdown event handler to stop the worker pool.
+@app.on_event("shutdown")
+def shutdown_event():
+    shutdown_executor()  # Stop accepting work and cancel anything still queued.
+    invalidation_listener.stop()  # Stop polling for invalidations.
+
 # Define JWT configuration constants.
 SECRET_KEY = os.getenv("SECRET_KEY")  # Get secret key from env.
 ALGORITHM = "HS256"  # Algorithm for JWT encoding.
@@ -111,14 +157,17 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return encoded_jwt  # Return the token.
 
 # Function to authenticate a user against the database.
-def authenticate_user(db: Session, email: str, password: str):
-    user = db.query(User).filter(User.email == email).first()  # Query for user by email.
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = (await db.execute(select(User).filter(User.email == email))).scalars().first()  # Query for user by email.
     if not user or user.password != password:  # Check if user exists and password matches (plaintext for demo).
         return False  # Return false if invalid.
     return user  # Return user object if valid.
 
 # Asynchronous function to get the current user from JWT token.
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    cached_user = principal_cache.get(token)  # Tokens seen recently skip decoding and the user query.
+    if cached_user is not None:
+        return cached_user
     credentials_exception = HTTPException(  # Define exception for invalid credentials.
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -131,10 +180,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             raise credentials_exception  # Raise exception.
     except InvalidTokenError:  # Catch invalid token error.
         raise credentials_exception  # Raise exception.
-    user = db.query(User).filter(User.email == email).first()  # Query for user.
+    user = (await db.execute(select(User).filter(User.email == email))).scalars().first()  # Query for user.
     if user is None:  # If user not found.
         raise credentials_exception  # Raise exception.
-    return user  # Return the user.
+    # Cache a detached copy so no request's session is shared with others.
+    cached_user = User(id=user.id, email=user.email, role=user.role)
+    principal_cache.put(token, cached_user, payload["exp"])  # Expires no later than the token itself.
+    return cached_user  # Return the user.
 
 # Pydantic model for registration request body
 class RegisterRequest(BaseModel):
@@ -147,6 +199,10 @@ class LoginRequest(BaseModel):
     username: str  # This matches OAuth2 spec (email in our case)
     password: str
 
+# Model for changing a user's role
+class RoleUpdateRequest(BaseModel):
+    role: str  # New role, e.g. viewer or admin
+
 # # Endpoint for user registration.
 # @app.post("/register")
 # def register(email: str, password: str, role: str = "viewer", db: Session = Depends(get_db)):
@@ -161,17 +217,16 @@ class LoginRequest(BaseModel):
 
 # Updated register endpoint that reads from JSON body
 @app.post("/register")
-def register(request: RegisterRequest, db: Session = Depends(get_db)):
+async def register(request: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == request.email).first()
+    existing_user = (await db.execute(select(User).filter(User.email == request.email))).scalars().first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create new user (password plaintext for demo only!)
     user = User(email=request.email, password=request.password, role=request.role)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
     
     return {"msg": "User created"}
 
@@ -193,8 +248,9 @@ def register(request: RegisterRequest, db: Session = Depends(get_db)):
 
 # Updated login endpoint accepting JSON
 @app.post("/login")
-def login(request: LoginRequest, db: Session = Depends(get_db)):
-    user = authenticate_user(db, request.username, request.password)
+async def login(request: LoginRequest, http_request: Request, db: AsyncSession = Depends(get_async_db)):
+    await login_limiter.check_async(db, http_request.client.host if http_request.client else "unknown")  # Shared by all workers.
+    user = await authenticate_user(db, request.username, request.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -207,103 +263,524 @@ def login(request: LoginRequest, db: Session = Depends(get_db)):
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-# Endpoint for uploading dataset (CSV).
-@app.post("/upload")
-async def upload_dataset(file: UploadFile = File(...), current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+# Endpoint for changing a user's role (admin only).
+@app.put("/users/{email}/role")
+async def update_user_role(email: str, request: RoleUpdateRequest, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     if current_user.role != "admin":  # Check if user is admin.
         raise HTTPException(status_code=403, detail="Admin access required")  # Raise forbidden if not.
-    
+    user = (await db.execute(select(User).filter(User.email == email))).scalars().first()  # Query for user.
+    if not user:  # If not found.
+        raise HTTPException(status_code=404, detail="User not found")  # Raise not found.
+    user.role = request.role  # Update the role.
+    db.add(CacheInvalidation(cache="principal", key=email))  # Tell the other workers, in the same transaction.
+    await db.commit()  # Commit.
+    principal_cache.invalidate_email(email)  # Cached tokens still carry the old role.
+    return {"msg": "Role updated"}
+
+# Function to validate an uploaded CSV's header and spool it to disk, returning the spool path and SHA-256.
+def spool_csv_upload(file: UploadFile):
     # Validate file extension.
     if not file.filename.endswith(".csv"):  # Check if file is CSV.
         raise HTTPException(status_code=400, detail="CSV only")  # Raise bad request if not.
     
-    # Read file contents asynchronously.
-    contents = await file.read()  # Read the uploaded file.
-    df = pd.read_csv(StringIO(contents.decode('utf-8')))  # Parse as pandas DataFrame using modern StringIO.
-    required_cols = ["date", "metric_value", "category"]  # Define required columns.
-    if not all(col in df.columns for col in required_cols):  # Check if all required columns present.
+    import pandas as pd
+    from pipeline import read_csv_chunks, REQUIRED_COLUMNS
+    
+    # Validate the header from the first chunk before accepting the upload.
+    with span("upload_validate"):
+        try:
+            chunks = read_csv_chunks(file.file, chunksize=1)
+            first_chunk = next(chunks, None)  # Parse just the header and one row.
+            chunks.close()  # Release the reader without closing the upload.
+        except pd.errors.EmptyDataError:  # File has no header at all.
+            first_chunk = None
+    if first_chunk is None:  # Nothing to parse.
+        raise HTTPException(status_code=400, detail="Empty CSV file")  # Raise bad request.
+    if not all(col in first_chunk.columns for col in REQUIRED_COLUMNS):  # Check if all required columns present.
         raise HTTPException(status_code=400, detail="Missing required columns")  # Raise if missing.
     
-    # Create and save dataset metadata.
-    dataset = Dataset(filename=file.filename, uploaded_by=current_user.id)  # Create dataset object.
-    db.add(dataset)  # Add to session.
-    db.commit()  # Commit.
-    db.refresh(dataset)  # Refresh.
+    # Spool the upload to disk so a worker process can stream it.
+    file.file.seek(0)  # Rewind after header validation.
+    return spool_stream(file.file)
+
+# Function to copy a file object to a new spool file, returning the spool path and the SHA-256 of its contents.
+def spool_stream(fileobj):
+    path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}.csv")  # Unique spool file name.
+    hasher = hashlib.sha256()  # Content hash identifies re-uploads of the same data.
+    with span("upload_spool"), open(path, "wb") as out:  # Copy in bounded blocks, never holding the whole file.
+        for block in iter(lambda: fileobj.read(1024 * 1024), b""):
+            hasher.update(block)
+            out.write(block)
+    count("bytes", os.path.getsize(path), "upload")  # Bytes received.
+    return path, hasher.hexdigest()
+
+# Endpoint for uploading dataset (CSV); processing runs in the background job pool.
+# Kept synchronous: spooling and hashing the file is blocking I/O, so it belongs on the threadpool.
+@app.post("/upload", status_code=status.HTTP_202_ACCEPTED)
+def upload_dataset(response: Response, file: UploadFile = File(...), current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    if current_user.role != "admin":  # Check if user is admin.
+        raise HTTPException(status_code=403, detail="Admin access required")  # Raise forbidden if not.
+    upload_limiter.check(db, str(current_user.id))  # Before reading the file.
     
-    # Process the data.
-    processed_df = process_data(df)  # Call data processing function.
-    predictions = run_ml_prediction(processed_df, dataset.id, db)  # Run ML and save predictions.
+    path, content_hash = spool_csv_upload(file)  # Validate the header and copy the file to the spool directory.
     
-    return {"msg": "Upload successful", "dataset_id": dataset.id, "predictions": predictions}  # Return success.
-
-# Function for data processing.
-def process_data(df: pd.DataFrame) -> pd.DataFrame:
-    # Clean data by dropping nulls.
-    df = df.dropna()  # Drop rows with null values.
+    # Identical data was already processed: return its forecast instead of training again.
+    cached = forecast_cache.get(content_hash)
+    if cached is not None:
+        os.remove(path)  # The spooled copy is not needed.
+        response.status_code = status.HTTP_200_OK  # Nothing was queued.
+        return {"msg": "Upload matched an existing dataset", "dataset_id": cached["dataset_id"], "cached": True, "predictions": cached["prediction"]}
     
-    # Parse date column.
-    df['date'] = pd.to_datetime(df['date'])  # Convert date to datetime.
+    # Create and save dataset metadata and its job in one transaction.
+    dataset = Dataset(filename=file.filename, uploaded_by=current_user.id, content_hash=content_hash)  # Create dataset object.
+    db.add(dataset)  # Add to session.
+    db.flush()  # Assign the dataset id.
+    job = Job(dataset_id=dataset.id)  # Create the queued job.
+    db.add(job)  # Add to session.
+    with span("db_commit"):
+        db.commit()  # Commit.
+        db.refresh(job)  # Refresh.
     
-    # Aggregate data.
-    aggregated = df.groupby('date').agg({'metric_value': 'sum'}).reset_index()  # Group by date and sum metric.
+    # Hand parsing, aggregation and training to the process pool.
+    from workers import run_job
+    submit_job(job.id, run_job, dataset.id, path, content_hash)  # Returns immediately.
     
-    # Normalize data.
-    aggregated['normalized_value'] = (aggregated['metric_value'] - aggregated['metric_value'].min()) / (aggregated['metric_value'].max() - aggregated['metric_value'].min())  # Min-max normalization.
+    return {"msg": "Upload accepted", "dataset_id": dataset.id, "job_id": job.id}  # Return the job to poll.
+
+# Most files accepted by one batch upload.
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "200"))
+# Most (uncompressed) bytes accepted by one batch upload; also guards against zip bombs.
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# Function to reject a batch over the file or size limits before anything is written to disk.
+def check_batch_limits(files: int, total_bytes: int):
+    if files == 0:  # Nothing to process.
+        raise HTTPException(status_code=400, detail="No CSV files in upload")
+    if files > BATCH_MAX_FILES:  # Too many files.
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_FILES} files per batch")
+    if total_bytes > BATCH_MAX_BYTES:  # Too much data.
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_BYTES} bytes")
+
+# Function to spool every CSV of a batch upload (many CSV files, or one zip of them) to disk.
+# Returns one dict per file: filename plus either path and content_hash, or the error that rejected it.
+def spool_batch_upload(files: list) -> list:
+    archives = [file for file in files if file.filename.lower().endswith(".zip")]
+    if archives and len(files) > 1:  # One archive, or plain files; not both.
+        raise HTTPException(status_code=400, detail="Send CSV files or a single zip")
+    members = []
+    try:
+        if archives:
+            try:
+                archive = zipfile.ZipFile(archives[0].file)  # Reads the central directory only.
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail="Invalid zip file")
+            with archive:
+                # CSV members only; skip folders and the resource forks macOS adds.
+                entries = [info for info in archive.infolist() if not info.is_dir() and info.filename.lower().endswith(".csv")
+                           and not info.filename.startswith("__MACOSX/")]
+                check_batch_limits(len(entries), sum(info.file_size for info in entries))  # Declared sizes; reads stop there.
+                for info in entries:
+                    with archive.open(info) as member:  # Decompressed block by block while spooling.
+                        path, content_hash = spool_stream(member)
+                    members.append({"filename": os.path.basename(info.filename), "path": path, "content_hash": content_hash})
+        else:
+            check_batch_limits(len(files), sum(file.size or 0 for file in files))
+            for file in files:
+                if not file.filename.endswith(".csv"):  # Rejected on its own; the other files still run.
+                    members.append({"filename": file.filename, "error": "CSV only"})
+                    continue
+                path, content_hash = spool_stream(file.file)
+                members.append({"filename": file.filename, "path": path, "content_hash": content_hash})
+    except Exception as exc:  # Rejected part way: drop what was spooled.
+        for member in members:
+            if "path" in member:
+                os.remove(member["path"])
+        if isinstance(exc, zipfile.BadZipFile):  # A corrupt member (e.g. CRC mismatch).
+            raise HTTPException(status_code=400, detail=f"Invalid zip file: {exc}")
+        raise
+    return members
+
+# Endpoint for uploading many CSVs (or one zip of CSVs) at once.
+# Files are parsed and forecast in parallel on the worker pool, then all datasets and predictions are saved in one transaction.
+# Kept synchronous: spooling is blocking I/O and the request waits for the batch, so it belongs on the threadpool.
+@app.post("/upload/batch")
+def upload_batch(files: list[UploadFile] = File(...), current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    if current_user.role != "admin":  # Check if user is admin.
+        raise HTTPException(status_code=403, detail="Admin access required")  # Raise forbidden if not.
+    from workers import process_batch_file
+    from pipeline import overall_prediction_row
+    from storage import staging_store_path, move_store
+    from incremental import apply_delta
+    upload_limiter.check(db, str(current_user.id))  # One token per batch, before reading the files.
+    started = time.perf_counter()
+    members = spool_batch_upload(files)  # Validate the batch and copy every file to the spool directory.
+    results = [{"filename": member["filename"]} for member in members]  # One entry per file, in upload order.
     
-    # Generate feature for ML.
-    aggregated['day_num'] = (aggregated['date'] - aggregated['date'].min()).dt.days  # Add day number feature.
-    return aggregated  # Return processed DataFrame.
-
-# Function for running ML prediction.
-def run_ml_prediction(df: pd.DataFrame, dataset_id: int, db: Session):
-    # Prepare features and target.
-    X = df[['day_num']]  # Features: day_num.
-    y = df['metric_value']  # Target: metric_value.
+    # Fan the files out to the worker pool; cached and duplicate files skip processing.
+    pending = {}  # content hash -> (future, results waiting on it, filename)
+    for member, result in zip(members, results):
+        if "error" in member:  # Rejected while spooling.
+            result.update(status="failed", error=member["error"])
+            continue
+        content_hash = member["content_hash"]
+        cached = forecast_cache.get(content_hash)
+        if cached is not None or content_hash in pending:
+            os.remove(member["path"])  # The spooled copy is not needed.
+        if cached is not None:  # Identical data was already processed.
+            result.update(status="cached", dataset_id=cached["dataset_id"], predictions=cached["prediction"])
+        elif content_hash in pending:  # Same data twice in this batch: process it once.
+            pending[content_hash][1].append(result)
+        else:
+            future = get_executor().submit(process_batch_file, member["path"], staging_store_path())
+            pending[content_hash] = (future, [result], member["filename"])
     
-    # Split data for training.
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)  # 80/20 split.
+    # Wait for every file; one failing (or its worker crashing) fails only that file.
+    processed = []  # (content hash, outcome, results waiting on it, filename)
+    for content_hash, (future, waiting, filename) in pending.items():
+        try:
+            outcome = future.result()
+        except Exception as exc:  # The worker died (e.g. BrokenProcessPool).
+            outcome = {"error": str(exc)}
+        if "metrics" in outcome:
+            merge_job_metrics(outcome.pop("metrics"))  # Worker stage timings into this process's /metrics.
+        if "error" in outcome:
+            for result in waiting:
+                result.update(status="failed", error=outcome["error"])
+        else:
+            processed.append((content_hash, outcome, waiting, filename))
     
-    # Train the model.
-    model = LinearRegression()  # Initialize Linear Regression model.
-    model.fit(X_train, y_train)  # Fit the model.
+    # Save every processed file's dataset, aggregates and predictions in one transaction.
+    datasets = [Dataset(filename=filename, uploaded_by=current_user.id, content_hash=content_hash, row_count=outcome["rows"],
+                        profile=json.dumps(outcome["profile"]))
+                for content_hash, outcome, _, filename in processed]
+    try:
+        with span("batch_save"):
+            db.add_all(datasets)  # Add to session.
+            db.flush()  # Assign the dataset ids.
+            rows = []
+            for dataset, (_, outcome, _, _) in zip(datasets, processed):
+                dataset.storage_path = move_store(outcome["store_path"], dataset.id)  # Staging store under its dataset id.
+                apply_delta(db, dataset, outcome["totals"])  # Stored aggregates for later appends.
+                rows.append(overall_prediction_row(outcome["prediction"], dataset.id))
+                rows.extend(dict(row, dataset_id=dataset.id) for row in outcome["category_rows"])
+            db.bulk_insert_mappings(Prediction, rows)  # Single executemany for the whole batch.
+            db.commit()  # Commit.
+    except Exception:
+        db.rollback()  # Nothing from the batch is saved.
+        for dataset, (_, outcome, _, _) in zip(datasets, processed):
+            shutil.rmtree(dataset.storage_path or outcome["store_path"], ignore_errors=True)
+        raise
     
-    # Predict future value.
-    next_day = df['day_num'].max() + 30  # Assume next month as +30 days.
-    predicted_value = model.predict(np.array([[next_day]]))[0]  # Predict for next day.
+    # Report each file and remember the forecasts for identical uploads.
+    for dataset, (content_hash, outcome, waiting, _) in zip(datasets, processed):
+        prediction = dict(outcome["prediction"], category_forecasts=len(outcome["category_rows"]))
+        forecast_cache.put(content_hash, {"dataset_id": dataset.id, "prediction": prediction})
+        for result in waiting:
+            result.update(status="processed", dataset_id=dataset.id, rows=outcome["rows"], predictions=prediction)
     
-    # Calculate dummy confidence.
-    y_pred = model.predict(X_test)  # Predict on test set.
-    mse = mean_squared_error(y_test, y_pred)  # Calculate MSE.
-    confidence = 1 / (1 + mse)  # Simple confidence formula.
+    statuses = [result["status"] for result in results]
+    summary = {
+        "files": len(results),
+        "processed": statuses.count("processed"),
+        "cached": statuses.count("cached"),
+        "failed": statuses.count("failed"),
+        "rows": sum(outcome["rows"] for _, outcome, _, _ in processed),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    return {"summary": summary, "results": results}
+
+# Endpoint to re-run the forecast for a stored dataset without re-uploading it.
+@app.post("/datasets/{dataset_id}/forecast", status_code=status.HTTP_202_ACCEPTED)
+async def reforecast_dataset(dataset_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    if current_user.role != "admin":  # Check if user is admin.
+        raise HTTPException(status_code=403, detail="Admin access required")  # Raise forbidden if not.
+    dataset = await db.get(Dataset, dataset_id)  # Query dataset by id.
+    if not dataset:  # If not found.
+        raise HTTPException(status_code=404, detail="Dataset not found")  # Raise not found.
+    if not dataset.storage_path:  # Uploaded before column storage, or still processing.
+        raise HTTPException(status_code=409, detail="Dataset has no stored data")  # Raise conflict.
+    job = Job(dataset_id=dataset.id)  # Create the queued job.
+    db.add(job)  # Add to session.
+    try:
+        await db.commit()  # Commit; refused if the dataset already has a queued or running job.
+    except IntegrityError:  # A forecast must not overlap an append (or another forecast) of the same dataset.
+        await db.rollback()  # Discard the refused job.
+        raise HTTPException(status_code=409, detail="Dataset has a job in progress")  # Raise conflict.
+    from workers import run_forecast_job
+    submit_job(job.id, run_forecast_job, dataset.id, dataset.storage_path)  # Loads the memory-mapped columns.
+    return {"msg": "Forecast queued", "dataset_id": dataset.id, "job_id": job.id}  # Return the job to poll.
+
+# Endpoint to append rows to a stored dataset; stored aggregates and forecasts are updated from the new rows only.
+# Kept synchronous for the same reason as /upload.
+@app.post("/datasets/{dataset_id}/append", status_code=status.HTTP_202_ACCEPTED)
+def append_dataset(dataset_id: int, file: UploadFile = File(...), current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    if current_user.role != "admin":  # Check if user is admin.
+        raise HTTPException(status_code=403, detail="Admin access required")  # Raise forbidden if not.
+    dataset = db.get(Dataset, dataset_id)  # Query dataset by id.
+    if not dataset:  # If not found.
+        raise HTTPException(status_code=404, detail="Dataset not found")  # Raise not found.
+    if not dataset.storage_path:  # Uploaded before column storage, or still processing.
+        raise HTTPException(status_code=409, detail="Dataset has no stored data")  # Raise conflict.
+    # Early answer for a busy dataset, before the upload is spooled; the job insert below is what enforces it.
+    busy = db.query(Job.id).filter(Job.dataset_id == dataset_id, Job.status.in_(["queued", "running"])).first()
+    if busy:  # Appends to one dataset must not overlap.
+        raise HTTPException(status_code=409, detail="Dataset has a job in progress")  # Raise conflict.
+    path, _ = spool_csv_upload(file)  # Validate the header and copy the file to the spool directory.
+    content_hash = dataset.content_hash
+    if content_hash:  # The data no longer matches the original upload; stop serving its cached forecast.
+        db.add(CacheInvalidation(cache="forecast", key=content_hash))  # Other workers may still hold it in memory.
+        dataset.content_hash = None
+    job = Job(dataset_id=dataset.id)  # Create the queued job.
+    db.add(job)  # Add to session.
+    try:
+        with span("db_commit"):
+            db.commit()  # Commit; refused if a job was queued for the dataset since the check above.
+            db.refresh(job)  # Refresh.
+    except IntegrityError:  # Lost the race to another append or forecast (see ix_jobs_active_dataset_id).
+        db.rollback()  # Discard the refused job and the cache invalidation.
+        os.remove(path)  # The spooled copy is not needed.
+        raise HTTPException(status_code=409, detail="Dataset has a job in progress")  # Raise conflict.
+    if content_hash:
+        forecast_cache.discard(content_hash)  # Once the append is accepted.
+    from workers import run_append_job
+    submit_job(job.id, run_append_job, dataset.id, path)  # Returns immediately.
+    return {"msg": "Append accepted", "dataset_id": dataset.id, "job_id": job.id}  # Return the job to poll.
+
+# Function to rebuild a per-date series from a dataset's column store (datasets processed before aggregates were stored).
+def load_series_from_store(storage_path: str, category: Optional[str]):
+    from storage import load_frame
+    from pipeline import sum_by_date
+    frame = load_frame(storage_path)  # Memory-mapped columns.
+    if category is not None:  # One category only.
+        frame = frame[frame["category"] == category]
+    return sum_by_date(frame)
+
+# Endpoint to get a dataset's per-date metric_value and normalized_value series for charting.
+# Downsampled server-side to at most `points` points; supports If-None-Match with the returned ETag.
+@app.get("/datasets/{dataset_id}/series")
+async def get_dataset_series(
+    dataset_id: int,
+    request: Request,
+    points: int = Query(1000, ge=3, le=10000),  # Most points to return.
+    method: Literal["lttb", "minmax"] = "lttb",  # LTTB keeps the line's shape; minmax keeps every spike.
+    start: Optional[datetime] = None,  # First date to include.
+    end: Optional[datetime] = None,  # Last date to include.
+    category: Optional[str] = None,  # One category's series instead of the overall total.
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    import numpy as np
+    from downsampling import lttb_indices, minmax_indices
+    dataset = await db.get(Dataset, dataset_id)  # Query dataset by id.
+    if not dataset:  # If not found.
+        raise HTTPException(status_code=404, detail="Dataset not found")  # Raise not found.
+    if dataset.first_date is None and not dataset.storage_path:  # Still processing.
+        raise HTTPException(status_code=409, detail="Dataset has no stored data")  # Raise conflict.
+    
+    # The response depends only on the stored data (row_count changes with every append) and the query.
+    version = [dataset.id, dataset.row_count, str(dataset.first_date), points, method, str(start), str(end), category]
+    etag = '"' + hashlib.sha256(json.dumps(version).encode()).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}  # Browsers revalidate instead of refetching.
+    if request.headers.get("if-none-match") == etag:  # Client already has this exact response.
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    # Generate business insight.
-    last_value = df['metric_value'].iloc[-1]  # Get last actual value.
-    change_pct = ((predicted_value - last_value) / last_value) * 100  # Calculate percentage change.
-    if change_pct > 10:  # If significant increase.
-        insight = f"🚀 Metric value is predicted to increase by {abs(change_pct):.2f}%. Growth opportunity ahead!"
-    elif change_pct < -10:  # If significant decrease.
-        insight = f"⚠️ Metric value is predicted to decrease by {abs(change_pct):.2f}%. Immediate intervention recommended."
-    else:  # If stable.
-        insight = f"📊 Metric value is predicted to change by {change_pct:.2f}%. Stable trend."
+    if dataset.first_date is not None:  # Sum the stored per-(date, category) totals in the database.
+        query = select(DateTotal.date, func.sum(DateTotal.metric_value)).filter(DateTotal.dataset_id == dataset_id)
+        if category is not None:
+            query = query.filter(DateTotal.category == category)
+        if start is not None:
+            query = query.filter(DateTotal.date >= start)
+        if end is not None:
+            query = query.filter(DateTotal.date <= end)
+        rows = (await db.execute(query.group_by(DateTotal.date).order_by(DateTotal.date))).all()
+        dates = np.array([row[0] for row in rows], dtype="datetime64[ns]")
+        values = np.array([row[1] for row in rows], dtype="float64")
+        stats = await db.get(SeriesStats, (dataset_id, category if category is not None else ""))  # Whole-series bounds.
+        low, high = (stats.min_value, stats.max_value) if stats else (None, None)
+    else:  # Fall back to the column store.
+        series = await run_in_threadpool(load_series_from_store, dataset.storage_path, category)
+        low, high = (series.min(), series.max()) if len(series) else (None, None)
+        if start is not None:
+            series = series[series.index >= start]
+        if end is not None:
+            series = series[series.index <= end]
+        dates, values = series.index.to_numpy(dtype="datetime64[ns]"), series.to_numpy(dtype="float64")
     
-    # Save the prediction to DB.
-    prediction = Prediction(dataset_id=dataset_id, predicted_value=predicted_value, confidence=confidence, insight_text=insight)  # Create prediction object.
-    db.add(prediction)  # Add to session.
-    db.commit()  # Commit.
-    db.refresh(prediction)  # Refresh.
+    # Normalize against the whole series, as the pipeline does, so a slice keeps its place in the overall range.
+    span_width = (high - low) if low is not None else 0.0
+    normalized = (values - low) / span_width if span_width else np.zeros_like(values)  # A flat series normalizes to 0.
     
-    return {"predicted_value": predicted_value, "confidence": confidence, "insight": insight}  # Return prediction data.
+    # Downsample.
+    if method == "lttb":
+        x = dates.astype("int64").astype("float64")  # Time as the x axis, so uneven spacing is respected.
+        keep = lttb_indices(x, values, points)
+    else:
+        keep = minmax_indices(values, points)
+    return JSONResponse({
+        "dataset_id": dataset_id,
+        "category": category,
+        "method": method,
+        "total_points": len(values),
+        "points": len(keep),
+        "dates": [str(d)[:10] for d in dates[keep]],  # YYYY-MM-DD.
+        "metric_value": values[keep].tolist(),
+        "normalized_value": normalized[keep].tolist(),
+    }, headers=headers)
+
+# Endpoint to get a dataset's data-quality profile: row, null and parse-failure counts, duplicates, outliers and categories.
+# Computed once while the upload was processed; served from the stored JSON without re-reading the data.
+@app.get("/datasets/{dataset_id}/profile")
+async def get_dataset_profile(dataset_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    row = (await db.execute(select(Dataset.id, Dataset.profile).filter(Dataset.id == dataset_id))).first()  # Query dataset by id.
+    if not row:  # If not found.
+        raise HTTPException(status_code=404, detail="Dataset not found")  # Raise not found.
+    if row.profile is None:  # Still processing, or processed before profiling existed.
+        raise HTTPException(status_code=409, detail="Dataset has no profile")  # Raise conflict.
+    # The profile is stored as JSON text; embed it as is instead of decoding and re-encoding it.
+    return Response(content=f'{{"dataset_id": {dataset_id}, "profile": {row.profile}}}', media_type="application/json")
+
+# Endpoint exposing request, stage, row and byte metrics in Prometheus text format (for scrapers, so unauthenticated).
+# Each server process reports its own; job metrics appear once the job's worker has finished.
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# Endpoint to switch per-request sampling profiles on or off (admin only).
+@app.put("/profiling")
+def set_profiling(enabled: bool, current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":  # Check if user is admin.
+        raise HTTPException(status_code=403, detail="Admin access required")  # Raise forbidden if not.
+    SamplingProfiler.enabled = enabled  # Takes effect from the next request.
+    return {"enabled": enabled, "profile_dir": PROFILE_DIR}
+
+# Endpoint to get forecast cache hit/miss counters.
+@app.get("/cache/stats")
+def get_cache_stats(current_user: User = Depends(get_current_user)):
+    return forecast_cache.stats()  # Counters for this worker process.
+
+# Endpoint to get the status of a background job.
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    job = await db.get(Job, job_id)  # Query job by id.
+    if not job:  # If not found.
+        raise HTTPException(status_code=404, detail="Job not found")  # Raise not found.
+    return {"id": job.id, "dataset_id": job.dataset_id, "status": job.status, "progress": job.progress, "error": job.error, "created_at": job.created_at, "updated_at": job.updated_at}
+
+# Endpoint to get the result of a finished background job.
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    job = await db.get(Job, job_id)  # Query job by id.
+    if not job:  # If not found.
+        raise HTTPException(status_code=404, detail="Job not found")  # Raise not found.
+    if job.status != "done":  # Result only exists once the job has finished.
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")  # Raise conflict.
+    return {"dataset_id": job.dataset_id, "predictions": json.loads(job.result)}  # Return the stored prediction.
+
+# Function to encode a keyset position as an opaque cursor string.
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])  # JSON-safe key values.
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+# Function to decode a cursor produced by encode_cursor, given the type of each key value (int or datetime).
+# Anything else, including a well-formed cursor of the wrong shape, is rejected with 400.
+def decode_cursor(cursor: str, *types) -> list:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(position, list) or len(position) != len(types):  # One value per sort key.
+            raise ValueError("wrong shape")
+        values = []
+        for value, kind in zip(position, types):
+            if kind is datetime:  # Encoded as ISO 8601 text.
+                values.append(datetime.fromisoformat(value))  # TypeError if not a string.
+            elif isinstance(value, kind) and not isinstance(value, bool):  # JSON true/false are not ids.
+                values.append(value)
+            else:
+                raise ValueError("wrong type")
+        return values
+    except (ValueError, TypeError):  # Covers bad base64, bad UTF-8, bad JSON and the wrong shape or types.
+        raise HTTPException(status_code=400, detail="Invalid cursor")  # Raise bad request.
+
+# Function to validate a comma-separated field list against the fields an endpoint can return.
+def parse_fields(fields: Optional[str], allowed: list, default: list) -> list:
+    if not fields:  # No projection requested.
+        return default
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:  # Reject rather than silently drop typos.
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")  # Raise bad request.
+    return requested
+
+# Fields /datasets can return, and the ones returned when none are requested.
+DATASET_FIELDS = ["id", "filename", "uploaded_by", "created_at", "row_count"]
+DATASET_DEFAULT_FIELDS = ["id", "filename", "created_at"]
+# Fields /insights can return, and the ones returned when none are requested.
+PREDICTION_FIELDS = ["id", "category", "predicted_value", "confidence", "insight_text", "model_name", "metrics"]
+PREDICTION_DEFAULT_FIELDS = ["category", "predicted_value", "confidence", "insight_text"]
 
-# Endpoint to get all datasets.
+# Endpoint to list datasets, newest first, one page at a time (next page cursor in X-Next-Cursor).
 @app.get("/datasets")
-def get_datasets(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    datasets = db.query(Dataset).all()  # Query all datasets.
-    return [{"id": d.id, "filename": d.filename, "created_at": d.created_at} for d in datasets]  # Return list of dicts.
+async def get_datasets(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),  # Page size.
+    cursor: Optional[str] = None,  # X-Next-Cursor from the previous page.
+    uploaded_by: Optional[int] = None,  # Only datasets uploaded by this user id.
+    created_after: Optional[datetime] = None,  # Only datasets created at or after this time.
+    created_before: Optional[datetime] = None,  # Only datasets created before this time.
+    filename_prefix: Optional[str] = None,  # Only filenames starting with this text.
+    fields: Optional[str] = None,  # Comma-separated subset of DATASET_FIELDS.
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    selected = parse_fields(fields, DATASET_FIELDS, DATASET_DEFAULT_FIELDS)  # Columns to return.
+    # Always load the keyset columns, even if they are not returned.
+    columns = list(dict.fromkeys(selected + ["created_at", "id"]))
+    query = select(*[getattr(Dataset, c) for c in columns])  # Select only the needed columns.
+    if uploaded_by is not None:  # Filter by uploader.
+        query = query.filter(Dataset.uploaded_by == uploaded_by)
+    if created_after is not None:  # Filter by start of date range.
+        query = query.filter(Dataset.created_at >= created_after)
+    if created_before is not None:  # Filter by end of date range.
+        query = query.filter(Dataset.created_at < created_before)
+    if filename_prefix:  # Filter by filename prefix.
+        query = query.filter(Dataset.filename.startswith(filename_prefix, autoescape=True))
+    if cursor:  # Continue strictly after the last row of the previous page.
+        last_created_at, last_id = decode_cursor(cursor, datetime, int)
+        query = query.filter(or_(
+            Dataset.created_at < last_created_at,
+            and_(Dataset.created_at == last_created_at, Dataset.id < last_id),
+        ))
+    # Fetch one extra row to know whether another page exists.
+    rows = (await db.execute(query.order_by(Dataset.created_at.desc(), Dataset.id.desc()).limit(limit + 1))).all()
+    if len(rows) > limit:  # More rows remain.
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return [{c: getattr(row, c) for c in selected} for row in rows]  # Return list of dicts.
 
-# Endpoint to get insights for a dataset.
+# Endpoint to get insights for a dataset, one page at a time (next page cursor in X-Next-Cursor).
 @app.get("/insights/{dataset_id}")
-def get_insights(dataset_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    predictions = db.query(Prediction).filter(Prediction.dataset_id == dataset_id).all()  # Query predictions by dataset.
-    if not predictions:  # If none found.
+async def get_insights(
+    dataset_id: int,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),  # Page size.
+    cursor: Optional[str] = None,  # X-Next-Cursor from the previous page.
+    category: Optional[str] = None,  # Only this category's forecast.
+    fields: Optional[str] = None,  # Comma-separated subset of PREDICTION_FIELDS.
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    selected = parse_fields(fields, PREDICTION_FIELDS, PREDICTION_DEFAULT_FIELDS)  # Columns to return.
+    columns = list(dict.fromkeys(selected + ["id"]))  # Always load the keyset column.
+    query = select(*[getattr(Prediction, c) for c in columns]).filter(Prediction.dataset_id == dataset_id)  # Query predictions by dataset.
+    if category is not None:  # Filter by category.
+        query = query.filter(Prediction.category == category)
+    if cursor:  # Continue strictly after the last row of the previous page.
+        (last_id,) = decode_cursor(cursor, int)
+        query = query.filter(Prediction.id > last_id)
+    rows = (await db.execute(query.order_by(Prediction.id).limit(limit + 1))).all()  # Overall forecast first, then categories.
+    if not rows and not cursor:  # If none found.
         raise HTTPException(status_code=404, detail="No predictions found")  # Raise not found.
-    return [{"predicted_value": p.predicted_value, "confidence": p.confidence, "insight_text": p.insight_text} for p in predictions]  # Return list.
\ No newline at end of file
+    if len(rows) > limit:  # More rows remain.
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].id)
+    # Metrics are stored as JSON text; return them decoded.
+    return [{c: json.loads(getattr(row, c)) if c == "metrics" and getattr(row, c) else getattr(row, c) for c in selected} for row in rows]  # Return list.
\ No newline at end of file
@@ -0,0 +1,15 @@
+# Import the engine and the helper that brings older tables up to date.
+from database import engine, add_missing_columns
+# Import the models so every table is registered on Base.metadata.
+from models import Base
+
+# Function to bring the database schema up to the current models: create missing tables, then add missing columns and indexes.
+# Safe to run repeatedly. Run once per deploy (python migrate.py), or at startup with AUTO_MIGRATE=1.
+def run_migrations():
+    Base.metadata.create_all(bind=engine)  # Create tables if not exist
+    add_missing_columns(Base.metadata)  # Bring older tables up to the current models.
+
+# Run the migrations from the command line.
+if __name__ == "__main__":
+    run_migrations()
+    print("Database schema is up to date")
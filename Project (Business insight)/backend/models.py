@@ -0,0 +1,115 @@
+# Import SQLAlchemy column types for the models.
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Index, text
+# Import deferred for columns loaded only by the endpoints that return them.
+from sqlalchemy.orm import deferred
+# Import datetime for default timestamps.
+from datetime import datetime
+# Import the Base class from the database module.
+from database import Base
+
+# Define the User model class inheriting from Base.
+class User(Base):
+    __tablename__ = "users"  # Set the table name.
+    id = Column(Integer, primary_key=True, index=True)  # Primary key with indexing.
+    email = Column(String, unique=True, index=True)  # Unique email with indexing.
+    password = Column(String)  # Store hashed password (plaintext for demo).
+    role = Column(String, default="viewer")  # Default role is viewer; can be admin.
+
+# Define the Dataset model class.
+class Dataset(Base):
+    __tablename__ = "datasets"  # Set the table name.
+    id = Column(Integer, primary_key=True, index=True)  # Primary key.
+    filename = Column(String)  # Store the uploaded file name.
+    uploaded_by = Column(Integer, ForeignKey("users.id"))  # Foreign key to user who uploaded.
+    created_at = Column(DateTime, default=datetime.utcnow)  # Timestamp of upload.
+    storage_path = Column(String, nullable=True)  # Column store directory once the upload is processed.
+    row_count = Column(Integer, nullable=True)  # Number of cleaned rows in the column store.
+    content_hash = Column(String, nullable=True, index=True)  # SHA-256 of the uploaded file.
+    first_date = Column(DateTime, nullable=True)  # Origin of day numbers in series_stats; None until aggregates exist.
+    profile = deferred(Column(Text, nullable=True))  # JSON data-quality profile (see profiling.py); not loaded with the row.
+
+    # Composite indexes backing keyset pagination, newest first, with and without an uploader filter.
+    __table_args__ = (
+        Index("ix_datasets_created_at_id", "created_at", "id"),
+        Index("ix_datasets_uploaded_by_created_at_id", "uploaded_by", "created_at", "id"),
+    )
+
+# Define the Prediction model class.
+class Prediction(Base):
+    __tablename__ = "predictions"  # Set the table name.
+    id = Column(Integer, primary_key=True, index=True)  # Primary key.
+    dataset_id = Column(Integer, ForeignKey("datasets.id"))  # Foreign key to dataset.
+    category = Column(String, nullable=True)  # Category forecast, or None for the overall total.
+    predicted_value = Column(Float)  # Store the ML predicted value.
+    confidence = Column(Float)  # Store a confidence score: 1 - weighted absolute percentage error.
+    insight_text = Column(String)  # Store the generated business insight text.
+    model_name = Column(String, nullable=True)  # Forecasting model that produced the value.
+    metrics = Column(Text, nullable=True)  # JSON error metrics of that model (backtest, or in-sample for categories).
+
+    # Composite index backing keyset pagination of a dataset's predictions.
+    __table_args__ = (
+        Index("ix_predictions_dataset_id_id", "dataset_id", "id"),
+    )
+
+# Define the DateTotal model holding a dataset's per-(date, category) metric totals.
+class DateTotal(Base):
+    __tablename__ = "date_totals"  # Set the table name.
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), primary_key=True)  # Dataset the totals belong to.
+    date = Column(DateTime, primary_key=True)  # Observation date.
+    category = Column(String, primary_key=True)  # Category label.
+    metric_value = Column(Float)  # Sum of metric_value over the dataset's rows for this date and category.
+
+# Define the SeriesStats model holding streaming statistics of one series of per-date totals.
+# x is days since Dataset.first_date and y the per-date total, so a linear trend and the min-max
+# normalization bounds can be refreshed from the rows that changed, without revisiting history.
+class SeriesStats(Base):
+    __tablename__ = "series_stats"  # Set the table name.
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), primary_key=True)  # Dataset the series belongs to.
+    series = Column(String, primary_key=True)  # Category label, or "" for the overall total.
+    n = Column(Integer, default=0)  # Number of dates.
+    sum_x = Column(Float, default=0.0)  # Sum of x.
+    sum_y = Column(Float, default=0.0)  # Sum of y.
+    sum_xx = Column(Float, default=0.0)  # Sum of x squared.
+    sum_xy = Column(Float, default=0.0)  # Sum of x * y.
+    sum_yy = Column(Float, default=0.0)  # Sum of y squared.
+    min_value = Column(Float, nullable=True)  # Smallest per-date total (normalization lower bound).
+    max_value = Column(Float, nullable=True)  # Largest per-date total (normalization upper bound).
+    last_date = Column(DateTime, nullable=True)  # Latest date in the series.
+    last_value = Column(Float, nullable=True)  # Total on last_date.
+
+# Define the Job model class for background dataset processing.
+class Job(Base):
+    __tablename__ = "jobs"  # Set the table name.
+    id = Column(Integer, primary_key=True, index=True)  # Primary key.
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), index=True)  # Dataset being processed.
+    status = Column(String, default="queued")  # One of queued, running, done, failed.
+    progress = Column(Float, default=0.0)  # Fraction of the work completed (0.0 - 1.0).
+    result = Column(Text, nullable=True)  # JSON-encoded prediction once done.
+    error = Column(String, nullable=True)  # Error message if the job failed.
+    created_at = Column(DateTime, default=datetime.utcnow)  # When the job was queued.
+    updated_at = Column(DateTime, default=datetime.utcnow)  # Last status/progress change.
+
+    # Partial unique index: at most one queued or running job per dataset, enforced by the database itself, so two
+    # requests racing to queue work on the same dataset cannot both succeed (the loser's insert fails).
+    __table_args__ = (
+        Index(
+            "ix_jobs_active_dataset_id", "dataset_id", unique=True,
+            sqlite_where=text("status IN ('queued', 'running')"),
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+# Define the RateLimitBucket model holding one token bucket of the rate limiter shared by all worker processes.
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"  # Set the table name.
+    key = Column(String, primary_key=True)  # Limiter and client, e.g. "login:203.0.113.7".
+    tokens = Column(Float)  # Tokens left as of updated_at.
+    updated_at = Column(Float, index=True)  # Unix time of the last refill.
+
+# Define the CacheInvalidation model: a log of cache entries that changed, polled by every worker process.
+class CacheInvalidation(Base):
+    __tablename__ = "cache_invalidations"  # Set the table name.
+    id = Column(Integer, primary_key=True)  # Primary key.
+    cache = Column(String)  # Which cache: "forecast" or "principal".
+    key = Column(String)  # Entry to drop: a content hash or a user's email.
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # Workers read entries newer than their last poll.
@@ -0,0 +1,200 @@
+# Import os for environment variable access.
+import os
+# Import numpy for finding non-finite metric values.
+import numpy as np
+# Import pandas for data manipulation.
+import pandas as pd
+# Import json for storing model metrics as text.
+import json
+# Import Session from SQLAlchemy ORM for database sessions.
+from sqlalchemy.orm import Session
+# Import the Prediction model for saving results.
+from models import Prediction
+# Import the batched per-category forecaster.
+from forecasting import forecast_categories
+# Import backtest-based model selection for the overall series.
+from forecast_engine import select_model, LinearTrend
+# Import stage timing and row counting.
+from instrumentation import span, count
+
+# Number of CSV rows parsed per chunk when streaming an upload (bounds peak memory).
+UPLOAD_CHUNK_ROWS = int(os.getenv("UPLOAD_CHUNK_ROWS", "100000"))
+# Columns every uploaded CSV must have.
+REQUIRED_COLUMNS = ["date", "metric_value", "category"]
+
+# Function to open a CSV file object as an iterator of DataFrame chunks.
+def read_csv_chunks(fileobj, chunksize: int = UPLOAD_CHUNK_ROWS):
+    # utf-8-sig strips the byte-order mark Excel adds, so "date" is not read as "\ufeffdate".
+    reader = pd.read_csv(fileobj, chunksize=chunksize, encoding="utf-8-sig")  # Reads the header now, so EmptyDataError is raised here.
+    return timed_chunks(reader, "read_csv")  # Parsing happens lazily, chunk by chunk.
+
+# Generator that times how long producing each chunk takes, under one stage name.
+# Closes the source when exhausted or closed early; an unclosed pandas reader closes the caller's file when collected.
+def timed_chunks(chunks, stage: str):
+    try:
+        source = iter(chunks)
+        while True:
+            with span(stage):
+                chunk = next(source, None)
+            if chunk is None:  # Exhausted.
+                return
+            yield chunk
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+# Function to clean one chunk of raw rows down to the typed columns the pipeline uses.
+# Rows with an empty cell, an unparseable date or a non-numeric metric are dropped; a profile, if given, records which.
+def clean_chunk(df: pd.DataFrame, profile=None) -> pd.DataFrame:
+    # Parse the typed columns, turning values that do not parse into NaN/NaT instead of failing the upload.
+    dates = pd.to_datetime(df['date'], errors='coerce')  # Convert date to datetime.
+    values = pd.to_numeric(df['metric_value'], errors='coerce').astype('float64')  # Metric as a float column.
+    
+    # Masks shared by cleaning and profiling, each computed once.
+    nulls = df.isna()  # Empty cells, in any column.
+    bad_date = dates.isna() & ~nulls['date']  # Present but not a date.
+    bad_value = ~np.isfinite(values) & ~nulls['metric_value']  # Present but not a finite number.
+    keep = ~(nulls.any(axis=1) | bad_date | bad_value)  # Drop rows with null or invalid values.
+    
+    # Keep only the required columns.
+    cleaned = pd.DataFrame({
+        'date': dates[keep],
+        'metric_value': values[keep],
+        'category': df['category'][keep].astype(str),  # Category label as text.
+    })
+    if profile is not None:  # Data-quality counts for this chunk.
+        profile.observe(nulls, bad_date, bad_value, cleaned)
+    return cleaned
+
+# Function to sum cleaned rows per date.
+def sum_by_date(cleaned: pd.DataFrame) -> pd.Series:
+    return cleaned['metric_value'].groupby(cleaned['date']).sum()  # Group by date and sum metric.
+
+# Function to sum cleaned rows per (date, category).
+def sum_by_date_category(cleaned: pd.DataFrame) -> pd.Series:
+    # observed=True keeps categorical columns from expanding to every date x category pair.
+    return cleaned['metric_value'].groupby([cleaned['date'], cleaned['category']], observed=True).sum()
+
+# Function to collapse per-(date, category) totals to per-date totals.
+def date_totals(totals: pd.Series) -> pd.Series:
+    return totals.groupby(level='date').sum()
+
+# Function to reduce one chunk of raw rows to per-date metric totals.
+def aggregate_chunk(df: pd.DataFrame) -> pd.Series:
+    return sum_by_date(clean_chunk(df))  # Clean, then aggregate.
+
+# Function to fold a stream of chunks into per-(date, category) totals, one row per distinct pair.
+# A DataProfile passed as `profile` observes every chunk as it is cleaned.
+def accumulate_chunks(chunks, sink=None, profile=None) -> pd.Series:
+    totals = None  # Running per-(date, category) totals.
+    for chunk in chunks:  # Each chunk is parsed, reduced and discarded.
+        with span("clean"):
+            cleaned = clean_chunk(chunk, profile)  # Typed rows for this chunk.
+        count("rows", len(cleaned), "kept")
+        count("rows", len(chunk) - len(cleaned), "dropped")
+        if sink is not None:  # Optionally persist the cleaned rows (e.g. to the column store).
+            with span("store_write"):
+                sink.append(cleaned)
+        with span("aggregate"):
+            partial = sum_by_date_category(cleaned)  # Totals for this chunk only.
+            totals = partial if totals is None else totals.add(partial, fill_value=0)  # Merge into running totals.
+    if totals is None:  # Empty stream.
+        totals = pd.Series(dtype=float, index=pd.MultiIndex.from_arrays([[], []], names=['date', 'category']))
+    return totals
+
+# Function to fold a stream of chunks into the processed per-date frame.
+def process_chunks(chunks, sink=None) -> pd.DataFrame:
+    return finalize_aggregate(date_totals(accumulate_chunks(chunks, sink=sink)))  # Build the final processed frame.
+
+# Function to turn per-date totals into the processed frame used for ML.
+def finalize_aggregate(totals: pd.Series) -> pd.DataFrame:
+    aggregated = totals.sort_index().rename_axis('date').reset_index(name='metric_value')  # One row per date.
+    
+    # Normalize data.
+    value_range = aggregated['metric_value'].max() - aggregated['metric_value'].min()
+    if value_range:  # Min-max normalization.
+        aggregated['normalized_value'] = (aggregated['metric_value'] - aggregated['metric_value'].min()) / value_range
+    else:  # A flat series normalizes to 0, as in /datasets/{id}/series.
+        aggregated['normalized_value'] = 0.0
+    
+    # Generate feature for ML.
+    aggregated['day_num'] = (aggregated['date'] - aggregated['date'].min()).dt.days  # Add day number feature.
+    return aggregated  # Return processed DataFrame.
+
+# Function for data processing.
+def process_data(df: pd.DataFrame) -> pd.DataFrame:
+    return finalize_aggregate(aggregate_chunk(df))  # Same pipeline as streaming, over a single in-memory frame.
+
+# Function for running ML prediction: backtest the candidate models for the overall series and forecast every category.
+# Returns the overall result and the Prediction rows of both (overall first), without saving them; see save_predictions.
+def run_ml_prediction(totals: pd.Series, dataset_id: int = None) -> tuple:
+    result = forecast_overall(finalize_aggregate(date_totals(totals)))  # Select, fit and forecast.
+    rows = [overall_prediction_row(result, dataset_id)] + category_prediction_rows(totals, dataset_id)
+    result["category_forecasts"] = len(rows) - 1  # Number of category forecasts.
+    return result, rows  # Return prediction data.
+
+# Function to replace a dataset's Prediction rows, committing them with everything else pending in the session.
+# One commit, so a failure leaves the previous forecasts in place and never a mix of old and new ones.
+def save_predictions(db: Session, dataset_id: int, rows: list):
+    db.query(Prediction).filter(Prediction.dataset_id == dataset_id).delete(synchronize_session=False)  # Superseded forecasts.
+    with span("db_commit"):
+        db.bulk_insert_mappings(Prediction, rows)  # Single executemany, overall forecast first.
+        db.commit()  # Commit.
+
+# Function to forecast the overall series without saving it (batch uploads save many forecasts at once).
+def forecast_overall(df: pd.DataFrame) -> dict:
+    # Prepare the series: day numbers and per-date totals.
+    x = df['day_num'].to_numpy(dtype='float64')
+    y = df['metric_value'].to_numpy(dtype='float64')
+    
+    # Pick the model with the lowest time-ordered backtest error and forecast a month ahead.
+    with span("model_selection"):
+        selection = select_model(x, y)
+    predicted_value = selection["predicted_value"]
+    confidence = selection["confidence"]
+    
+    # Generate business insight.
+    last_value = df['metric_value'].iloc[-1]  # Get last actual value.
+    change_pct = ((predicted_value - last_value) / last_value) * 100 if last_value else 0.0  # Percentage change; 0 from a zero last value.
+    insight = describe_change(change_pct)  # Turn the change into business text.
+    
+    # Keep the chosen model and the backtest metrics of every candidate.
+    metrics = {"selected": selection["metrics"], "candidates": selection["candidates"]}
+    return {"predicted_value": predicted_value, "confidence": confidence, "insight": insight, "model": selection["model"], "metrics": metrics}
+
+# Function to map an overall forecast to the column values of its Prediction row.
+def overall_prediction_row(result: dict, dataset_id: int = None) -> dict:
+    return {
+        "dataset_id": dataset_id,
+        "predicted_value": result["predicted_value"],
+        "confidence": result["confidence"],
+        "insight_text": result["insight"],
+        "model_name": result["model"],
+        "metrics": json.dumps(result["metrics"]),
+    }
+
+# Function to turn a predicted percentage change into business insight text.
+def describe_change(change_pct: float, subject: str = "Metric value") -> str:
+    if change_pct > 10:  # If significant increase.
+        return f"🚀 {subject} is predicted to increase by {abs(change_pct):.2f}%. Growth opportunity ahead!"
+    elif change_pct < -10:  # If significant decrease.
+        return f"⚠️ {subject} is predicted to decrease by {abs(change_pct):.2f}%. Immediate intervention recommended."
+    else:  # If stable.
+        return f"📊 {subject} is predicted to change by {change_pct:.2f}%. Stable trend."
+
+# Function to forecast every category in one batched fit, returning Prediction column values without saving them.
+def category_prediction_rows(totals: pd.Series, dataset_id: int = None) -> list:
+    with span("forecast_categories"):
+        forecasts = forecast_categories(totals)  # One closed-form fit across the date x category matrix.
+    return [
+        {
+            "dataset_id": dataset_id,
+            "category": category,
+            "predicted_value": float(predicted_value),
+            "confidence": float(confidence),
+            "insight_text": describe_change(change_pct, subject=category),
+            "model_name": LinearTrend.name,
+            "metrics": json.dumps({"in_sample_wape": float(wape)}),
+        }
+        for category, predicted_value, confidence, change_pct, wape in forecasts.itertuples(index=False)
+    ]
@@ -0,0 +1,119 @@
+# Import numpy for the vectorized outlier tests.
+import numpy as np
+# Import pandas for the per-chunk counts and the per-(date, category) totals.
+import pandas as pd
+
+# Points beyond this many interquartile ranges outside the quartiles are IQR outliers.
+IQR_FENCE = 1.5
+# Points more than this many standard deviations from their category's mean are z-score outliers.
+ZSCORE_LIMIT = 3.0
+
+# Function to count, per category, the per-date totals outside the IQR fences and beyond the z-score limit.
+# Both tests run over arrays aligned with the totals, so the work is a few vectorized passes whatever the category count.
+def flag_outliers(totals: pd.Series) -> pd.DataFrame:
+    if totals.empty:  # Nothing kept.
+        return pd.DataFrame({"dates": [], "iqr": [], "zscore": []}, dtype="int64")
+    categories = totals.index.get_level_values("category")
+    values = totals.to_numpy(dtype="float64")
+    by_category = totals.groupby(level="category", observed=True)
+    quartiles = by_category.quantile([0.25, 0.75]).unstack()  # Categories x (0.25, 0.75).
+    moments = by_category.agg(["mean", "std", "size"])
+    q1 = quartiles[0.25].reindex(categories).to_numpy()
+    q3 = quartiles[0.75].reindex(categories).to_numpy()
+    mean = moments["mean"].reindex(categories).to_numpy()
+    std = moments["std"].fillna(0.0).reindex(categories).to_numpy()  # A category with one date has no spread.
+    iqr = q3 - q1
+    iqr_outlier = (values < q1 - IQR_FENCE * iqr) | (values > q3 + IQR_FENCE * iqr)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        zscore_outlier = np.where(std > 0, np.abs(values - mean) / std, 0.0) > ZSCORE_LIMIT
+    flags = pd.DataFrame({"iqr": iqr_outlier, "zscore": zscore_outlier}, index=categories).groupby(level=0).sum()
+    return flags.assign(dates=moments["size"])
+
+# Data-quality profile of an upload, built while the pipeline cleans it: every chunk is observed once, with the
+# masks cleaning already computed, and only mergeable counts and moments are kept, so memory does not grow with the file.
+# Outliers, duplicates and dates are computed at the end from the per-(date, category) totals the pipeline keeps anyway.
+class DataProfile:
+    def __init__(self):
+        self.rows = 0  # Rows read.
+        self.kept = 0  # Rows that survived cleaning.
+        self.nulls = {}  # Column -> empty cells, over every column of the file.
+        self.coercion_failures = {"date": 0, "metric_value": 0}  # Non-empty cells that did not parse.
+        self.mean, self.m2 = 0.0, 0.0  # Mean and sum of squared deviations of kept metric values.
+        self.min_value, self.max_value = None, None  # Range of kept metric values.
+        self.category_rows = pd.Series(dtype="int64")  # Category -> kept rows.
+
+    # Rebuild the mergeable state from a stored profile (see as_dict), so an append can add its rows to it.
+    @classmethod
+    def from_dict(cls, profile: dict):
+        restored = cls()
+        restored.rows, restored.kept = profile["rows"]["total"], profile["rows"]["kept"]
+        restored.nulls = dict(profile["nulls"])
+        restored.coercion_failures = dict(profile["coercion_failures"])
+        values = profile["metric_value"]
+        if restored.kept:
+            restored.mean, restored.m2 = values["mean"], values["std"] ** 2 * restored.kept
+            restored.min_value, restored.max_value = values["min"], values["max"]
+        restored.category_rows = pd.Series({name: c["rows"] for name, c in profile["categories"]["per_category"].items()}, dtype="int64")
+        return restored
+
+    # Add one chunk: its null mask, the cells that failed to parse, and the rows cleaning kept.
+    def observe(self, nulls: pd.DataFrame, bad_date: pd.Series, bad_value: pd.Series, cleaned: pd.DataFrame):
+        self.rows += len(nulls)
+        for column, empty in nulls.sum().items():  # One reduction per column.
+            self.nulls[column] = self.nulls.get(column, 0) + int(empty)
+        self.coercion_failures["date"] += int(bad_date.sum())
+        self.coercion_failures["metric_value"] += int(bad_value.sum())
+        values = cleaned["metric_value"].to_numpy(dtype="float64")
+        if len(values):
+            # Merge the chunk's moments into the running ones (Chan et al.), stable for any number of chunks.
+            n, mean = len(values), values.mean()
+            m2 = ((values - mean) ** 2).sum()
+            total = self.kept + n
+            delta = mean - self.mean
+            self.m2 += m2 + delta * delta * self.kept * n / total
+            self.mean += delta * n / total
+            low, high = values.min(), values.max()
+            self.min_value = low if self.min_value is None else min(self.min_value, low)
+            self.max_value = high if self.max_value is None else max(self.max_value, high)
+        self.kept += len(cleaned)
+        self.category_rows = self.category_rows.add(cleaned["category"].value_counts(), fill_value=0)
+
+    # Finish the profile against the per-(date, category) totals of every kept row, returning a JSON-serializable dict.
+    def as_dict(self, totals: pd.Series) -> dict:
+        dates = totals.index.get_level_values("date")
+        flags = flag_outliers(totals)  # Per category: dates, IQR outliers, z-score outliers.
+        per_category = {
+            str(row.Index): {
+                "rows": int(self.category_rows.get(row.Index, 0)),
+                "dates": int(row.dates),
+                "iqr_outliers": int(row.iqr),
+                "zscore_outliers": int(row.zscore),
+            }
+            for row in flags.itertuples()
+        }
+        return {
+            "rows": {"total": self.rows, "kept": self.kept, "dropped": self.rows - self.kept},
+            "nulls": self.nulls,
+            "coercion_failures": self.coercion_failures,
+            # Kept rows sharing their date and category with an earlier row; the pipeline sums them together.
+            "duplicate_rows": self.kept - len(totals),
+            "dates": {
+                "first": str(dates.min())[:10] if len(dates) else None,  # YYYY-MM-DD.
+                "last": str(dates.max())[:10] if len(dates) else None,
+                "distinct": int(dates.nunique()),
+            },
+            "metric_value": {
+                "min": float(self.min_value) if self.kept else None,
+                "max": float(self.max_value) if self.kept else None,
+                "mean": float(self.mean) if self.kept else None,
+                "std": float((self.m2 / self.kept) ** 0.5) if self.kept else None,  # Population standard deviation.
+            },
+            "outliers": {
+                "basis": "per-date totals within each category",
+                "iqr_fence": IQR_FENCE,
+                "zscore_limit": ZSCORE_LIMIT,
+                "iqr": int(flags["iqr"].sum()),
+                "zscore": int(flags["zscore"].sum()),
+            },
+            "categories": {"distinct": len(per_category), "per_category": per_category},
+        }
@@ -0,0 +1,114 @@
+# Import os for environment variable access.
+import os
+# Import math for rounding up Retry-After.
+import math
+# Import contextlib for skipping the per-process lock on server databases.
+import contextlib
+# Import time for refill arithmetic.
+import time
+# Import asyncio and threading for serializing SQLite writes within a process.
+import asyncio
+import threading
+# Import HTTPException for rejecting requests over the limit.
+from fastapi import HTTPException, status
+# Import case for a portable min() in the refill expression.
+from sqlalchemy import case
+# Import the dialect-specific INSERT ... ON CONFLICT constructs.
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+# Import Session and AsyncSession for the sync and async endpoints.
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+# Import the bucket model.
+from models import RateLimitBucket
+# Import the SQLite flag: SQLite allows one writer at a time.
+from database import IS_SQLITE
+
+# Token-bucket rate limiting shared by every worker process: buckets are rows in the application database,
+# refilled and drawn from by single conditional UPDATEs, so concurrent workers cannot both spend the last token.
+# On SQLite each process also sends one limiter write at a time: requests queued on a lock wake as soon as it is free,
+# where requests queued on the database file wait out SQLite's busy back-off (up to 100 ms per retry).
+
+# Sustained login attempts allowed per client address, per minute, and how many may arrive at once. 0 disables the limit.
+LOGIN_RATE_PER_MINUTE = float(os.getenv("LOGIN_RATE_PER_MINUTE", "10"))
+LOGIN_BURST = int(os.getenv("LOGIN_BURST", "5"))
+# Sustained uploads allowed per user, per minute, and how many may arrive at once. 0 disables the limit.
+UPLOAD_RATE_PER_MINUTE = float(os.getenv("UPLOAD_RATE_PER_MINUTE", "30"))
+UPLOAD_BURST = int(os.getenv("UPLOAD_BURST", "10"))
+# Buckets untouched for this long are full again and can be deleted, in seconds.
+BUCKET_IDLE_SECONDS = int(os.getenv("BUCKET_IDLE_SECONDS", "86400"))
+
+# Function to pick the INSERT construct for the session's dialect (both share the on_conflict API).
+def _insert_for(bind):
+    return postgresql_insert if bind.dialect.name == "postgresql" else sqlite_insert
+
+# One named limit: `burst` tokens per key, refilled at `per_minute`, one token per request.
+class TokenBucket:
+    def __init__(self, name: str, per_minute: float, burst: int):
+        self.name = name  # Prefix of the bucket keys.
+        self.rate = per_minute / 60  # Tokens per second.
+        self.burst = max(burst, 1)  # Bucket capacity.
+        self.thread_lock = threading.Lock()  # Serializes sync callers (threadpool endpoints) on SQLite.
+        self.async_lock = None  # Serializes async callers on SQLite; created on first use, inside the event loop.
+
+    # Statements for one request: take a token if one has refilled; failing that, create the bucket (full, minus this request) if new.
+    def _statements(self, bind, key: str, now: float):
+        refilled = RateLimitBucket.tokens + (now - RateLimitBucket.updated_at) * self.rate
+        refilled = case((refilled > self.burst, float(self.burst)), else_=refilled)
+        take = (RateLimitBucket.__table__.update()
+                .where(RateLimitBucket.key == key, refilled >= 1)
+                .values(tokens=refilled - 1, updated_at=now))
+        create = _insert_for(bind)(RateLimitBucket).values(key=key, tokens=float(self.burst - 1), updated_at=now)
+        create = create.on_conflict_do_nothing(index_elements=["key"])
+        return take, create
+
+    # Seconds until the bucket holds a whole token again.
+    def _retry_after(self, bucket, now: float) -> int:
+        tokens = min(self.burst, bucket.tokens + (now - bucket.updated_at) * self.rate)
+        return max(1, math.ceil((1 - tokens) / self.rate))
+
+    # Raise 429 with Retry-After once the key's bucket is empty.
+    def _reject(self, bucket, now: float):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(self._retry_after(bucket, now))},
+        )
+
+    # Spend one token for `client` from a sync endpoint, or raise 429. Commits the session.
+    def check(self, db: Session, client: str):
+        if self.rate <= 0:  # Limit disabled.
+            return
+        key, now = f"{self.name}:{client}", time.time()
+        take, create = self._statements(db.get_bind(), key, now)
+        with self.thread_lock if IS_SQLITE else contextlib.nullcontext():
+            # Existing bucket, else a new one; if another worker created it meanwhile, draw from theirs.
+            taken = db.execute(take).rowcount or db.execute(create).rowcount or db.execute(take).rowcount
+            db.commit()  # Release the row (and SQLite's write lock) right away.
+        if not taken:
+            self._reject(db.get(RateLimitBucket, key), now)
+
+    # Spend one token for `client` from an async endpoint, or raise 429. Commits the session.
+    async def check_async(self, db: AsyncSession, client: str):
+        if self.rate <= 0:  # Limit disabled.
+            return
+        key, now = f"{self.name}:{client}", time.time()
+        take, create = self._statements(db.get_bind(), key, now)
+        if IS_SQLITE and self.async_lock is None:
+            self.async_lock = asyncio.Lock()
+        async with self.async_lock if IS_SQLITE else contextlib.nullcontext():
+            # Existing bucket, else a new one; if another worker created it meanwhile, draw from theirs.
+            taken = (await db.execute(take)).rowcount or (await db.execute(create)).rowcount or (await db.execute(take)).rowcount
+            await db.commit()  # Release the row (and SQLite's write lock) right away.
+        if not taken:
+            self._reject(await db.get(RateLimitBucket, key), now)
+
+# Function to delete buckets idle long enough to have refilled completely.
+def prune_buckets(db: Session):
+    db.query(RateLimitBucket).filter(RateLimitBucket.updated_at < time.time() - BUCKET_IDLE_SECONDS).delete(synchronize_session=False)
+    db.commit()
+
+# Limit on POST /login, per client address: slows password guessing.
+login_limiter = TokenBucket("login", LOGIN_RATE_PER_MINUTE, LOGIN_BURST)
+# Limit on POST /upload and /upload/batch, per user: each upload can occupy a job worker.
+upload_limiter = TokenBucket("upload", UPLOAD_RATE_PER_MINUTE, UPLOAD_BURST)
@@ -0,0 +1,134 @@
+# Import os for paths and environment variable access.
+import os
+# Import json for the store manifest.
+import json
+# Import shutil for removing incomplete stores.
+import shutil
+# Import uuid for unique staging directory names.
+import uuid
+# Import numpy for raw columnar files and memory-mapping.
+import numpy as np
+# Import pandas for rebuilding DataFrames over the mapped columns.
+import pandas as pd
+
+# Directory holding one column store per dataset.
+DATA_DIR = os.getenv("DATA_DIR", "./data")
+
+# On-disk dtype of each stored column; category is dictionary-encoded as int32 codes.
+COLUMN_DTYPES = {"date": "int64", "metric_value": "float64", "category": "int32"}
+
+# Function to get the column store directory for a dataset.
+def dataset_store_path(dataset_id: int) -> str:
+    return os.path.join(DATA_DIR, f"dataset_{dataset_id}")
+
+# Function to get a fresh directory for a store written before its dataset has an id (batch uploads).
+def staging_store_path() -> str:
+    return os.path.join(DATA_DIR, f"staging_{uuid.uuid4().hex}")
+
+# Function to move a published staging store to its dataset's directory, returning the new path.
+def move_store(staging_path: str, dataset_id: int) -> str:
+    path = dataset_store_path(dataset_id)
+    shutil.rmtree(path, ignore_errors=True)  # Replace any leftover store for this id.
+    os.replace(staging_path, path)
+    return path
+
+# Writer that appends cleaned chunks to one raw binary file per column.
+class ColumnStoreWriter:
+    def __init__(self, path: str):
+        self.path = path  # Final store directory.
+        self.tmp_path = path + ".tmp"  # Written here and renamed on close, so readers never see a partial store.
+        shutil.rmtree(self.tmp_path, ignore_errors=True)  # Clear leftovers from a crashed run.
+        os.makedirs(self.tmp_path)
+        self.files = {name: open(os.path.join(self.tmp_path, f"{name}.bin"), "wb") for name in COLUMN_DTYPES}
+        self.categories = {}  # Category label -> integer code.
+        self.rows = 0  # Rows written so far.
+        self.sizes = None  # File sizes to roll back to when appending to a published store.
+
+    # Reopen a published store to append more rows in place; readers keep seeing the old rows until close().
+    @classmethod
+    def reopen(cls, path: str):
+        writer = cls.__new__(cls)
+        manifest = read_manifest(path)
+        writer.path = path
+        writer.tmp_path = None  # Written in place.
+        writer.rows = manifest["rows"]
+        writer.categories = {label: code for code, label in enumerate(manifest["categories"])}
+        writer.sizes = {name: manifest["rows"] * np.dtype(dtype).itemsize for name, dtype in COLUMN_DTYPES.items()}
+        writer.files = {}
+        for name in COLUMN_DTYPES:
+            f = open(os.path.join(path, f"{name}.bin"), "r+b")
+            f.truncate(writer.sizes[name])  # Drop bytes left by an append that crashed before its manifest was written.
+            f.seek(0, os.SEEK_END)
+            writer.files[name] = f
+        return writer
+
+    # Append one cleaned chunk (date, metric_value, category).
+    def append(self, df: pd.DataFrame):
+        # Assign codes to labels seen for the first time.
+        for label in pd.unique(df["category"]):
+            if label not in self.categories:
+                self.categories[label] = len(self.categories)
+        codes = df["category"].map(self.categories)  # Vectorized label -> code lookup.
+        # Write each column's raw bytes straight to its file.
+        df["date"].to_numpy(dtype="datetime64[ns]").view("int64").tofile(self.files["date"])
+        df["metric_value"].to_numpy(dtype="float64").tofile(self.files["metric_value"])
+        codes.to_numpy(dtype="int32").tofile(self.files["category"])
+        self.rows += len(df)
+
+    # Finish the store: write the manifest and publish the directory.
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        manifest = {
+            "rows": self.rows,
+            "dtypes": COLUMN_DTYPES,
+            "categories": sorted(self.categories, key=self.categories.get),  # Labels in code order.
+        }
+        if self.tmp_path is None:  # Appended in place: publishing the new manifest makes the rows visible.
+            tmp_manifest = os.path.join(self.path, "manifest.json.tmp")
+            with open(tmp_manifest, "w") as f:
+                json.dump(manifest, f)
+            os.replace(tmp_manifest, os.path.join(self.path, "manifest.json"))
+            return
+        with open(os.path.join(self.tmp_path, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+        shutil.rmtree(self.path, ignore_errors=True)  # Replace any previous store for this dataset.
+        os.replace(self.tmp_path, self.path)
+
+    # Discard a store that failed part way through.
+    def abort(self):
+        if self.tmp_path is None:  # Appended in place: cut the files back to their published length.
+            for name, f in self.files.items():
+                if not f.closed:
+                    f.truncate(self.sizes[name])
+                    f.close()
+            return
+        for f in self.files.values():
+            f.close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+# Function to read a store's manifest.
+def read_manifest(path: str) -> dict:
+    with open(os.path.join(path, "manifest.json")) as f:
+        return json.load(f)
+
+# Function to memory-map every column of a store without reading it into memory.
+def load_columns(path: str) -> dict:
+    manifest = read_manifest(path)
+    columns = {}
+    for name, dtype in manifest["dtypes"].items():
+        if manifest["rows"] == 0:  # Empty files cannot be memory-mapped.
+            columns[name] = np.empty(0, dtype=dtype)
+        else:
+            columns[name] = np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode="r", shape=(manifest["rows"],))
+    return columns
+
+# Function to rebuild the cleaned DataFrame over the mapped columns.
+def load_frame(path: str) -> pd.DataFrame:
+    manifest = read_manifest(path)
+    columns = load_columns(path)
+    return pd.DataFrame({
+        "date": columns["date"].view("datetime64[ns]"),  # Reinterpret in place; no copy.
+        "metric_value": columns["metric_value"],
+        "category": pd.Categorical.from_codes(columns["category"], categories=manifest["categories"]),
+    }, copy=False)
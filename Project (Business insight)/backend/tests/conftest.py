@@ -0,0 +1,25 @@
+# Import os and sys for pointing the backend at throwaway storage before it is imported.
+import os
+import sys
+# Import tempfile for the per-run database and data directories.
+import tempfile
+
+# Define a directory for this test run's SQLite database, column store, spooled uploads and cache.
+TEST_DIR = tempfile.mkdtemp(prefix="insightforge-tests-")
+
+# Point the backend at a fresh SQLite file and directories; the modules read these at import time.
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+os.environ["DATA_DIR"] = os.path.join(TEST_DIR, "data")
+os.environ["UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads")
+os.environ["CACHE_DIR"] = os.path.join(TEST_DIR, "cache")
+os.environ.setdefault("SECRET_KEY", "insightforge-tests")
+# Load the analytics stack on first use rather than in a background thread.
+os.environ["WARM_UP_ANALYTICS"] = "0"
+# Keep the rate limits out of the way of tests that log in and upload repeatedly.
+os.environ["LOGIN_RATE_PER_MINUTE"] = "6000"
+os.environ["LOGIN_BURST"] = "1000"
+os.environ["UPLOAD_RATE_PER_MINUTE"] = "6000"
+os.environ["UPLOAD_BURST"] = "1000"
+
+# Make the backend modules importable the way uvicorn imports them (main, models, database, ...).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,103 @@
+# Tests for the predictions a dataset keeps across upload, re-forecast and append, and for refusing overlapping jobs.
+# Jobs run inline in the request instead of on the process pool, so each response is returned after its job finished.
+
+# Import itertools for unique emails, filenames and data.
+import itertools
+# Import date helpers for the generated rows.
+from datetime import date, timedelta
+# Import pytest for fixtures.
+import pytest
+# Import the FastAPI test client.
+from fastapi.testclient import TestClient
+# Import the application and its models.
+import main
+from database import SessionLocal
+from models import Job, Prediction
+
+# Define a counter for names that no other test uses.
+names = itertools.count()
+
+# Define a module-wide client, logged in as an admin, whose startup has created the schema.
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        email = f"admin{next(names)}@example.com"
+        assert client.post("/register", json={"email": email, "password": "secret", "role": "admin"}).status_code == 200
+        token = client.post("/login", json={"username": email, "password": "secret"}).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+
+# Run submitted jobs in the calling thread, so the database reflects them as soon as the request returns.
+@pytest.fixture(autouse=True)
+def inline_jobs(monkeypatch):
+    monkeypatch.setattr(main, "submit_job", lambda job_id, fn, *args: fn(job_id, *args))
+
+# Define a helper function that builds a CSV with one row per day and category, starting at the given date.
+# Each call gets its own base value, so no two uploads share a content hash (and a cached forecast).
+def make_csv(categories: str, days: int, start: date = date(2024, 1, 1)) -> bytes:
+    base = 10 * next(names)
+    rows = [
+        f"{start + timedelta(days=day)},{base + 10 * (i + 1) + day},{category}"
+        for day in range(days) for i, category in enumerate(categories)
+    ]
+    return ("date,metric_value,category\n" + "\n".join(rows) + "\n").encode()
+
+# Define a helper function that uploads a dataset and returns its id once its job has finished.
+def upload(client, content: bytes) -> int:
+    response = client.post("/upload", files={"file": (f"sales{next(names)}.csv", content, "text/csv")})
+    assert response.status_code == 202, response.text
+    assert client.get(f"/jobs/{response.json()['job_id']}").json()["status"] == "done"
+    return response.json()["dataset_id"]
+
+# Define a helper function that returns a dataset's predictions, overall forecast first.
+def predictions(client, dataset_id: int) -> list:
+    response = client.get(f"/insights/{dataset_id}", params={"fields": "category,model_name,metrics"})
+    assert response.status_code == 200
+    return response.json()
+
+# Check an upload stores one overall forecast followed by one forecast per category.
+def test_upload_stores_overall_and_category_forecasts(client):
+    rows = predictions(client, upload(client, make_csv("ab", 120)))
+    assert [row["category"] for row in rows] == [None, "a", "b"]
+    assert rows[0]["metrics"]["selected"] is not None
+
+# Check a re-forecast replaces the dataset's predictions instead of adding a second set.
+def test_reforecast_replaces_predictions(client):
+    dataset_id = upload(client, make_csv("ab", 120))
+    before = predictions(client, dataset_id)
+    response = client.post(f"/datasets/{dataset_id}/forecast")
+    assert response.status_code == 202
+    assert client.get(f"/jobs/{response.json()['job_id']}").json()["status"] == "done"
+    after = predictions(client, dataset_id)
+    assert [row["category"] for row in after] == [row["category"] for row in before]
+    assert after[0]["model_name"] == before[0]["model_name"]
+
+# Check an append keeps the overall forecast selected by backtest and adds forecasts for new categories.
+def test_append_keeps_model_selection(client):
+    dataset_id = upload(client, make_csv("ab", 120))
+    response = client.post(f"/datasets/{dataset_id}/append", files={"file": ("more.csv", make_csv("c", 30, start=date(2024, 4, 30)), "text/csv")})
+    assert response.status_code == 202, response.text
+    assert client.get(f"/jobs/{response.json()['job_id']}").json()["status"] == "done"
+    rows = predictions(client, dataset_id)
+    assert [row["category"] for row in rows] == [None, "a", "b", "c"]
+    # The overall forecast still carries the backtest metrics of every candidate model.
+    assert rows[0]["metrics"]["selected"] is not None
+    assert rows[0]["model_name"] in rows[0]["metrics"]["candidates"]
+
+# Check a dataset with a queued job refuses another forecast or append with 409, and nothing is replaced.
+def test_busy_dataset_refuses_new_jobs(client):
+    dataset_id = upload(client, make_csv("ab", 120))
+    with SessionLocal() as db:
+        db.add(Job(dataset_id=dataset_id))
+        db.commit()
+        stored = db.query(Prediction).filter(Prediction.dataset_id == dataset_id).count()
+    # The forecast endpoint has no early check: the job insert is refused by the active-job index.
+    response = client.post(f"/datasets/{dataset_id}/forecast")
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Dataset has a job in progress"
+    response = client.post(f"/datasets/{dataset_id}/append", files={"file": ("more.csv", make_csv("c", 5, start=date(2024, 4, 30)), "text/csv")})
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Dataset has a job in progress"
+    with SessionLocal() as db:
+        assert db.query(Job).filter(Job.dataset_id == dataset_id, Job.status == "queued").count() == 1
+        assert db.query(Prediction).filter(Prediction.dataset_id == dataset_id).count() == stored
@@ -0,0 +1,194 @@
+# Import os for file sizes and cleanup.
+import os
+# Import json for storing job results as text.
+import json
+# Import pandas for the empty-file error raised by the CSV reader.
+import pandas as pd
+# Import Session from SQLAlchemy ORM for database sessions.
+from sqlalchemy.orm import Session
+# Import the session factory from the database module.
+from database import SessionLocal
+# Import the models updated by jobs.
+from models import Dataset
+# Import the job status helper.
+from jobs import update_job
+# Import the stored aggregates and streaming statistics maintained by append jobs.
+from incremental import apply_delta, refresh_predictions, load_totals
+# Import the data pipeline stages run by the workers.
+from pipeline import (read_csv_chunks, accumulate_chunks, sum_by_date_category, date_totals, finalize_aggregate, run_ml_prediction,
+                      save_predictions, forecast_overall, category_prediction_rows, REQUIRED_COLUMNS)
+# Import the column store used to keep parsed uploads.
+from storage import ColumnStoreWriter, dataset_store_path, load_frame
+# Import the data-quality profile built while uploads are cleaned.
+from profiling import DataProfile
+# Import the forecast cache so later uploads of the same file can skip processing.
+from cache import forecast_cache
+# Import stage timing, and the per-job metrics report sent back to the parent.
+from instrumentation import span, count, collect_job_metrics
+
+# Job bodies run in the worker processes of jobs.get_executor(). Imported by the API only when work is queued.
+
+# Generator that reports parsing progress as chunks are consumed.
+def _track_progress(chunks, fileobj, total_bytes: int, db: Session, job_id: int):
+    for chunk in chunks:  # Pass each chunk through unchanged.
+        if total_bytes:  # Avoid dividing by zero on empty files.
+            # Parsing is most of the work; reserve the last 10% for training and saving.
+            update_job(db, job_id, progress=round(0.9 * min(fileobj.tell() / total_bytes, 1.0), 3))
+        yield chunk
+
+# Worker entry point: parse, store, aggregate and forecast one spooled upload.
+# Returns the job's stage timings and counts, which the parent merges into its /metrics.
+def run_job(job_id: int, dataset_id: int, path: str, content_hash: str = None):
+    with collect_job_metrics() as report:
+        _run_upload_job(job_id, dataset_id, path, content_hash)
+    return report
+
+# Body of run_job.
+def _run_upload_job(job_id: int, dataset_id: int, path: str, content_hash: str = None):
+    db = SessionLocal()  # Each worker process opens its own session.
+    store = ColumnStoreWriter(dataset_store_path(dataset_id))  # Persist cleaned rows while parsing.
+    profile = DataProfile()  # Data-quality counts, gathered while cleaning.
+    try:
+        update_job(db, job_id, status="running", progress=0.0)  # Mark the job as picked up.
+        total_bytes = os.path.getsize(path)  # Size of the spooled upload.
+        with open(path, "rb") as f:  # Stream the spooled file from disk.
+            chunks = _track_progress(read_csv_chunks(f), f, total_bytes, db, job_id)
+            totals = accumulate_chunks(chunks, sink=store, profile=profile)  # Aggregate incrementally over the stream.
+        if totals.empty:  # Header only, or every row was dropped; checked before the store is published.
+            raise ValueError("No valid rows")
+        count("bytes", total_bytes, "job")  # Bytes parsed.
+        with span("store_publish"):
+            store.close()  # Publish the column store.
+        with span("profile"):
+            report = json.dumps(profile.as_dict(totals))
+        prediction, rows = run_ml_prediction(totals, dataset_id)  # Overall and per-category forecasts, not yet saved.
+        db.query(Dataset).filter(Dataset.id == dataset_id).update({"storage_path": store.path, "row_count": store.rows, "profile": report})
+        with span("aggregate_store"):
+            apply_delta(db, db.get(Dataset, dataset_id), totals)  # Stored aggregates for later appends; committed with the forecasts.
+        save_predictions(db, dataset_id, rows)  # One commit for the dataset, its aggregates and every forecast.
+        update_job(db, job_id, status="done", progress=1.0, result=json.dumps(prediction))  # Store the result.
+        if content_hash:  # Remember the forecast for identical uploads.
+            forecast_cache.put(content_hash, {"dataset_id": dataset_id, "prediction": prediction})
+    except Exception as exc:  # Any failure is reported through the job row.
+        store.abort()  # No-op once the store has been published.
+        db.rollback()  # Discard the partial transaction.
+        update_job(db, job_id, status="failed", error=str(exc))  # Record the error.
+    finally:
+        db.close()  # Close the session.
+        if os.path.exists(path):  # The spooled upload is no longer needed.
+            os.remove(path)
+
+# Worker entry point: re-run the forecast from a dataset's column store, without touching the CSV.
+def run_forecast_job(job_id: int, dataset_id: int, storage_path: str):
+    with collect_job_metrics() as report:
+        _run_forecast_job(job_id, dataset_id, storage_path)
+    return report
+
+# Body of run_forecast_job.
+def _run_forecast_job(job_id: int, dataset_id: int, storage_path: str):
+    db = SessionLocal()  # Each worker process opens its own session.
+    try:
+        update_job(db, job_id, status="running", progress=0.0)  # Mark the job as picked up.
+        with span("load_column_store"):
+            frame = load_frame(storage_path)  # Map the stored columns.
+        with span("aggregate"):
+            totals = sum_by_date_category(frame)  # Aggregate the mapped columns.
+        update_job(db, job_id, progress=0.9)  # Only training and saving remain.
+        prediction, rows = run_ml_prediction(totals, dataset_id)  # Overall and per-category forecasts.
+        save_predictions(db, dataset_id, rows)  # Replaces the previous forecasts, in one commit.
+        update_job(db, job_id, status="done", progress=1.0, result=json.dumps(prediction))  # Store the result.
+    except Exception as exc:  # Any failure is reported through the job row.
+        db.rollback()  # Discard the partial transaction.
+        update_job(db, job_id, status="failed", error=str(exc))  # Record the error.
+    finally:
+        db.close()  # Close the session.
+
+# Worker entry point: append a spooled CSV to a stored dataset and refresh its forecasts incrementally.
+def run_append_job(job_id: int, dataset_id: int, path: str):
+    with collect_job_metrics() as report:
+        _run_append_job(job_id, dataset_id, path)
+    return report
+
+# Body of run_append_job. Parsing and aggregation scale with the appended file, not the dataset's history;
+# only the overall forecast reads back the stored per-date totals.
+def _run_append_job(job_id: int, dataset_id: int, path: str):
+    db = SessionLocal()  # Each worker process opens its own session.
+    store = None
+    try:
+        update_job(db, job_id, status="running", progress=0.0)  # Mark the job as picked up.
+        dataset = db.get(Dataset, dataset_id)
+        if dataset.first_date is None:  # Processed before aggregates were stored: build them once from the column store.
+            with span("load_column_store"):
+                frame = load_frame(dataset.storage_path)
+            with span("aggregate"):
+                apply_delta(db, dataset, sum_by_date_category(frame))
+        # Add the new rows to the stored profile; datasets processed before profiling keep none.
+        profile = DataProfile.from_dict(json.loads(dataset.profile)) if dataset.profile else None
+        store = ColumnStoreWriter.reopen(dataset.storage_path)  # New rows go after the stored ones.
+        total_bytes = os.path.getsize(path)  # Size of the spooled file.
+        with open(path, "rb") as f:  # Stream the spooled file from disk.
+            chunks = _track_progress(read_csv_chunks(f), f, total_bytes, db, job_id)
+            delta = accumulate_chunks(chunks, sink=store, profile=profile)  # Per-(date, category) totals of the new rows only.
+        count("bytes", total_bytes, "job")  # Bytes parsed.
+        with span("aggregate_store"):
+            apply_delta(db, dataset, delta)  # Merge into the stored totals and statistics.
+        if profile is not None:
+            with span("profile"):  # Outliers and duplicates span the whole history: use the stored totals, not the rows.
+                dataset.profile = json.dumps(profile.as_dict(load_totals(db, dataset.id)))
+        dataset.row_count = store.rows
+        prediction = refresh_predictions(db, dataset)  # Overall model selection and category trends; commits.
+        with span("store_publish"):
+            store.close()  # Make the appended rows visible to readers.
+        update_job(db, job_id, status="done", progress=1.0, result=json.dumps(prediction))  # Store the result.
+    except Exception as exc:  # Any failure is reported through the job row.
+        if store is not None:
+            store.abort()  # Cut the column files back to their published length.
+        db.rollback()  # Discard the partial transaction.
+        update_job(db, job_id, status="failed", error=str(exc))  # Record the error.
+    finally:
+        db.close()  # Close the session.
+        if os.path.exists(path):  # The spooled upload is no longer needed.
+            os.remove(path)
+
+# Worker entry point for batch uploads: parse, store and forecast one spooled file without touching the database.
+# The parent saves every file of the batch in one transaction, so the aggregates and forecasts are returned instead.
+def process_batch_file(path: str, store_path: str) -> dict:
+    with collect_job_metrics() as report:
+        try:
+            outcome = _process_batch_file(path, store_path)
+        except Exception as exc:  # Reported per file; the rest of the batch carries on.
+            outcome = {"error": str(exc)}
+    outcome["metrics"] = report
+    return outcome
+
+# Body of process_batch_file.
+def _process_batch_file(path: str, store_path: str) -> dict:
+    store = ColumnStoreWriter(store_path)  # Published under a staging name; the parent moves it once the dataset has an id.
+    profile = DataProfile()  # Data-quality counts, gathered while cleaning.
+    try:
+        with open(path, "rb") as f:  # Stream the spooled file from disk.
+            try:
+                header = pd.read_csv(f, nrows=0, encoding="utf-8-sig").columns  # Header only.
+            except pd.errors.EmptyDataError:  # File has no header at all.
+                raise ValueError("Empty CSV file")
+            if not all(col in header for col in REQUIRED_COLUMNS):  # Check if all required columns present.
+                raise ValueError("Missing required columns")
+            f.seek(0)  # Rewind after the header check.
+            totals = accumulate_chunks(read_csv_chunks(f), sink=store, profile=profile)  # Aggregate incrementally over the stream.
+        if totals.empty:  # Every row was dropped.
+            raise ValueError("No valid rows")
+        count("bytes", os.path.getsize(path), "job")  # Bytes parsed.
+        prediction = forecast_overall(finalize_aggregate(date_totals(totals)))  # Overall forecast.
+        category_rows = category_prediction_rows(totals)  # Per-category forecasts; the parent fills in dataset_id.
+        with span("store_publish"):
+            store.close()  # Publish last, so a failed file leaves no store behind.
+        with span("profile"):
+            report = profile.as_dict(totals)
+        return {"rows": store.rows, "store_path": store.path, "totals": totals, "prediction": prediction, "category_rows": category_rows,
+                "profile": report}
+    except Exception:
+        store.abort()  # Discard the partial store.
+        raise
+    finally:
+        if os.path.exists(path):  # The spooled upload is no longer needed.
+            os.remove(path)
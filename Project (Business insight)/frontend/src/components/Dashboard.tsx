@@ -18,6 +18,8 @@ const Dashboard: React.FC = () => {
   const [selectedDatasetId, setSelectedDatasetId] = useState<number | null>(null);
   // State for insights.
   const [insights, setInsights] = useState<any[]>([]);
+  // State for the selected dataset's downsampled per-date series.
+  const [series, setSeries] = useState<{ date: string; value: number }[]>([]);
   // State for uploaded file.
   const [file, setFile] = useState<File | null>(null);
   const { logout } = useAuth();  // Get logout function.
@@ -47,17 +49,45 @@ const Dashboard: React.FC = () => {
     }
   };
 
+  // Async function to fetch a dataset's chart series, downsampled by the server.
+  const fetchSeries = async (id: number) => {
+    try {
+      const response = await axios.get(`http://localhost:8000/datasets/${id}/series`, { params: { points: 500 } });  // GET series.
+      const { dates, metric_value } = response.data;
+      setSeries(dates.map((date: string, i: number) => ({ date, value: metric_value[i] })));  // Columns to chart rows.
+    } catch (error) {
+      setSeries([]);  // Still processing, or no stored data.
+      console.error('Error fetching series', error);  // Log error.
+    }
+  };
+
+  // Async function to poll a background job until it finishes.
+  const waitForJob = async (jobId: number) => {
+    while (true) {
+      const response = await axios.get(`http://localhost:8000/jobs/${jobId}`);  // GET job status.
+      if (response.data.status === 'done' || response.data.status === 'failed') {
+        return response.data;  // Finished either way.
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000));  // Check again in a second.
+    }
+  };
+
   // Function to handle file upload.
   const handleUpload = async () => {
     if (!file) return;  // Exit if no file.
     const formData = new FormData();  // Create form data.
     formData.append('file', file);  // Append file.
     try {
-      await axios.post('http://localhost:8000/upload', formData, {  // POST upload.
+      const response = await axios.post('http://localhost:8000/upload', formData, {  // POST upload.
         headers: { 'Content-Type': 'multipart/form-data' },  // Set headers.
       });
-      alert('Upload successful');  // Alert success.
       fetchDatasets();  // Refresh datasets.
+      if (response.data.cached) {  // Same file was uploaded before; its forecast is returned directly.
+        alert('Upload successful (matched an existing dataset)');
+        return;
+      }
+      const job = await waitForJob(response.data.job_id);  // Processing runs in the background.
+      alert(job.status === 'done' ? 'Upload successful' : `Upload failed: ${job.error}`);  // Alert outcome.
     } catch (error) {
       alert('Upload failed');  // Alert failure.
     }
@@ -67,6 +97,7 @@ const Dashboard: React.FC = () => {
   const handleSelectDataset = (id: number) => {
     setSelectedDatasetId(id);  // Update selected ID.
     fetchInsights(id);  // Fetch insights.
+    fetchSeries(id);  // Fetch chart data.
   };
 
   // Function to export insights to PDF.
@@ -114,11 +145,9 @@ const Dashboard: React.FC = () => {
     doc.save("insights.pdf");
     };
 
-  // Dummy chart data for demo (in prod, fetch real data).
+  // Chart data: the stored series followed by the overall forecast.
   const chartData = [
-    { date: '2023-01', value: 100 },  // Sample historical data point.
-    { date: '2023-02', value: 120 },  // Another data point.
-    // ... add more from sample CSV
+    ...series,  // Per-date totals from /datasets/{id}/series.
     { date: 'Predicted', value: insights[0]?.predicted_value || 0 },  // Add predicted value.
   ];
 
@@ -0,0 +1,2 @@
+# Load-testing and micro-benchmark suite for the InsightForge and task-manager backends.
+# Run with: python -m benchmarks --help
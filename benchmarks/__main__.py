@@ -0,0 +1,78 @@
+# Import argparse for the command-line interface.
+import argparse
+# Import json, os, platform, subprocess, sys, tempfile and time for running targets and writing the report.
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+# Import the repository root.
+from benchmarks.harness import REPO_ROOT
+
+# Define the benchmark targets, each run in its own process since both backends share module names.
+TARGETS = ["task_manager", "insightforge", "startup"]
+
+# Define a function that returns the checked-out commit, so reports can be compared between commits.
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    # Not a git checkout, or git is not installed.
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Define the command-line entry point that runs the chosen targets and writes one JSON report.
+def main(argv=None):
+    # Describe the arguments; anything unrecognized is passed through to every target.
+    parser = argparse.ArgumentParser(
+        description="Run the backend benchmarks and write a JSON report.",
+        epilog="Other options (e.g. --requests, --concurrency, --tasks, --rows) are passed to the targets; "
+               "see python -m benchmarks.task_manager --help, python -m benchmarks.insightforge --help and python -m benchmarks.startup --help.",
+    )
+    parser.add_argument("--target", dest="targets", action="append", choices=TARGETS, help="Target to run; repeat for several (default: all)")
+    parser.add_argument("--out", default="bench_results.json", help="JSON report to write")
+    args, passthrough = parser.parse_known_args(argv)
+    # Collect one report section per target.
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "targets": {},
+    }
+    for target in args.targets or TARGETS:
+        # Run the target in a fresh interpreter and read its report back.
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "result.json")
+            print(f"Running {target}...", file=sys.stderr)
+            subprocess.run([sys.executable, "-m", f"benchmarks.{target}", "--out", out, *passthrough_for(target, passthrough)], cwd=REPO_ROOT, check=True)
+            with open(out) as f:
+                report["targets"][target] = json.load(f)
+    # Write the combined report.
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}", file=sys.stderr)
+
+# Define a function that keeps only the passthrough options a target understands.
+def passthrough_for(target: str, options: list) -> list:
+    # Options each target accepts (each takes one value).
+    accepted = {
+        "task_manager": {"--tasks", "--users", "--requests", "--concurrency"},
+        "insightforge": {"--rows", "--categories", "--uploads", "--requests", "--concurrency"},
+        "startup": {"--runs"},
+    }[target]
+    kept = []
+    # Walk option/value pairs, accepting both "--opt value" and "--opt=value".
+    i = 0
+    while i < len(options):
+        name = options[i].split("=", 1)[0]
+        width = 1 if "=" in options[i] else 2
+        if name in accepted:
+            kept.extend(options[i:i + width])
+        i += width
+    return kept
+
+# Run the command-line entry point.
+if __name__ == "__main__":
+    main()
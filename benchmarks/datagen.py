@@ -0,0 +1,54 @@
+# Import argparse for the command-line interface.
+import argparse
+# Import random for reproducible synthetic values.
+import random
+# Import date and timedelta for generating the date column.
+from datetime import date, timedelta
+
+# Define the columns of demo_data.csv, in order.
+CSV_COLUMNS = ["date", "metric_value", "category"]
+
+# Define a function that builds a synthetic CSV in demo_data.csv format and returns it as bytes.
+def generate_csv(rows: int, categories: int = 5, days: int = 365, seed: int = 0, bom: bool = True) -> bytes:
+    # Use a private generator so results depend only on the seed.
+    rng = random.Random(seed)
+    # Name the categories Category1, Category2, ...
+    names = [f"Category{i + 1}" for i in range(categories)]
+    # Give every category its own level and trend so forecasts have something to find.
+    levels = {name: rng.uniform(50, 500) for name in names}
+    trends = {name: rng.uniform(-1, 1) for name in names}
+    # Start dates on a fixed day.
+    start = date(2023, 1, 1)
+    # Write the header first (demo_data.csv starts with a UTF-8 byte order mark).
+    lines = [",".join(CSV_COLUMNS)]
+    # Generate each row.
+    for i in range(rows):
+        # Spread rows across the date range.
+        offset = i * days // max(rows, 1)
+        # Pick a category.
+        name = names[rng.randrange(categories)]
+        # Level plus trend plus noise, never negative.
+        value = max(0.0, levels[name] + trends[name] * offset + rng.gauss(0, levels[name] * 0.1))
+        # Append the row.
+        lines.append(f"{(start + timedelta(days=offset)).isoformat()},{value:.2f},{name}")
+    # Join with newlines and encode.
+    text = "\n".join(lines) + "\n"
+    return text.encode("utf-8-sig" if bom else "utf-8")
+
+# Define the command-line entry point for writing a CSV to disk.
+def main(argv=None):
+    # Describe the arguments.
+    parser = argparse.ArgumentParser(description="Generate a synthetic CSV in demo_data.csv format.")
+    parser.add_argument("output", help="Path of the CSV to write")
+    parser.add_argument("--rows", type=int, default=100000, help="Number of data rows")
+    parser.add_argument("--categories", type=int, default=5, help="Number of distinct categories")
+    parser.add_argument("--days", type=int, default=365, help="Number of days the dates span")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args(argv)
+    # Generate and write the file.
+    with open(args.output, "wb") as f:
+        f.write(generate_csv(args.rows, args.categories, args.days, args.seed))
+
+# Run the command-line entry point when executed directly.
+if __name__ == "__main__":
+    main()
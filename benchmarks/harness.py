@@ -0,0 +1,137 @@
+# Import asyncio for concurrent clients.
+import asyncio
+# Import os and sys for locating the backends and isolating their working files.
+import os
+import sys
+# Import time for latency measurement.
+import time
+# Import contextlib for the app lifespan helper.
+import contextlib
+# Import httpx to drive the apps in-process through their ASGI interface.
+import httpx
+
+# Import resource for peak RSS where the platform provides it (not on Windows).
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Define the repository root, one level above this package.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Define the backend directories of both apps.
+BACKENDS = {
+    "insightforge": os.path.join(REPO_ROOT, "Project (Business insight)", "backend"),
+    "task_manager": os.path.join(REPO_ROOT, "Assignment 4 (task-manager)", "backend"),
+}
+
+# Define a function that makes one backend importable and moves into an empty working directory.
+# Both backends use the same top-level module names (main, models, database), so only one can be loaded per process.
+def prepare_backend(name: str, workdir: str, env: dict):
+    # Put the backend first on the import path.
+    sys.path.insert(0, BACKENDS[name])
+    # Keep databases, uploads and caches out of the source tree.
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    # Configure the app before it is imported, without overriding explicit settings.
+    for key, value in env.items():
+        os.environ.setdefault(key, value)
+
+# Define a context manager that runs the app's startup and shutdown handlers around the benchmark.
+@contextlib.asynccontextmanager
+async def running_app(app):
+    # The router's lifespan context runs the on_event("startup"/"shutdown") handlers.
+    async with app.router.lifespan_context(app):
+        # Serve requests through an in-process transport, with no sockets involved.
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            yield client
+
+# Define a function that returns the peak resident set size of this process and its children, in MiB.
+# A peak over the whole process lifetime: report it once per target, not per endpoint.
+def peak_rss_mb():
+    # Not measurable without the resource module.
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    # Report this process and its worker processes separately.
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+# Define a function that returns the current resident set size of this process, in MiB.
+def current_rss_mb():
+    # Linux only: resident pages are the second field of /proc/self/statm.
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    # Not measurable on this platform.
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+# Define a function that returns the value at a percentile of a sorted list (nearest rank).
+def percentile(sorted_values: list, pct: float):
+    # Nothing to report.
+    if not sorted_values:
+        return None
+    # Nearest-rank index.
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+# Define a function that summarizes latencies (seconds) into the reported metrics.
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    # Sort once for all percentiles.
+    ordered = sorted(latencies)
+    # Convert seconds to milliseconds.
+    ms = lambda value: None if value is None else round(value * 1000, 3)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else None,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]) if ordered else None,
+    }
+
+# Define a function that sends `requests` requests with `concurrency` clients and summarizes them.
+# make_request(i) returns (method, url, keyword arguments for httpx) for the i-th request; on_response(i, response) sees each reply.
+async def run_endpoint(client: httpx.AsyncClient, make_request, requests: int, concurrency: int, ok_statuses=(200,), on_response=None) -> dict:
+    # Store one latency per request.
+    latencies = []
+    # Count responses with an unexpected status.
+    errors = 0
+    # Hand out request numbers in order.
+    counter = iter(range(requests))
+
+    # Define one client loop.
+    async def worker():
+        nonlocal errors
+        # Take the next request number until none remain.
+        for i in counter:
+            # Build the request outside the timed section.
+            method, url, kwargs = make_request(i)
+            # Time the round trip.
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            # Count failures.
+            if response.status_code not in ok_statuses:
+                errors += 1
+            # Let the caller keep what it needs from the reply.
+            if on_response is not None:
+                on_response(i, response)
+
+    # Run the clients concurrently and time the whole run, sampling resident memory on either side of it.
+    rss_before = current_rss_mb()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = summarize(latencies, errors, time.perf_counter() - started)
+    rss_after = current_rss_mb()
+    # Memory this endpoint's run left resident in the benchmark process (negative if it freed more than it kept).
+    result["rss_delta_mb"] = round(rss_after - rss_before, 1) if rss_before is not None and rss_after is not None else None
+    return result
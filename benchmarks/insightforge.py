@@ -0,0 +1,105 @@
+# Import argparse, asyncio, json and tempfile for the command-line entry point.
+import argparse
+import asyncio
+import json
+import tempfile
+# Import os for paths, time for the run clock and datetime for job timestamps.
+import os
+import time
+from datetime import datetime
+# Import the shared harness.
+from benchmarks.harness import prepare_backend, running_app, run_endpoint, summarize, peak_rss_mb
+# Import the synthetic CSV generator.
+from benchmarks.datagen import generate_csv
+
+# Define how often to poll background jobs, in seconds.
+JOB_POLL_SECONDS = 0.2
+
+# Define a coroutine that drives the InsightForge endpoints and returns per-endpoint metrics.
+async def run(rows: int, categories: int, uploads: int, requests: int, concurrency: int, workdir: str) -> dict:
+    # Load the backend against fresh SQLite, upload, data and cache directories in the working directory.
+    prepare_backend("insightforge", workdir, {
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'insightforge.db')}",
+        "SECRET_KEY": "benchmark-only-secret",
+        # Limits high enough never to reject, so the runs still measure the rate limiter's cost.
+        "LOGIN_RATE_PER_MINUTE": "1000000000", "LOGIN_BURST": "1000000000",
+        "UPLOAD_RATE_PER_MINUTE": "1000000000", "UPLOAD_BURST": "1000000000",
+    })
+    import main
+    # Generate one distinct file per upload up front, so uploads never hit the content-hash cache.
+    files = [generate_csv(rows, categories, seed=i) for i in range(uploads)]
+    results = {}
+    async with running_app(main.app) as client:
+        # Create an admin and log in.
+        await client.post("/register", json={"email": "bench@example.com", "password": "bench", "role": "admin"})
+        login = {"username": "bench@example.com", "password": "bench"}
+        token = (await client.post("/login", json=login)).json()["access_token"]
+        auth = {"Authorization": f"Bearer {token}"}
+        # Login.
+        results["POST /login"] = await run_endpoint(client, lambda i: ("POST", "/login", {"json": login}), requests, concurrency)
+        # Uploads, timed up to acceptance; remember the queued jobs.
+        accepted = {}
+        def upload(i):
+            return ("POST", "/upload", {"headers": auth, "files": {"file": (f"bench_{i}.csv", files[i], "text/csv")}})
+        def remember_job(i, response):
+            if response.status_code == 202:
+                accepted[response.json()["job_id"]] = response.json()["dataset_id"]
+        started = time.perf_counter()
+        results["POST /upload"] = await run_endpoint(client, upload, uploads, concurrency, ok_statuses=(202,), on_response=remember_job)
+        # Wait for every job, then time each one from acceptance to completion using its own timestamps.
+        pending, durations, failed = set(accepted), [], 0
+        while pending:
+            for job_id in list(pending):
+                job = (await client.get(f"/jobs/{job_id}", headers=auth)).json()
+                if job["status"] in ("done", "failed"):
+                    pending.discard(job_id)
+                    failed += job["status"] == "failed"
+                    durations.append((datetime.fromisoformat(job["updated_at"]) - datetime.fromisoformat(job["created_at"])).total_seconds())
+            if pending:
+                await asyncio.sleep(JOB_POLL_SECONDS)
+        results["upload job (accepted -> done)"] = summarize(durations, failed, time.perf_counter() - started)
+        job_ids, dataset_ids = list(accepted) or [1], list(accepted.values()) or [1]
+        # Read endpoints, against the processed datasets.
+        results["GET /jobs/{id}"] = await run_endpoint(
+            client, lambda i: ("GET", f"/jobs/{job_ids[i % len(job_ids)]}", {"headers": auth}), requests, concurrency)
+        results["GET /datasets"] = await run_endpoint(
+            client, lambda i: ("GET", "/datasets", {"headers": auth, "params": {"limit": 100}}), requests, concurrency)
+        results["GET /insights/{id}"] = await run_endpoint(
+            client, lambda i: ("GET", f"/insights/{dataset_ids[i % len(dataset_ids)]}", {"headers": auth}), requests, concurrency)
+        results["GET /datasets/{id}/profile"] = await run_endpoint(
+            client, lambda i: ("GET", f"/datasets/{dataset_ids[i % len(dataset_ids)]}/profile", {"headers": auth}), requests, concurrency)
+        # Re-uploading an already processed file is answered from the forecast cache.
+        results["POST /upload (cached)"] = await run_endpoint(client, lambda i: upload(i % uploads), requests, concurrency)
+    return results
+
+# Define the command-line entry point, writing metrics as JSON.
+def main(argv=None):
+    # Describe the arguments.
+    parser = argparse.ArgumentParser(description="Benchmark the InsightForge backend in-process.")
+    parser.add_argument("--rows", type=int, default=100000, help="Rows per uploaded CSV")
+    parser.add_argument("--categories", type=int, default=5, help="Distinct categories per CSV")
+    parser.add_argument("--uploads", type=int, default=8, help="Number of distinct CSVs uploaded")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per read endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--workdir", help="Directory for the database and files (default: a temporary directory)")
+    parser.add_argument("--out", help="JSON file to write (default: stdout)")
+    args = parser.parse_args(argv)
+    # Resolve the output path before the harness changes directory.
+    out = os.path.abspath(args.out) if args.out else None
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="bench_insightforge_")
+    # Run the benchmark.
+    results = asyncio.run(run(args.rows, args.categories, args.uploads, args.requests, args.concurrency, workdir))
+    # Peak RSS covers the whole run, so it is reported once for the target rather than per endpoint.
+    report = {"target": "insightforge", "params": {k: v for k, v in vars(args).items() if k != "out"}, "endpoints": results,
+              "peak_rss_mb": peak_rss_mb()}
+    # Write the report.
+    text = json.dumps(report, indent=2)
+    if out:
+        with open(out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+# Run the command-line entry point when executed directly.
+if __name__ == "__main__":
+    main()
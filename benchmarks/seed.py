@@ -0,0 +1,93 @@
+# Import argparse for the command-line interface.
+import argparse
+# Import random for reproducible task states.
+import random
+# Import datetime helpers for start and stop times.
+from datetime import datetime, timedelta, timezone
+
+# Define the share of seeded tasks left unclaimed, kept but unstarted, and running; the rest are done.
+UNCLAIMED_SHARE = 0.5
+KEPT_SHARE = 0.2
+RUNNING_SHARE = 0.1
+
+# Define how many distinct priorities seeded tasks are spread over.
+QUEUE_PRIORITIES = 10
+
+# Define how many rows go into one INSERT.
+SEED_BATCH_ROWS = 5000
+
+# Define a function that fills the task-manager database with users and tasks in mixed states.
+# models and engine are the task-manager's own modules, imported by the caller after prepare_backend.
+# Returns the ids the benchmark needs: unclaimed task ids, and (task id, username) pairs for kept, unstarted tasks.
+def seed_tasks(engine, models, tasks: int, users: int, seed: int = 0) -> dict:
+    # Import insert and select lazily, alongside the backend's SQLAlchemy.
+    from sqlalchemy import insert, select
+    # Use a private generator so results depend only on the seed.
+    rng = random.Random(seed)
+    # Name the users bench_user1, bench_user2, ...
+    usernames = [f"bench_user{i + 1}" for i in range(users)]
+    # Completed tasks fall within the last 30 days.
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        # Insert the users and read back their ids.
+        conn.execute(insert(models.User), [{"username": name} for name in usernames])
+        ids = dict(conn.execute(select(models.User.username, models.User.id).where(models.User.username.in_(usernames))).all())
+        # Remember where the new tasks start so only they are reported back.
+        first_id = (conn.scalar(select(models.Task.id).order_by(models.Task.id.desc()).limit(1)) or 0) + 1
+        # Build the task rows.
+        rows = []
+        for i in range(tasks):
+            # Pick a state by position so the shares are exact.
+            share = i / max(tasks, 1)
+            row = {"title": f"Bench task {i + 1}", "kept_by_user_id": None, "start_time": None, "stop_time": None, "priority": rng.randrange(QUEUE_PRIORITIES)}
+            if share >= UNCLAIMED_SHARE:
+                # Claimed by a random user.
+                row["kept_by_user_id"] = ids[usernames[rng.randrange(users)]]
+                if share >= UNCLAIMED_SHARE + KEPT_SHARE:
+                    # Started some time in the last 30 days.
+                    row["start_time"] = now - timedelta(days=rng.uniform(0, 30))
+                    if share >= UNCLAIMED_SHARE + KEPT_SHARE + RUNNING_SHARE:
+                        # Stopped after a log-uniform duration between a minute and a day.
+                        row["stop_time"] = row["start_time"] + timedelta(seconds=60 * 1440 ** rng.random())
+            rows.append(row)
+        # Insert the tasks in batches.
+        for start in range(0, len(rows), SEED_BATCH_ROWS):
+            conn.execute(insert(models.Task), rows[start:start + SEED_BATCH_ROWS])
+        # Read back the ids the benchmark drives.
+        unclaimed = conn.scalars(
+            select(models.Task.id).where(models.Task.id >= first_id, models.Task.kept_by_user_id.is_(None)).order_by(models.Task.id)
+        ).all()
+        kept = conn.execute(
+            select(models.Task.id, models.User.username)
+            .join(models.User, models.Task.kept_by_user_id == models.User.id)
+            .where(models.Task.id >= first_id, models.Task.start_time.is_(None))
+            .order_by(models.Task.id)
+        ).all()
+    return {"usernames": usernames, "unclaimed": list(unclaimed), "kept": [tuple(row) for row in kept]}
+
+# Define the command-line entry point for seeding a task-manager database.
+def main(argv=None):
+    # Describe the arguments.
+    parser = argparse.ArgumentParser(description="Seed the task-manager database with users and tasks.")
+    parser.add_argument("--database-url", help="Database to seed (defaults to the backend's DATABASE_URL)")
+    parser.add_argument("--tasks", type=int, default=10000, help="Number of tasks")
+    parser.add_argument("--users", type=int, default=100, help="Number of users")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args(argv)
+    # Point the backend at the chosen database before importing it.
+    import os, sys
+    from benchmarks.harness import BACKENDS
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    sys.path.insert(0, BACKENDS["task_manager"])
+    # Import the backend and create its tables.
+    import models
+    from database import engine
+    models.Base.metadata.create_all(bind=engine)
+    # Seed and report.
+    seeded = seed_tasks(engine, models, args.tasks, args.users, args.seed)
+    print(f"Seeded {args.tasks} tasks ({len(seeded['unclaimed'])} unclaimed) for {args.users} users")
+
+# Run the command-line entry point when executed directly.
+if __name__ == "__main__":
+    main()
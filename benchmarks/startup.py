@@ -0,0 +1,107 @@
+# Import argparse, asyncio, json, statistics and tempfile for the command-line entry point.
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+# Import os, subprocess and sys for running each measurement in a fresh interpreter.
+import os
+import subprocess
+import sys
+# Import time for the phase clock.
+import time
+# Import the shared harness.
+from benchmarks.harness import REPO_ROOT, prepare_backend, running_app, peak_rss_mb
+
+# Define the modules whose presence after startup shows the analytics stack was loaded.
+HEAVY_MODULES = ["pandas", "numpy", "sklearn"]
+# Define the first request sent to each backend; neither needs a user to exist.
+FIRST_REQUESTS = {
+    "insightforge": ("POST", "/login", {"json": {"username": "nobody@example.com", "password": "x"}}),
+    "task_manager": ("GET", "/queue", {"params": {"limit": 10}}),
+}
+
+# Define a coroutine that measures one cold start of a backend in this (fresh) process.
+async def measure(backend: str, workdir: str, warm_up: bool) -> dict:
+    # Configure the backend against an empty SQLite file, so startup also creates the schema.
+    prepare_backend(backend, workdir, {
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+        "SECRET_KEY": "benchmark-only-secret",
+        "WARM_UP_ANALYTICS": "1" if warm_up else "0",
+    })
+    # Import the app.
+    started = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+    # Run the startup handlers, then send the first request.
+    async with running_app(main.app) as client:
+        ready = time.perf_counter()
+        method, url, kwargs = FIRST_REQUESTS[backend]
+        response = await client.request(method, url, **kwargs)
+        answered = time.perf_counter()
+        heavy = [name for name in HEAVY_MODULES if name in sys.modules]
+    rss = peak_rss_mb()
+    return {
+        "import_s": round(imported - started, 4),
+        "startup_s": round(ready - imported, 4),
+        "first_request_s": round(answered - ready, 4),
+        "total_s": round(answered - started, 4),
+        "first_request_status": response.status_code,
+        "heavy_modules_loaded": heavy,
+        "peak_rss_mb": rss["self"] if rss else None,
+    }
+
+# Define a function that runs one cold start in a new interpreter and returns its measurement.
+def cold_start(backend: str, warm_up: bool) -> dict:
+    with tempfile.TemporaryDirectory(prefix=f"bench_startup_{backend}_") as workdir:
+        command = [sys.executable, "-m", "benchmarks.startup", "--child", backend, "--workdir", workdir]
+        if warm_up:
+            command.append("--warm-up")
+        result = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+        return json.loads(result.stdout)
+
+# Define a function that summarizes repeated cold starts: median, min and max of each phase.
+def summarize_runs(runs: list) -> dict:
+    phases = ["import_s", "startup_s", "first_request_s", "total_s"]
+    summary = {phase: {
+        "median": round(statistics.median(run[phase] for run in runs), 4),
+        "min": min(run[phase] for run in runs),
+        "max": max(run[phase] for run in runs),
+    } for phase in phases}
+    summary["runs"] = len(runs)
+    summary["heavy_modules_loaded"] = runs[-1]["heavy_modules_loaded"]
+    summary["peak_rss_mb"] = runs[-1]["peak_rss_mb"]
+    return summary
+
+# Define the command-line entry point, writing metrics as JSON.
+def main(argv=None):
+    # Describe the arguments.
+    parser = argparse.ArgumentParser(description="Measure cold-start time of both backends: import, startup handlers and first request.")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts per backend")
+    parser.add_argument("--warm-up", action="store_true", help="Let InsightForge load its analytics stack in the background at startup")
+    parser.add_argument("--out", help="JSON file to write (default: stdout)")
+    parser.add_argument("--child", choices=sorted(FIRST_REQUESTS), help=argparse.SUPPRESS)  # Internal: one measurement.
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    # Child mode: measure once and print the result for the parent.
+    if args.child:
+        print(json.dumps(asyncio.run(measure(args.child, args.workdir, args.warm_up))))
+        return
+    # Resolve the output path before anything changes directory.
+    out = os.path.abspath(args.out) if args.out else None
+    results = {}
+    for backend in sorted(FIRST_REQUESTS):
+        runs = [cold_start(backend, args.warm_up) for _ in range(args.runs)]
+        results[backend] = summarize_runs(runs)
+    report = {"target": "startup", "params": {"runs": args.runs, "warm_up": args.warm_up}, "backends": results}
+    # Write the report.
+    text = json.dumps(report, indent=2)
+    if out:
+        with open(out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+# Run the command-line entry point when executed directly.
+if __name__ == "__main__":
+    main()
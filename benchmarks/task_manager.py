@@ -0,0 +1,85 @@
+# Import argparse, asyncio, json and tempfile for the command-line entry point.
+import argparse
+import asyncio
+import json
+import tempfile
+# Import os for paths.
+import os
+# Import the shared harness.
+from benchmarks.harness import prepare_backend, running_app, run_endpoint, peak_rss_mb
+# Import the database seeder.
+from benchmarks.seed import seed_tasks
+
+# Define a coroutine that seeds the task-manager, drives its endpoints and returns per-endpoint metrics.
+async def run(tasks: int, users: int, requests: int, concurrency: int, workdir: str) -> dict:
+    # Load the backend against a fresh SQLite file in the working directory.
+    prepare_backend("task_manager", workdir, {"DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'tasks.db')}"})
+    import main
+    import models
+    from database import engine
+    # Create the tables and seed before startup, so the rollup backfill and user cache warm-up see the data.
+    models.Base.metadata.create_all(bind=engine)
+    seeded = seed_tasks(engine, models, tasks, users)
+    usernames, unclaimed, kept = seeded["usernames"], seeded["unclaimed"], seeded["kept"]
+    # Mutating endpoints need one distinct task per request.
+    mutations = min(requests, len(unclaimed) // 2, len(kept))
+    results = {}
+    async with running_app(main.app) as client:
+        # Take a cursor part way into the unstarted queue from a real page, since it encodes (priority, id).
+        middle = await client.get("/queue", params={"limit": min(max(len(unclaimed) // 2, 1), 1000), "state": "unstarted"})
+        middle_cursor = middle.headers.get("X-Next-Cursor")
+        # Read endpoints.
+        results["GET /queue"] = await run_endpoint(
+            client, lambda i: ("GET", "/queue", {"params": {"limit": 100}}), requests, concurrency)
+        results["GET /queue (unstarted, page 2)"] = await run_endpoint(
+            client, lambda i: ("GET", "/queue", {"params": {"limit": 100, "cursor": middle_cursor, "state": "unstarted"}}),
+            requests, concurrency)
+        results["GET /my_tasks"] = await run_endpoint(
+            client, lambda i: ("GET", "/my_tasks", {"params": {"username": usernames[i % users]}}), requests, concurrency)
+        results["GET /stats/daily"] = await run_endpoint(
+            client, lambda i: ("GET", "/stats/daily", {}), requests, concurrency)
+        results["GET /stats/users/{username}"] = await run_endpoint(
+            client, lambda i: ("GET", f"/stats/users/{usernames[i % users]}", {}), requests, concurrency)
+        # Claims, each on its own unclaimed task (the first half of them).
+        results["POST /keep/{id}"] = await run_endpoint(
+            client, lambda i: ("POST", f"/keep/{unclaimed[i]}", {"json": {"username": usernames[i % users]}}), mutations, concurrency)
+        # Claims of the oldest unclaimed task, which contend with each other.
+        results["POST /claim_next"] = await run_endpoint(
+            client, lambda i: ("POST", "/claim_next", {"json": {"username": usernames[i % users]}}), mutations, concurrency)
+        # Start, then stop, tasks seeded as kept but unstarted, by their owners.
+        results["POST /start/{id}"] = await run_endpoint(
+            client, lambda i: ("POST", f"/start/{kept[i][0]}", {"json": {"username": kept[i][1]}}), mutations, concurrency)
+        results["POST /stop/{id}"] = await run_endpoint(
+            client, lambda i: ("POST", f"/stop/{kept[i][0]}", {"json": {"username": kept[i][1]}}), mutations, concurrency)
+    return results
+
+# Define the command-line entry point, writing metrics as JSON.
+def main(argv=None):
+    # Describe the arguments.
+    parser = argparse.ArgumentParser(description="Benchmark the task-manager backend in-process.")
+    parser.add_argument("--tasks", type=int, default=10000, help="Number of seeded tasks")
+    parser.add_argument("--users", type=int, default=100, help="Number of seeded users")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--workdir", help="Directory for the database (default: a temporary directory)")
+    parser.add_argument("--out", help="JSON file to write (default: stdout)")
+    args = parser.parse_args(argv)
+    # Resolve the output path before the harness changes directory.
+    out = os.path.abspath(args.out) if args.out else None
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="bench_task_manager_")
+    # Run the benchmark.
+    results = asyncio.run(run(args.tasks, args.users, args.requests, args.concurrency, workdir))
+    # Peak RSS covers the whole run, so it is reported once for the target rather than per endpoint.
+    report = {"target": "task_manager", "params": {k: v for k, v in vars(args).items() if k != "out"}, "endpoints": results,
+              "peak_rss_mb": peak_rss_mb()}
+    # Write the report.
+    text = json.dumps(report, indent=2)
+    if out:
+        with open(out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+# Run the command-line entry point when executed directly.
+if __name__ == "__main__":
+    main()